@@ -0,0 +1,240 @@
+"""Acciones masivas del panel sobre varias filas seleccionadas a la vez.
+
+Cada acción es un solo UPDATE o DELETE sobre `pk IN (...)` dentro de una
+transacción, en lugar de una página de confirmación y un guardado por fila.
+
+`QuerySet.update()` no dispara señales, así que las acciones sobre productos
+hacen una sola vez lo que las señales harían fila por fila: invalidar las
+etiquetas del caché de páginas donde estaban y donde quedan, subir la versión
+de la API y, si cambia el género, reescribir esas filas del índice de
+búsqueda. Los borrados tampoco pasan por las señales: `borrar` recorre la
+cascada (sólo CASCADE en estos modelos) y borra con un DELETE por tabla y
+camino, de las hojas a la raíz; antes descuenta de una vez las ventas, las
+estadísticas por hora y por artista y los contadores de lo que se va, y
+después quita los productos del índice e invalida sus páginas.
+
+Antes de confirmar un borrado, `costo_borrado` cuenta con subconsultas (sin
+cargar objetos) cuántas filas de cada tabla se irán en cascada.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+from operator import or_
+
+from django.db import models, transaction
+from django.db.models import F, Max, Q, Value
+from django.db.models.functions import Greatest, Round
+
+from . import busqueda, cache_catalogo, estadisticas, ventas
+from .models import DetallePedido, Pedido, Producto, Usuario, normalizar_faceta
+
+MAX_SELECCION = 1000
+PORCENTAJE_MINIMO = Decimal('-90')
+PORCENTAJE_MAXIMO = Decimal('1000')
+PRECIO_MAXIMO = Decimal('999999.99')  # max_digits=8, decimal_places=2
+AJUSTE_STOCK_MAXIMO = 1_000_000  # en valor absoluto; más allá desborda el INTEGER de SQLite
+
+# Modelo que se borra desde cada lista del panel
+MODELOS = {
+    'productos': Producto,
+    'pedidos': Pedido,
+    'clientes': Usuario,
+}
+
+
+class AccionInvalida(ValueError):
+    pass
+
+
+@dataclass
+class Resultado:
+    filas: int
+    mensaje: str
+    detalle: dict = field(default_factory=dict)
+
+
+def seleccion(modelo, ids):
+    """Queryset de los ids enviados por el formulario (enteros, sin repetir)."""
+    try:
+        ids = sorted({int(i) for i in ids})
+    except (TypeError, ValueError):
+        raise AccionInvalida('Selección inválida.')
+    if not ids:
+        raise AccionInvalida('No seleccionaste ninguna fila.')
+    if len(ids) > MAX_SELECCION:
+        raise AccionInvalida(f'Se pueden seleccionar hasta {MAX_SELECCION} filas a la vez.')
+    return modelo.objects.filter(pk__in=ids)
+
+
+# ----------------------
+# Borrado con costo en cascada
+# ----------------------
+def _cascadas(modelo):
+    for relacion in modelo._meta.related_objects:
+        if not relacion.many_to_many and getattr(relacion, 'on_delete', None) is models.CASCADE:
+            yield relacion
+
+
+def costo_borrado(queryset, profundidad=4):
+    """[(nombre de la tabla, filas)] que borraría `queryset.delete()`, empezando por la raíz."""
+    caminos = defaultdict(list)  # modelo -> subconsultas de pks por cada camino de cascada
+
+    def recorrer(modelo, pks, nivel):
+        if nivel > profundidad:
+            return
+        for relacion in _cascadas(modelo):
+            hijo = relacion.related_model
+            sub = hijo._base_manager.filter(**{f'{relacion.field.name}__in': pks}).values('pk')
+            caminos[hijo].append(sub)
+            recorrer(hijo, sub, nivel + 1)
+
+    modelo = queryset.model
+    costos = [(str(modelo._meta.verbose_name_plural), queryset.count())]
+    recorrer(modelo, queryset.values('pk'), 1)
+    for hijo, subs in caminos.items():
+        # Una tabla alcanzable por varios caminos (p.ej. detalles por pedido y por usuario) se cuenta una vez
+        filas = hijo._base_manager.filter(reduce(or_, (Q(pk__in=sub) for sub in subs))).count()
+        if filas:
+            costos.append((str(hijo._meta.verbose_name_plural), filas))
+    return costos
+
+
+def _plan_borrado(modelo, filas):
+    """[(modelo, queryset)] que borra la cascada de `filas`, cada hijo antes que su padre."""
+    plan = []
+    for relacion in _cascadas(modelo):
+        hijo = relacion.related_model
+        plan.extend(_plan_borrado(hijo, hijo._base_manager.filter(**{f'{relacion.field.name}__in': filas.values('pk')})))
+    plan.append((modelo, filas))
+    return plan
+
+
+def _filas_de(plan, modelo):
+    """Todas las filas de `modelo` en el plan, aunque lleguen por varios caminos."""
+    caminos = [Q(pk__in=filas.values('pk')) for m, filas in plan if m is modelo]
+    if not caminos:
+        return modelo._base_manager.none()
+    return modelo._base_manager.filter(reduce(or_, caminos))
+
+
+def borrar(queryset):
+    with transaction.atomic():
+        plan = _plan_borrado(queryset.model, queryset)
+        productos = _filas_de(plan, Producto)
+        etiquetas = _etiquetas_de(productos)
+        producto_ids = list(productos.values_list('pk', flat=True))
+        # Lo que las señales harían fila por fila, una vez y antes de que las filas se vayan
+        detalles = _filas_de(plan, DetallePedido)
+        ventas.descontar(detalles)
+        estadisticas.descontar_detalles(detalles)
+        estadisticas.descontar_pedidos(_filas_de(plan, Pedido))
+        borradas = defaultdict(int)
+        for modelo, filas in plan:
+            borradas[modelo] += filas._raw_delete(filas.db)
+        for clave, modelo in estadisticas.CONTADORES.items():
+            if borradas[modelo]:
+                estadisticas.incrementar(clave, -borradas[modelo])
+        if producto_ids:
+            estadisticas.tocar_version('producto')
+            busqueda.borrar_productos(producto_ids)
+    cache_catalogo.invalidar(*etiquetas)
+    raiz = borradas.pop(queryset.model)
+    otras = {modelo._meta.object_name: n for modelo, n in borradas.items() if n}
+    mensaje = f'{raiz} eliminados'
+    if otras:
+        mensaje += ' (en cascada: ' + ', '.join(f'{v} {k}' for k, v in sorted(otras.items())) + ')'
+    return Resultado(raiz + sum(otras.values()), mensaje + '.', otras)
+
+
+# ----------------------
+# Actualizaciones de productos
+# ----------------------
+def _etiquetas_de(queryset):
+    etiquetas = set()
+    filas = queryset.values_list('artista__nombre_artista', 'genero_slug', 'tipo_slug', 'novedad').distinct()
+    for fila in filas:
+        etiquetas.update(cache_catalogo.etiquetas_producto(*fila))
+    return etiquetas
+
+
+def _actualizar_productos(queryset, reindexar=False, **cambios):
+    with transaction.atomic():
+        # Páginas donde estaban los productos y donde quedan
+        etiquetas = _etiquetas_de(queryset)
+        filas = queryset.update(**cambios)
+        etiquetas |= _etiquetas_de(queryset)
+        estadisticas.tocar_version('producto')
+        if reindexar:
+            busqueda.reindexar_productos(queryset)
+    cache_catalogo.invalidar(*etiquetas)
+    return filas
+
+
+def _decimal(valor, nombre):
+    try:
+        numero = Decimal(str(valor).strip().replace('%', ''))
+    except (InvalidOperation, AttributeError):
+        raise AccionInvalida(f'{nombre} debe ser un número.')
+    # NaN e Infinity se leen bien pero no se pueden comparar ni guardar
+    if not numero.is_finite():
+        raise AccionInvalida(f'{nombre} debe ser un número.')
+    return numero
+
+
+def marcar_novedad(queryset, valor):
+    filas = _actualizar_productos(queryset, novedad=bool(valor))
+    return Resultado(filas, f"{filas} productos {'marcados' if valor else 'desmarcados'} como novedad.")
+
+
+def ajustar_precio(queryset, porcentaje):
+    porcentaje = _decimal(porcentaje, 'El porcentaje')
+    if not PORCENTAJE_MINIMO <= porcentaje <= PORCENTAJE_MAXIMO:
+        raise AccionInvalida(f'El porcentaje debe estar entre {PORCENTAJE_MINIMO} y {PORCENTAJE_MAXIMO}.')
+    factor = 1 + porcentaje / 100
+    maximo = queryset.aggregate(m=Max('precio'))['m'] or 0
+    if maximo * factor > PRECIO_MAXIMO:
+        raise AccionInvalida(f'Algún precio superaría {PRECIO_MAXIMO}.')
+    filas = _actualizar_productos(queryset, precio=Round(F('precio') * Value(factor), 2))
+    return Resultado(filas, f'Precio de {filas} productos ajustado {porcentaje:+}%.')
+
+
+def ajustar_stock(queryset, delta):
+    try:
+        delta = int(str(delta).strip())
+    except ValueError:
+        raise AccionInvalida('El ajuste de stock debe ser un número entero.')
+    if abs(delta) > AJUSTE_STOCK_MAXIMO:
+        raise AccionInvalida(f'El ajuste de stock debe estar entre -{AJUSTE_STOCK_MAXIMO} y {AJUSTE_STOCK_MAXIMO}.')
+    # El stock no baja de cero
+    filas = _actualizar_productos(queryset, stock=Greatest(F('stock') + delta, Value(0)))
+    return Resultado(filas, f'Stock de {filas} productos ajustado {delta:+d}.')
+
+
+def cambiar_faceta(queryset, campo, valor):
+    valor = (valor or '').strip()
+    if campo not in ('genero', 'tipo'):
+        raise AccionInvalida(f'Campo desconocido: {campo}')
+    if not valor or not normalizar_faceta(valor):
+        raise AccionInvalida(f'Indica el nuevo {campo}.')
+    cambios = {campo: valor, f'{campo}_slug': normalizar_faceta(valor)}
+    # El género está en el índice de búsqueda; el tipo no
+    filas = _actualizar_productos(queryset, reindexar=campo == 'genero', **cambios)
+    return Resultado(filas, f'{campo.capitalize()} de {filas} productos cambiado a "{valor}".')
+
+
+# nombre en el formulario -> (etiqueta, función(queryset, valor))
+ACCIONES_PRODUCTOS = {
+    'novedad_si': ('Marcar como novedad', lambda qs, valor: marcar_novedad(qs, True)),
+    'novedad_no': ('Quitar de novedades', lambda qs, valor: marcar_novedad(qs, False)),
+    'precio': ('Ajustar precio (%)', ajustar_precio),
+    'stock': ('Sumar/restar stock', ajustar_stock),
+    'tipo': ('Cambiar tipo', lambda qs, valor: cambiar_faceta(qs, 'tipo', valor)),
+    'genero': ('Cambiar género', lambda qs, valor: cambiar_faceta(qs, 'genero', valor)),
+}
+
+
+def opciones(lista):
+    """(valor, etiqueta) para el selector de acciones de una lista del panel."""
+    extra = ACCIONES_PRODUCTOS if lista == 'productos' else {}
+    return [('borrar', 'Eliminar seleccionados')] + [(clave, etiqueta) for clave, (etiqueta, _) in extra.items()]
@@ -0,0 +1,278 @@
+"""API JSON de sólo lectura del catálogo y del carrito.
+
+    GET /api/artistas/                 ?q= ?campos= ?limite= ?despues= ?antes=
+    GET /api/artistas/<id>/
+    GET /api/productos/                ?tipo= ?genero= ?novedad= ?artista=<id> ?campos= ...
+    GET /api/productos/<id>/
+    GET /api/carrito/                  (sesión iniciada)
+
+- `campos=id,nombre` devuelve sólo esos campos y sólo lee esas columnas.
+- Paginación por cursor (`paginacion.paginar`): `siguiente`/`anterior`
+  traen la URL de la página vecina.
+- ETag fuerte y Last-Modified a partir de las versiones por tabla de
+  `estadisticas.versiones()` (el carrito usa su propio `updated`), así que
+  una petición condicional sin cambios responde 304 con una sola consulta.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_safe
+
+from . import estadisticas, paginacion
+from .models import Artista, Cart, CartItem, Producto, normalizar_faceta
+from .replicas import lectura_replica
+
+LIMITE = 50
+LIMITE_MAXIMO = 200
+
+CACHE_PUBLICA = 'public, max-age=0, must-revalidate'
+CACHE_PRIVADA = 'private, no-cache'
+
+
+def _url_archivo(request, fieldfile):
+    return request.build_absolute_uri(fieldfile.url) if fieldfile else None
+
+
+# nombre público -> (columnas que necesita, cómo se obtiene)
+CAMPOS_ARTISTA = {
+    'id': (('id',), lambda request, a: a.id),
+    'nombre': (('nombre_artista',), lambda request, a: a.nombre_artista),
+    'descripcion': (('descripcion',), lambda request, a: a.descripcion),
+    'foto': (('foto',), lambda request, a: _url_archivo(request, a.foto)),
+}
+
+CAMPOS_PRODUCTO = {
+    'id': (('id',), lambda request, p: p.id),
+    'nombre': (('nombre_producto',), lambda request, p: p.nombre_producto),
+    'artista': (('artista_id',), lambda request, p: p.artista_id),
+    'artista_nombre': (('artista__nombre_artista',), lambda request, p: p.artista.nombre_artista),
+    'genero': (('genero',), lambda request, p: p.genero),
+    'tipo': (('tipo',), lambda request, p: p.tipo),
+    'precio': (('precio',), lambda request, p: str(p.precio)),
+    'stock': (('stock',), lambda request, p: p.stock),
+    'novedad': (('novedad',), lambda request, p: p.novedad),
+    'descripcion': (('descripcion',), lambda request, p: p.descripcion),
+    'img': (('img',), lambda request, p: _url_archivo(request, p.img)),
+}
+
+
+class ErrorApi(Exception):
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.status = status
+
+
+def _error(mensaje, status):
+    return JsonResponse({'error': mensaje}, status=status)
+
+
+def _campos(request, disponibles):
+    pedidos = [c.strip() for c in request.GET.get('campos', '').split(',') if c.strip()]
+    if not pedidos:
+        return list(disponibles)
+    desconocidos = [c for c in pedidos if c not in disponibles]
+    if desconocidos:
+        raise ErrorApi(f"Campos desconocidos: {', '.join(desconocidos)}")
+    return pedidos
+
+
+def _proyectar(queryset, campos, disponibles, orden=()):
+    """Aplica .only() con las columnas de `campos` (más las del orden y la PK)."""
+    columnas = {'id', *orden}
+    for campo in campos:
+        columnas.update(disponibles[campo][0])
+    if any('__' in c for c in columnas):
+        queryset = queryset.select_related('artista')
+    return queryset.only(*columnas)
+
+
+def _serializar(request, objeto, campos, disponibles):
+    return {campo: disponibles[campo][1](request, objeto) for campo in campos}
+
+
+def _url_cursor(request, parametro, cursor):
+    if not cursor:
+        return None
+    query = request.GET.copy()
+    query.pop('despues', None)
+    query.pop('antes', None)
+    query[parametro] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def _limite(request):
+    try:
+        return max(1, min(int(request.GET.get('limite', LIMITE)), LIMITE_MAXIMO))
+    except ValueError:
+        raise ErrorApi('limite debe ser un número')
+
+
+def _lista(request, queryset, orden, disponibles, busqueda_en=()):
+    campos = _campos(request, disponibles)
+    queryset = _proyectar(queryset, campos, disponibles, orden)
+    pagina = paginacion.paginar(request, queryset, orden, busqueda_en=busqueda_en, por_pagina=_limite(request))
+    return {
+        'resultados': [_serializar(request, objeto, campos, disponibles) for objeto in pagina.items],
+        'siguiente': _url_cursor(request, 'despues', pagina.siguiente),
+        'anterior': _url_cursor(request, 'antes', pagina.anterior),
+    }
+
+
+# ----------------------
+# ETag / Last-Modified
+# ----------------------
+def _versiones(request, tablas):
+    # condition() pide el ETag y el Last-Modified por separado: una sola consulta por petición
+    if not hasattr(request, '_versiones_api'):
+        request._versiones_api = estadisticas.versiones(tablas)
+    return request._versiones_api
+
+
+def _etag_de(tablas):
+    def etag(request, *args, **kwargs):
+        version = _versiones(request, tablas)
+        firma = ','.join(f'{tabla}={version[tabla]}' for tabla in tablas)
+        return hashlib.sha1(f'{request.get_full_path()}|{firma}'.encode('utf-8')).hexdigest()
+    return etag
+
+
+def _ultima_modificacion_de(tablas):
+    def ultima_modificacion(request, *args, **kwargs):
+        microsegundos = max(_versiones(request, tablas).values(), default=0)
+        if not microsegundos:
+            return None
+        return datetime.fromtimestamp(microsegundos / 1_000_000, tz=dt_timezone.utc)
+    return ultima_modificacion
+
+
+def endpoint(tablas):
+    """Vista GET de la API pública: réplica de lectura, 304 condicional y errores en JSON."""
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            try:
+                datos = vista(request, *args, **kwargs)
+            except ErrorApi as error:
+                return _error(str(error), error.status)
+            respuesta = JsonResponse(datos, json_dumps_params={'ensure_ascii': False})
+            respuesta['Cache-Control'] = CACHE_PUBLICA
+            return respuesta
+        condicional = condition(etag_func=_etag_de(tablas), last_modified_func=_ultima_modificacion_de(tablas))
+        return lectura_replica(require_safe(condicional(envoltura)))
+    return decorador
+
+
+# ----------------------
+# Artistas y productos
+# ----------------------
+@endpoint(['artista'])
+def artistas(request):
+    return _lista(request, Artista.objects.all(), ['nombre_artista'], CAMPOS_ARTISTA, busqueda_en=['nombre_artista__icontains'])
+
+
+@endpoint(['artista'])
+def artista(request, artista_id):
+    campos = _campos(request, CAMPOS_ARTISTA)
+    objeto = _proyectar(Artista.objects.filter(pk=artista_id), campos, CAMPOS_ARTISTA).first()
+    if objeto is None:
+        raise ErrorApi('Artista no encontrado', status=404)
+    return _serializar(request, objeto, campos, CAMPOS_ARTISTA)
+
+
+_VERDADERO = {'1', 'true', 'si', 'sí'}
+_FALSO = {'0', 'false', 'no'}
+
+
+def _filtrar_productos(request, queryset):
+    if request.GET.get('tipo'):
+        queryset = queryset.filter(tipo_slug=normalizar_faceta(request.GET['tipo']))
+    if request.GET.get('genero'):
+        queryset = queryset.filter(genero_slug=normalizar_faceta(request.GET['genero']))
+    novedad = request.GET.get('novedad', '').lower()
+    if novedad in _VERDADERO:
+        queryset = queryset.filter(novedad=True)
+    elif novedad in _FALSO:
+        queryset = queryset.filter(novedad=False)
+    elif novedad:
+        raise ErrorApi('novedad debe ser 1/0 o true/false')
+    if request.GET.get('artista'):
+        try:
+            queryset = queryset.filter(artista_id=int(request.GET['artista']))
+        except ValueError:
+            raise ErrorApi('artista debe ser el id del artista')
+    return queryset
+
+
+@endpoint(['artista', 'producto'])
+def productos(request):
+    queryset = _filtrar_productos(request, Producto.objects.all())
+    return _lista(request, queryset, ['id'], CAMPOS_PRODUCTO, busqueda_en=['nombre_producto__icontains'])
+
+
+@endpoint(['artista', 'producto'])
+def producto(request, producto_id):
+    campos = _campos(request, CAMPOS_PRODUCTO)
+    objeto = _proyectar(Producto.objects.filter(pk=producto_id), campos, CAMPOS_PRODUCTO).first()
+    if objeto is None:
+        raise ErrorApi('Producto no encontrado', status=404)
+    return _serializar(request, objeto, campos, CAMPOS_PRODUCTO)
+
+
+# ----------------------
+# Carrito del usuario
+# ----------------------
+def _cart(request):
+    if not hasattr(request, '_cart_api'):
+        request._cart_api = (
+            Cart.objects.filter(usuario__user=request.user).only('id', 'updated', 'num_items', 'total_cantidad').first()
+            if request.user.is_authenticated else None
+        )
+    return request._cart_api
+
+
+def _etag_carrito(request):
+    cart = _cart(request)
+    if cart is None:
+        return None
+    # Los items muestran nombre y precio del producto: también cuenta su versión
+    version = _versiones(request, ['producto'])['producto']
+    return f'carrito-{cart.pk}-{int(cart.updated.timestamp() * 1_000_000)}-{version}'
+
+
+def _modificacion_carrito(request):
+    cart = _cart(request)
+    return cart.updated if cart is not None else None
+
+
+@require_safe
+@condition(etag_func=_etag_carrito, last_modified_func=_modificacion_carrito)
+def carrito(request):
+    if not request.user.is_authenticated:
+        return _error('Se requiere iniciar sesión', 401)
+    cart = _cart(request)
+    items = []
+    total = 0
+    if cart is not None:
+        for item in (CartItem.objects.filter(cart=cart).select_related('producto')
+                     .only('id', 'cantidad', 'producto__id', 'producto__nombre_producto', 'producto__precio')
+                     .order_by('id')):
+            subtotal = item.producto.precio * item.cantidad
+            total += subtotal
+            items.append({
+                'id': item.id,
+                'producto': item.producto.id,
+                'nombre': item.producto.nombre_producto,
+                'precio': str(item.producto.precio),
+                'cantidad': item.cantidad,
+                'subtotal': str(subtotal),
+            })
+    respuesta = JsonResponse({
+        'items': items,
+        'num_items': cart.num_items if cart else 0,
+        'total_cantidad': cart.total_cantidad if cart else 0,
+        'total': str(total),
+    }, json_dumps_params={'ensure_ascii': False})
+    respuesta['Cache-Control'] = CACHE_PRIVADA
+    return respuesta
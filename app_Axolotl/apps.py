@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AppAxolotlConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_Axolotl'
+
+    def ready(self):
+        # Registra los receptores de señales que viven fuera de models.py
+        from . import busqueda, cache_catalogo, estadisticas, instrumentacion, miniaturas, ventas  # noqa: F401
@@ -0,0 +1,211 @@
+"""Detecta vistas cuyo número de consultas crece con los datos (N+1).
+
+`auditar` pide (GET) cada ruta con nombre de `app_Axolotl/urls.py` sobre
+datos sintéticos de dos tamaños (`TAMANOS`) y compara cuántas consultas hace.
+Una vista bien escrita hace las mismas consultas con 3 o con 30 filas; si con
+más datos hace más, hay una consulta por fila en algún lado: un FK leído en
+la plantilla sin `select_related`, un `.count()` dentro de un bucle...
+
+Cada consulta se registra con su origen: los marcos del proyecto en la pila
+y, si la disparó una plantilla, el archivo y la línea del nodo. El reporte
+muestra, para las vistas que crecen, el SQL que más se repite con los datos
+grandes y de dónde salió.
+
+Las rutas del panel se piden como staff y las demás como cliente con
+carrito; `logout` se salta porque cerraría la sesión de las siguientes.
+"""
+import re
+import sys
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.urls import URLPattern, reverse
+
+from . import datos_sinteticos, instrumentacion, rendimiento, urls
+from .models import Artista, CartItem, DetallePedido, Pedido, Producto, Usuario
+
+TAMANOS = {
+    'chico': {'artistas': 2, 'productos': 6, 'clientes': 2, 'pedidos': 1, 'items': 1},
+    'grande': {'artistas': 5, 'productos': 30, 'clientes': 6, 'pedidos': 4, 'items': 5},
+}
+SIN_AUDITAR = {'logout'}
+MAX_ORIGENES = 3
+
+_RAIZ = str(Path(settings.BASE_DIR)) + '/'
+# Execute wrappers: aparecerían en el origen de todas las consultas
+_IGNORAR = {__file__, instrumentacion.__file__}
+_LISTA_IN = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_SAVEPOINT = re.compile(r'"s\d+_x\d+"')
+
+
+@dataclass
+class Consulta:
+    sql: str
+    chico: int
+    grande: int
+    origenes: list
+
+
+@dataclass
+class Vista:
+    nombre: str
+    url: str = ''
+    consultas: dict = field(default_factory=dict)  # tamaño -> número de consultas
+    status: dict = field(default_factory=dict)
+    repetidas: list = field(default_factory=list)  # Consulta que aumentan con los datos
+
+    @property
+    def crece(self):
+        return self.consultas.get('grande', 0) > self.consultas.get('chico', 0)
+
+
+def normalizar(sql):
+    """SQL sin lo que cambia entre corridas sin ser N+1: largo de las listas IN y nombres de savepoint."""
+    return _SAVEPOINT.sub('"s"', _LISTA_IN.sub('(...)', sql))
+
+
+def _origen():
+    """(marcos del proyecto más internos, 'plantilla:línea' del nodo que consultó o '')."""
+    marcos, plantilla = [], ''
+    frame = sys._getframe(2)
+    while frame is not None:
+        archivo = frame.f_code.co_filename
+        if not plantilla and frame.f_code.co_name == 'render_annotated' and archivo.endswith('template/base.py'):
+            nodo = frame.f_locals.get('self')
+            origen, token = getattr(nodo, 'origin', None), getattr(nodo, 'token', None)
+            if origen is not None and token is not None:
+                plantilla = f'{origen.template_name or origen.name}:{token.lineno}'
+        elif archivo.startswith(_RAIZ) and archivo not in _IGNORAR and len(marcos) < MAX_ORIGENES:
+            marcos.append(f'{archivo[len(_RAIZ):]}:{frame.f_lineno} en {frame.f_code.co_name}')
+        frame = frame.f_back
+    return tuple(marcos), plantilla
+
+
+class _Registro:
+    """Execute wrapper que guarda (SQL normalizado, origen) de cada consulta."""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.consultas.append((normalizar(sql), _origen()))
+        return execute(sql, params, many, context)
+
+
+# ----------------------
+# Rutas
+# ----------------------
+def rutas():
+    """[(nombre, nombres de los argumentos)] de las rutas con nombre, en el orden de urls.py."""
+    return [
+        (patron.name, list(patron.pattern.converters))
+        for patron in urls.urlpatterns
+        if isinstance(patron, URLPattern) and patron.name and patron.name not in SIN_AUDITAR
+    ]
+
+
+def _argumentos():
+    """Un id existente para cada nombre de argumento de las rutas."""
+    cliente = Usuario.objects.get(user__username=datos_sinteticos.usuario_cliente(0))
+    return {
+        # Uno que no esté en el carrito: add_to_cart inserta con los dos tamaños
+        'producto_id': Producto.objects.exclude(cartitem__cart__usuario=cliente).order_by('id').values_list('id', flat=True).first(),
+        'artista_id': Artista.objects.order_by('id').values_list('id', flat=True).first(),
+        'cliente_id': cliente.id,
+        'empleado_id': Usuario.objects.get(user__username=datos_sinteticos.usuario_staff()).user_id,
+        'pedido_id': Pedido.objects.order_by('id').values_list('id', flat=True).first(),
+        'detalle_id': DetallePedido.objects.order_by('id').values_list('id', flat=True).first(),
+        'item_id': CartItem.objects.filter(cart__usuario=cliente).order_by('id').values_list('id', flat=True).first(),
+    }
+
+
+def _parametros(objetivos):
+    """Query string de las vistas que lo necesitan para mostrar datos."""
+    return {
+        'comprar_frontend': {'artista': objetivos.artistas[0]},
+        'genero_frontend': {'genero': objetivos.generos[0]},
+        'tipo_frontend': {'tipo': objetivos.tipos[0]},
+        'buscar_frontend': {'q': datos_sinteticos.PREFIJO.strip('-')},
+    }
+
+
+# ----------------------
+# Auditoría
+# ----------------------
+def _medir(tamano, vistas, seleccion):
+    datos_sinteticos.limpiar()
+    datos_sinteticos.generar(**TAMANOS[tamano])
+    caches['catalogo'].clear()
+    clientes = rendimiento.clientes_de_prueba()
+    argumentos = _argumentos()
+    parametros = _parametros(rendimiento.Objetivos.desde_base())
+    registros = {}
+    for nombre, nombres_argumentos in seleccion:
+        url = reverse(nombre, kwargs={a: argumentos[a] for a in nombres_argumentos})
+        cliente = clientes['staff' if url.startswith('/admin_panel/') else 'cliente']
+        registro = _Registro()
+        with connection.execute_wrapper(registro):
+            respuesta = cliente.get(url, parametros.get(nombre, {}))
+            if respuesta.streaming:
+                # Las exportaciones consultan mientras se genera el cuerpo
+                b''.join(respuesta.streaming_content)
+        vista = vistas.setdefault(nombre, Vista(nombre))
+        vista.url = url
+        vista.consultas[tamano] = len(registro.consultas)
+        vista.status[tamano] = respuesta.status_code
+        registros[nombre] = registro.consultas
+    return registros
+
+
+def auditar(nombres=None):
+    """{nombre de la ruta: Vista} midiendo con los dos tamaños de `TAMANOS`.
+
+    Borra y siembra datos con `datos_sinteticos`: usar en una base de prueba.
+    """
+    seleccion = [(n, a) for n, a in rutas() if nombres is None or n in nombres]
+    vistas = {}
+    chico = _medir('chico', vistas, seleccion)
+    grande = _medir('grande', vistas, seleccion)
+    datos_sinteticos.limpiar()
+
+    for nombre, vista in vistas.items():
+        if not vista.crece:
+            continue
+        antes = Counter(sql for sql, _ in chico[nombre])
+        despues = Counter(sql for sql, _ in grande[nombre])
+        origenes = defaultdict(Counter)
+        for sql, origen in grande[nombre]:
+            origenes[sql][origen] += 1
+        vista.repetidas = sorted(
+            (
+                Consulta(sql, antes[sql], n, [o for o, _ in origenes[sql].most_common(MAX_ORIGENES)])
+                for sql, n in despues.items() if n > antes[sql]
+            ),
+            key=lambda c: c.chico - c.grande,
+        )
+    return vistas
+
+
+def reporte(vistas, todas=False):
+    """Texto con las vistas que crecen (o todas) y el SQL repetido de cada una."""
+    lineas = []
+    for vista in vistas.values():
+        if not (todas or vista.crece):
+            continue
+        marca = 'CRECE' if vista.crece else 'ok'
+        lineas.append(
+            f"{marca:<6}{vista.nombre:<28} {vista.consultas.get('chico')} -> {vista.consultas.get('grande')} consultas"
+            f"  [{vista.status.get('grande')}] {vista.url}"
+        )
+        for consulta in vista.repetidas:
+            lineas.append(f'        {consulta.chico} -> {consulta.grande} veces: {consulta.sql[:300]}')
+            for (marcos, plantilla) in consulta.origenes:
+                if plantilla:
+                    lineas.append(f'            plantilla {plantilla}')
+                for marco in marcos:
+                    lineas.append(f'            {marco}')
+    return '\n'.join(lineas)
@@ -0,0 +1,334 @@
+"""Búsqueda de texto completo sobre artistas y productos.
+
+En SQLite se usa un índice FTS5 (`app_axolotl_busqueda`) que guarda una fila
+por artista y por producto con las columnas que se muestran en los
+resultados, así que una búsqueda es una sola consulta al índice sin joins.
+El rowid codifica el objeto (`id * 2` para artistas, `id * 2 + 1` para
+productos) para que actualizar o borrar una fila sea un acceso por clave.
+Las señales de `Artista` y `Producto` mantienen el índice al día;
+`manage.py reindexar_busqueda` lo reconstruye completo.
+
+- Coincidencia por prefijo: cada palabra de la consulta se busca como `pal*`.
+- Tolerancia a errores: si no hay resultados se corrigen las palabras con
+  los términos más parecidos del vocabulario del índice (fts5vocab); sólo se
+  leen los de largo compatible con CORTE, hasta MAX_VOCABULARIO.
+- Orden: bm25 con más peso en el nombre que en el artista, género y descripción.
+
+En PostgreSQL cada artista y producto guarda su documento en
+`vector_busqueda` (tsvector con índice GIN, migración 0013), que mantienen las
+mismas señales, `reindexar_productos` y `reindexar`; la consulta filtra con @@
+sobre esa columna y ordena con `SearchRank`. En otros motores, `icontains`.
+"""
+import difflib
+import re
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, connections, router, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .models import Artista, Producto
+
+TABLA = 'app_axolotl_busqueda'
+TABLA_VOCAB = 'app_axolotl_busqueda_vocab'
+LIMITE = 20
+CORTE = 0.7  # parecido mínimo (difflib) de una corrección
+MAX_VOCABULARIO = 5000  # términos candidatos por palabra a corregir
+
+_PALABRA_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def usa_fts5():
+    return connection.vendor == 'sqlite'
+
+
+def usa_vectores():
+    return connection.vendor == 'postgresql'
+
+
+def _rowid(tipo, objeto_id):
+    return objeto_id * 2 + (1 if tipo == 'producto' else 0)
+
+
+def _plano(texto):
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def palabras(consulta):
+    return [_plano(p) for p in _PALABRA_RE.findall(consulta or '')][:8]
+
+
+# ----------------------
+# Mantenimiento del índice (SQLite)
+# ----------------------
+def _filas_productos(productos):
+    for p in productos:
+        yield (_rowid('producto', p.id), 'producto', p.id, p.nombre_producto, p.artista.nombre_artista, p.genero, p.descripcion)
+
+
+def _filas_artistas(artistas):
+    for a in artistas:
+        yield (_rowid('artista', a.id), 'artista', a.id, a.nombre_artista, a.nombre_artista, '', a.descripcion)
+
+
+def _escribir(filas, reemplazar=True):
+    filas = list(filas)
+    if not filas:
+        return
+    with connection.cursor() as cursor:
+        if reemplazar:
+            cursor.executemany(f'DELETE FROM {TABLA} WHERE rowid = %s', [(f[0],) for f in filas])
+        cursor.executemany(
+            f'INSERT INTO {TABLA} (rowid, tipo, objeto_id, nombre, artista, genero, descripcion) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s)',
+            filas,
+        )
+
+
+def _borrar(tipo, objeto_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA} WHERE rowid = %s', [_rowid(tipo, objeto_id)])
+
+
+def borrar_productos(ids):
+    """Quita del índice las filas de los productos `ids` (p.ej. tras un borrado masivo sin señales)."""
+    if not usa_fts5() or not ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLA} WHERE rowid = %s', [(_rowid('producto', i),) for i in ids])
+
+
+# ----------------------
+# Mantenimiento de los vectores (PostgreSQL)
+# ----------------------
+def _vector_artista():
+    return SearchVector('nombre_artista', weight='A', config='simple') + SearchVector('descripcion', weight='D', config='simple')
+
+
+def _vector_producto():
+    # update() no admite columnas de otra tabla: el nombre del artista va por subconsulta
+    nombre_artista = Subquery(Artista.objects.filter(pk=OuterRef('artista_id')).values('nombre_artista')[:1])
+    return (
+        SearchVector('nombre_producto', weight='A', config='simple')
+        + SearchVector(nombre_artista, weight='B', config='simple')
+        + SearchVector('genero', weight='C', config='simple')
+        + SearchVector('descripcion', weight='D', config='simple')
+    )
+
+
+def reindexar(lote=2000):
+    """Reconstruye el índice completo. Devuelve el número de filas indexadas."""
+    if usa_vectores():
+        with transaction.atomic():
+            return (
+                Artista.objects.update(vector_busqueda=_vector_artista())
+                + Producto.objects.update(vector_busqueda=_vector_producto())
+            )
+    if not usa_fts5():
+        return 0
+    # Una sola transacción: sin ella cada INSERT confirma por separado
+    with transaction.atomic():
+        return _reindexar(lote)
+
+
+def _reindexar(lote):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA}')
+    total = 0
+    artistas = Artista.objects.only('id', 'nombre_artista', 'descripcion').iterator(chunk_size=lote)
+    productos = (
+        Producto.objects.select_related('artista')
+        .only('id', 'nombre_producto', 'genero', 'descripcion', 'artista__nombre_artista')
+        .iterator(chunk_size=lote)
+    )
+    for filas in (_filas_artistas(artistas), _filas_productos(productos)):
+        bloque = []
+        for fila in filas:
+            bloque.append(fila)
+            if len(bloque) >= lote:
+                _escribir(bloque, reemplazar=False)
+                total += len(bloque)
+                bloque = []
+        _escribir(bloque, reemplazar=False)
+        total += len(bloque)
+    return total
+
+
+def reindexar_productos(productos):
+    """Reescribe las filas de un queryset de productos (p.ej. tras un update() masivo)."""
+    if usa_vectores():
+        productos.update(vector_busqueda=_vector_producto())
+    if not usa_fts5():
+        return
+    _escribir(_filas_productos(
+        productos.select_related('artista').only('id', 'nombre_producto', 'genero', 'descripcion', 'artista__nombre_artista')
+    ))
+
+
+@receiver(post_save, sender=Producto)
+def _producto_guardado(sender, instance, **kwargs):
+    if usa_fts5():
+        _escribir(_filas_productos([instance]))
+    elif usa_vectores():
+        Producto.objects.filter(pk=instance.pk).update(vector_busqueda=_vector_producto())
+
+
+@receiver(post_delete, sender=Producto)
+def _producto_borrado(sender, instance, **kwargs):
+    if usa_fts5():
+        _borrar('producto', instance.id)
+
+
+@receiver(post_save, sender=Artista)
+def _artista_guardado(sender, instance, created, **kwargs):
+    if usa_vectores():
+        Artista.objects.filter(pk=instance.pk).update(vector_busqueda=_vector_artista())
+        if not created:
+            Producto.objects.filter(artista=instance).update(vector_busqueda=_vector_producto())
+        return
+    if not usa_fts5():
+        return
+    _escribir(_filas_artistas([instance]))
+    if not created:
+        # El nombre del artista también está en las filas de sus productos
+        productos = Producto.objects.filter(artista=instance).only('id', 'nombre_producto', 'genero', 'descripcion')
+        for producto in productos:
+            producto.artista = instance
+        _escribir(_filas_productos(productos))
+
+
+@receiver(post_delete, sender=Artista)
+def _artista_borrado(sender, instance, **kwargs):
+    if usa_fts5():
+        _borrar('artista', instance.id)
+
+
+# ----------------------
+# Consultas
+# ----------------------
+def _url(tipo, nombre, artista):
+    params = {'artista': artista} if tipo == 'artista' else {'artista': artista, 'producto': nombre}
+    return f"{reverse('comprar_frontend')}?{urlencode(params)}"
+
+
+def _resultado(tipo, objeto_id, nombre, artista, genero):
+    return {
+        'tipo': tipo,
+        'id': objeto_id,
+        'nombre': nombre,
+        'artista': artista,
+        'genero': genero,
+        'url': _url(tipo, nombre, artista),
+    }
+
+
+def _conexion_lectura():
+    # SQL crudo: se elige la conexión igual que el router elegiría para el ORM
+    return connections[router.db_for_read(Producto)]
+
+
+def _buscar_fts(terminos, limite, tipo):
+    expresion = ' OR '.join(
+        ' '.join(f'"{t}"*' for t in grupo) for grupo in terminos
+    )
+    sql = (
+        f'SELECT tipo, objeto_id, nombre, artista, genero FROM {TABLA} '
+        f'WHERE {TABLA} MATCH %s'
+    )
+    params = [expresion]
+    if tipo:
+        sql += ' AND tipo = %s'
+        params.append(tipo)
+    sql += f' ORDER BY bm25({TABLA}, 0, 0, 10.0, 4.0, 2.0, 1.0) LIMIT %s'
+    params.append(limite)
+    with _conexion_lectura().cursor() as cursor:
+        cursor.execute(sql, params)
+        return [_resultado(*fila) for fila in cursor.fetchall()]
+
+
+def _corregir(palabra):
+    """Términos del vocabulario parecidos a `palabra` (mismo inicio de 1 letra).
+
+    Con largos a y b el parecido de difflib es a lo sumo 2·min(a, b)/(a + b):
+    los términos fuera de esa ventana no pueden llegar a CORTE y no se leen.
+    """
+    inicio = palabra[:1]
+    siguiente = chr(ord(inicio) + 1) if inicio else ''
+    minimo = int(len(palabra) * CORTE / (2 - CORTE))
+    maximo = int(len(palabra) * (2 - CORTE) / CORTE) + 1
+    with _conexion_lectura().cursor() as cursor:
+        cursor.execute(
+            f'SELECT term FROM {TABLA_VOCAB} WHERE term >= %s AND term < %s AND length(term) BETWEEN %s AND %s '
+            'ORDER BY doc DESC LIMIT %s',
+            [inicio, siguiente, minimo, maximo, MAX_VOCABULARIO],
+        )
+        vocabulario = [fila[0] for fila in cursor.fetchall()]
+    return difflib.get_close_matches(palabra, vocabulario, n=3, cutoff=CORTE)
+
+
+def _buscar_fts_tolerante(lista, limite, tipo):
+    resultados = _buscar_fts([lista], limite, tipo)
+    if resultados:
+        return resultados
+    # Sin coincidencias: cada palabra se sustituye por sus correcciones
+    opciones = [_corregir(p) or [p] for p in lista]
+    grupos = [[]]
+    for alternativas in opciones:
+        grupos = [g + [a] for g in grupos for a in alternativas][:9]
+    return _buscar_fts(grupos, limite, tipo)
+
+
+def _buscar_postgres(consulta, limite, tipo):
+    query = SearchQuery(' & '.join(f'{p}:*' for p in palabras(consulta)), search_type='raw', config='simple')
+    rango = SearchRank(F('vector_busqueda'), query)
+    resultados = []
+    if tipo in (None, 'artista'):
+        # vector_busqueda=query es `vector_busqueda @@ query`: lo resuelve el índice GIN
+        for a in (Artista.objects.filter(vector_busqueda=query).annotate(rango=rango)
+                  .only('id', 'nombre_artista').order_by('-rango')[:limite]):
+            resultados.append((a.rango, _resultado('artista', a.id, a.nombre_artista, a.nombre_artista, '')))
+    if tipo in (None, 'producto'):
+        for p in (Producto.objects.filter(vector_busqueda=query).select_related('artista').annotate(rango=rango)
+                  .only('id', 'nombre_producto', 'genero', 'artista__nombre_artista').order_by('-rango')[:limite]):
+            resultados.append((p.rango, _resultado('producto', p.id, p.nombre_producto, p.artista.nombre_artista, p.genero)))
+    resultados.sort(key=lambda r: -r[0])
+    return [r for _, r in resultados[:limite]]
+
+
+def _buscar_simple(consulta, limite, tipo):
+    resultados = []
+    filtro_artista = Q()
+    filtro_producto = Q()
+    for palabra in _PALABRA_RE.findall(consulta):
+        filtro_artista &= Q(nombre_artista__icontains=palabra)
+        filtro_producto &= (
+            Q(nombre_producto__icontains=palabra) | Q(artista__nombre_artista__icontains=palabra)
+            | Q(genero__icontains=palabra)
+        )
+    if tipo in (None, 'artista'):
+        for a in Artista.objects.filter(filtro_artista).order_by('nombre_artista')[:limite]:
+            resultados.append(_resultado('artista', a.id, a.nombre_artista, a.nombre_artista, ''))
+    if tipo in (None, 'producto'):
+        for p in Producto.objects.select_related('artista').filter(filtro_producto).order_by('nombre_producto')[:limite]:
+            resultados.append(_resultado('producto', p.id, p.nombre_producto, p.artista.nombre_artista, p.genero))
+    return resultados[:limite]
+
+
+def buscar(consulta, limite=LIMITE, tipo=None):
+    """Busca artistas y productos. `tipo` limita a 'artista' o 'producto'.
+
+    Devuelve una lista de dicts {tipo, id, nombre, artista, genero, url} ordenada por relevancia.
+    """
+    lista = palabras(consulta)
+    if not lista:
+        return []
+    if usa_fts5():
+        return _buscar_fts_tolerante(lista, limite, tipo)
+    if connection.vendor == 'postgresql':
+        return _buscar_postgres(consulta, limite, tipo)
+    return _buscar_simple(consulta, limite, tipo)
@@ -0,0 +1,307 @@
+"""Caché de páginas del catálogo público con invalidación por etiquetas.
+
+Cada página cacheada depende de un conjunto de etiquetas ('artistas',
+'artista:<nombre>', 'genero:<slug>', 'tipo:<slug>', 'novedades'). La clave de
+la página incluye la versión actual de sus etiquetas, así que invalidar es
+sólo incrementar la versión de una etiqueta: las páginas viejas dejan de
+leerse y caducan solas. Las señales de `Producto` y `Artista` incrementan
+únicamente las etiquetas afectadas por el cambio.
+
+El backend es el alias `catalogo` de `settings.CACHES` (memoria local por
+defecto, archivo o Redis según `AXOLOTL_CACHE_BACKEND`).
+
+`pagina_cacheada` acepta vistas async: en ese caso el usuario se resuelve con
+`request.auser()` y las llamadas al caché no bloquean el event loop (ver
+`_sin_bloquear`).
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from .carrito_anonimo import COOKIE as COOKIE_CARRITO
+from .models import Artista, Producto, normalizar_faceta
+
+ALIAS = 'catalogo'
+PREFIJO = 'axolotl:pagina'
+TIMEOUT = 60 * 60
+# Todas las páginas dependen de esta etiqueta (ver invalidar_todo)
+ETIQUETA_GLOBAL = '*'
+
+# El token CSRF es distinto para cada visitante: se guarda un marcador en su
+# lugar y se sustituye por el token de la petición al servir la página.
+_CSRF_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+_CSRF_MARCADOR = '__axolotl_csrf__'
+
+_contadores = Counter()
+_lock = threading.Lock()
+
+
+def _cache():
+    return caches[ALIAS]
+
+
+def _contar(evento, vista):
+    with _lock:
+        _contadores[(evento, vista)] += 1
+
+
+def estadisticas():
+    """Copia de los contadores {(evento, vista): n}; evento es 'hit', 'miss' o 'bypass'."""
+    with _lock:
+        return dict(_contadores)
+
+
+def reiniciar_estadisticas():
+    with _lock:
+        _contadores.clear()
+
+
+def metricas_prometheus():
+    """Contadores en formato de texto de Prometheus."""
+    lineas = [
+        '# HELP axolotl_cache_paginas_total Peticiones al caché de páginas del catálogo.',
+        '# TYPE axolotl_cache_paginas_total counter',
+    ]
+    for (evento, vista), n in sorted(estadisticas().items()):
+        lineas.append(f'axolotl_cache_paginas_total{{vista="{vista}",evento="{evento}"}} {n}')
+    return '\n'.join(lineas) + '\n'
+
+
+# ----------------------
+# Versiones de etiquetas
+# ----------------------
+def _clave_etiqueta(etiqueta):
+    digest = hashlib.md5(etiqueta.encode('utf-8')).hexdigest()
+    return f'{PREFIJO}:tag:{digest}'
+
+
+def versiones(etiquetas):
+    """Devuelve la versión actual de cada etiqueta (una sola ida al backend)."""
+    cache = _cache()
+    claves = {etiqueta: _clave_etiqueta(etiqueta) for etiqueta in etiquetas}
+    actuales = cache.get_many(list(claves.values()))
+    resultado = {}
+    for etiqueta, clave in claves.items():
+        version = actuales.get(clave)
+        if version is None:
+            # Arranca en un valor único para no reutilizar páginas de una versión desalojada
+            version = time.time_ns()
+            cache.add(clave, version, None)
+            version = cache.get(clave, version)
+        resultado[etiqueta] = version
+    return resultado
+
+
+def invalidar(*etiquetas):
+    """Invalida todas las páginas que dependen de alguna de las etiquetas."""
+    cache = _cache()
+    for etiqueta in set(etiquetas):
+        clave = _clave_etiqueta(etiqueta)
+        try:
+            cache.incr(clave)
+        except ValueError:
+            cache.set(clave, time.time_ns(), None)
+
+
+def invalidar_todo():
+    """Invalida todas las páginas (p.ej. después de escrituras masivas sin señales)."""
+    invalidar(ETIQUETA_GLOBAL)
+
+
+# ----------------------
+# Decorador de vistas
+# ----------------------
+async def _sin_bloquear(funcion, *args):
+    """Llama a una función del caché desde código async.
+
+    LocMemCache vive en memoria y responde sin E/S: se llama directo, sin
+    cambiar de hilo. Los backends de archivo y Redis hacen E/S bloqueante y
+    corren en el pool de hilos sin atarse al hilo principal (thread_sensitive=False),
+    a diferencia de los métodos a* por defecto de BaseCache.
+    """
+    if isinstance(_cache(), LocMemCache):
+        return funcion(*args)
+    return await sync_to_async(funcion, thread_sensitive=False)(*args)
+
+
+def _clave_pagina(nombre, request, etiquetas, version):
+    firma = '|'.join(f'{e}={version[e]}' for e in etiquetas)
+    query = request.GET.urlencode()
+    digest = hashlib.md5(f'{query}|{firma}'.encode('utf-8')).hexdigest()
+    return f'{PREFIJO}:{nombre}:{digest}'
+
+
+def _para_guardar(response):
+    if response.status_code != 200 or response.streaming:
+        return None
+    contenido = _CSRF_RE.sub(rf'\g<1>{_CSRF_MARCADOR}\g<2>', response.content.decode(response.charset))
+    return contenido, response['Content-Type']
+
+
+def _cacheable(request):
+    # Con sesión iniciada o con carrito de visitante la página lleva datos propios (badge del carrito)
+    return request.method == 'GET' and not request.user.is_authenticated and COOKIE_CARRITO not in request.COOKIES
+
+
+def pagina_cacheada(etiquetas_de):
+    """Cachea la respuesta HTML de una vista pública para visitantes anónimos.
+
+    `etiquetas_de(request)` devuelve las etiquetas de las que depende la página.
+    La clave incluye la vista, la query string y las versiones de esas etiquetas.
+    """
+    def decorador(vista):
+        nombre = vista.__name__
+
+        if iscoroutinefunction(vista):
+            @wraps(vista)
+            async def envoltura_async(request, *args, **kwargs):
+                request.user = await request.auser()
+                if not _cacheable(request):
+                    _contar('bypass', nombre)
+                    return await vista(request, *args, **kwargs)
+
+                cache = _cache()
+                etiquetas = sorted({*etiquetas_de(request), ETIQUETA_GLOBAL})
+                clave = _clave_pagina(nombre, request, etiquetas, await _sin_bloquear(versiones, etiquetas))
+                guardada = await _sin_bloquear(cache.get, clave)
+                if guardada is not None:
+                    _contar('hit', nombre)
+                    return _responder(request, *guardada)
+
+                _contar('miss', nombre)
+                response = await vista(request, *args, **kwargs)
+                valor = _para_guardar(response)
+                if valor is not None:
+                    await _sin_bloquear(cache.set, clave, valor, TIMEOUT)
+                return response
+            return envoltura_async
+
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if not _cacheable(request):
+                _contar('bypass', nombre)
+                return vista(request, *args, **kwargs)
+
+            cache = _cache()
+            etiquetas = sorted({*etiquetas_de(request), ETIQUETA_GLOBAL})
+            clave = _clave_pagina(nombre, request, etiquetas, versiones(etiquetas))
+            guardada = cache.get(clave)
+            if guardada is not None:
+                _contar('hit', nombre)
+                return _responder(request, *guardada)
+
+            _contar('miss', nombre)
+            response = vista(request, *args, **kwargs)
+            valor = _para_guardar(response)
+            if valor is not None:
+                cache.set(clave, valor, TIMEOUT)
+            return response
+        return envoltura
+    return decorador
+
+
+def _responder(request, contenido, content_type):
+    if _CSRF_MARCADOR in contenido:
+        contenido = contenido.replace(_CSRF_MARCADOR, get_token(request))
+    return HttpResponse(contenido, content_type=content_type)
+
+
+# Etiquetas de cada página pública
+def etiquetas_artistas(request):
+    return ['artistas']
+
+
+def etiquetas_inicio(request):
+    return ['artistas', 'novedades']
+
+
+def etiquetas_comprar(request):
+    return [f"artista:{request.GET.get('artista', '')}"]
+
+
+def etiquetas_genero(request):
+    return [f"genero:{normalizar_faceta(request.GET.get('genero'))}"]
+
+
+def etiquetas_tipo(request):
+    return [f"tipo:{normalizar_faceta(request.GET.get('tipo', 'Vinilo'))}"]
+
+
+def etiquetas_novedades(request):
+    return ['novedades']
+
+
+# ----------------------
+# Invalidación por señales
+# ----------------------
+def etiquetas_producto(artista_nombre, genero_slug, tipo_slug, novedad):
+    etiquetas = [
+        f'artista:{artista_nombre}',
+        f'genero:{genero_slug}',
+        'genero:',  # "Todos los Géneros"
+        f'tipo:{tipo_slug}',
+    ]
+    if novedad:
+        etiquetas.append('novedades')
+    return etiquetas
+
+
+@receiver(pre_save, sender=Producto)
+def _producto_pre_save(sender, instance, **kwargs):
+    # Guarda los valores anteriores para invalidar también las páginas donde estaba
+    instance._etiquetas_previas = []
+    if instance.pk:
+        anterior = (
+            Producto.objects.filter(pk=instance.pk)
+            .values_list('artista__nombre_artista', 'genero_slug', 'tipo_slug', 'novedad')
+            .first()
+        )
+        if anterior:
+            instance._etiquetas_previas = etiquetas_producto(*anterior)
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def _producto_cambiado(sender, instance, **kwargs):
+    try:
+        artista_nombre = instance.artista.nombre_artista
+    except Artista.DoesNotExist:
+        artista_nombre = ''
+    etiquetas = etiquetas_producto(artista_nombre, instance.genero_slug, instance.tipo_slug, instance.novedad)
+    invalidar(*etiquetas, *getattr(instance, '_etiquetas_previas', []))
+
+
+@receiver(pre_save, sender=Artista)
+def _artista_pre_save(sender, instance, **kwargs):
+    instance._nombre_previo = None
+    if instance.pk:
+        instance._nombre_previo = (
+            Artista.objects.filter(pk=instance.pk).values_list('nombre_artista', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Artista)
+@receiver(post_delete, sender=Artista)
+def _artista_cambiado(sender, instance, **kwargs):
+    etiquetas = ['artistas', f'artista:{instance.nombre_artista}']
+    nombre_previo = getattr(instance, '_nombre_previo', None)
+    if nombre_previo:
+        etiquetas.append(f'artista:{nombre_previo}')
+    # El nombre del artista aparece en las tarjetas de género/tipo/novedades
+    facetas = Producto.objects.filter(artista_id=instance.pk).values_list('genero_slug', 'tipo_slug', 'novedad').distinct()
+    for genero_slug, tipo_slug, novedad in facetas:
+        etiquetas.extend([f'genero:{genero_slug}', 'genero:', f'tipo:{tipo_slug}'])
+        if novedad:
+            etiquetas.append('novedades')
+    invalidar(*etiquetas)
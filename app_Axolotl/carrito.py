@@ -0,0 +1,125 @@
+"""Operaciones sobre el carrito que mantienen los contadores de `Cart`.
+
+`Cart.num_items` (productos distintos) y `Cart.total_cantidad` (unidades) se
+actualizan con expresiones F() dentro de la misma transacción que modifica
+los `CartItem`, así que no hace falta contar filas para pintar el badge del
+navbar. El número también se copia en la sesión (`SESION_CUENTA`) para que
+la etiqueta `get_cart_count` no toque la base de datos.
+
+Con reservas activas (`reservas.py`) cada cambio de cantidad reserva el
+nuevo total en la misma transacción; si no alcanza el stock se lanza
+`reservas.SinExistencias` sin modificar el carrito.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import reservas
+from .models import Cart, CartItem
+
+SESION_CUENTA = 'carrito_cuenta'
+
+
+def _ajustar_contadores(cart, delta_items, delta_cantidad):
+    Cart.objects.filter(pk=cart.pk).update(
+        num_items=F('num_items') + delta_items,
+        total_cantidad=F('total_cantidad') + delta_cantidad,
+        updated=timezone.now(),
+    )
+
+
+def agregar_producto(cart, producto, cantidad=1):
+    """Suma `cantidad` unidades de `producto` al carrito (crea el item si no existe)."""
+    with transaction.atomic():
+        if reservas.activas():
+            actual = CartItem.objects.filter(cart=cart, producto=producto).aggregate(n=Sum('cantidad'))['n'] or 0
+            reservas.reservar(cart, producto, actual + cantidad)
+        actualizados = CartItem.objects.filter(cart=cart, producto=producto).update(
+            cantidad=F('cantidad') + cantidad
+        )
+        nuevo = 0
+        if not actualizados:
+            try:
+                with transaction.atomic():
+                    CartItem.objects.create(cart=cart, producto=producto, cantidad=cantidad)
+                nuevo = 1
+            except IntegrityError:
+                # Otra petición creó el item entre el UPDATE y el INSERT (cartitem_cart_producto_uniq)
+                CartItem.objects.filter(cart=cart, producto=producto).update(cantidad=F('cantidad') + cantidad)
+        _ajustar_contadores(cart, nuevo, cantidad)
+    cart.refresh_from_db(fields=['num_items', 'total_cantidad', 'updated'])
+
+
+def cambiar_cantidad(item, cantidad):
+    """Fija la cantidad de un item; si es 0 o menor se elimina."""
+    if cantidad <= 0:
+        return eliminar_item(item)
+    with transaction.atomic():
+        anterior = CartItem.objects.select_for_update().values_list('cantidad', flat=True).get(pk=item.pk)
+        if reservas.activas():
+            reservas.reservar(item.cart, item.producto, cantidad)
+        CartItem.objects.filter(pk=item.pk).update(cantidad=cantidad)
+        _ajustar_contadores(item.cart, 0, cantidad - anterior)
+    item.cantidad = cantidad
+    item.cart.refresh_from_db(fields=['num_items', 'total_cantidad', 'updated'])
+
+
+def eliminar_item(item):
+    with transaction.atomic():
+        anterior = CartItem.objects.select_for_update().values_list('cantidad', flat=True).filter(pk=item.pk).first()
+        if anterior is None:
+            return
+        CartItem.objects.filter(pk=item.pk).delete()
+        if reservas.activas():
+            reservas.liberar(item.cart, item.producto_id)
+        _ajustar_contadores(item.cart, -1, -anterior)
+    item.cart.refresh_from_db(fields=['num_items', 'total_cantidad', 'updated'])
+
+
+def vaciar(cart):
+    with transaction.atomic():
+        cart.items.all().delete()
+        if reservas.activas():
+            reservas.liberar(cart)
+        Cart.objects.filter(pk=cart.pk).update(num_items=0, total_cantidad=0, updated=timezone.now())
+    cart.num_items = cart.total_cantidad = 0
+
+
+def guardar_en_sesion(request, cart):
+    """Copia el contador del carrito en la sesión para el badge del navbar."""
+    request.session[SESION_CUENTA] = cart.num_items if cart is not None else 0
+
+
+async def acuenta_en_sesion(request):
+    """Versión async del badge: deja la cuenta en la sesión para que `get_cart_count` no consulte la BD."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return 0
+    cuenta = await request.session.aget(SESION_CUENTA)
+    if cuenta is None:
+        cuenta = await Cart.objects.filter(usuario__user=user).values_list('num_items', flat=True).afirst() or 0
+        await request.session.aset(SESION_CUENTA, cuenta)
+    return cuenta
+
+
+def reconciliar_contadores(carts=None):
+    """Recalcula los contadores desde `CartItem` en un solo UPDATE.
+
+    Devuelve cuántos carritos tenían contadores desfasados antes de repararlos.
+    """
+    if carts is None:
+        carts = Cart.objects.all()
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    reales = carts.annotate(
+        real_items=Coalesce(Subquery(items.annotate(n=Count('id')).values('n')), Value(0), output_field=IntegerField()),
+        real_cantidad=Coalesce(Subquery(items.annotate(n=Sum('cantidad')).values('n')), Value(0), output_field=IntegerField()),
+    )
+    desfasados = reales.exclude(num_items=F('real_items'), total_cantidad=F('real_cantidad'))
+    ids = list(desfasados.values_list('pk', flat=True))
+    if ids:
+        Cart.objects.filter(pk__in=ids).update(
+            num_items=Coalesce(Subquery(items.annotate(n=Count('id')).values('n')), Value(0), output_field=IntegerField()),
+            total_cantidad=Coalesce(Subquery(items.annotate(n=Sum('cantidad')).values('n')), Value(0), output_field=IntegerField()),
+        )
+    return len(ids)
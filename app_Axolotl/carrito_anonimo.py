@@ -0,0 +1,152 @@
+"""Carrito de visitantes sin sesión iniciada, guardado en una cookie firmada.
+
+Agregar, cambiar o quitar productos sólo reescribe la cookie: no se crea
+sesión ni se escribe en la base, así que navegar y llenar el carrito sin
+cuenta no carga la BD. El formato es compacto (`id:cantidad,id:cantidad`);
+la cookie va firmada, no cifrada, porque sólo lleva ids y cantidades.
+
+Al iniciar sesión o registrarse, `fusionar` pasa los productos al `Cart`
+persistente con un solo upsert sobre (cart, producto) y la vista borra la
+cookie.
+
+Las páginas que `pagina_cacheada` guarda para anónimos no muestran carrito:
+las peticiones que traen la cookie no usan el caché.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.core import signing
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection, transaction
+
+from . import carrito, reservas
+from .models import Cart, CartItem, Producto
+
+COOKIE = 'axolotl_carrito'
+SAL = 'axolotl.carrito'
+MAX_EDAD = timedelta(days=30)
+# Mantiene la cookie muy por debajo de los 4 KB
+MAX_PRODUCTOS = 50
+MAX_CANTIDAD = 99
+
+
+class CarritoLleno(ValueError):
+    pass
+
+
+@dataclass
+class ItemAnonimo:
+    producto: Producto
+    cantidad: int
+
+    def subtotal(self):
+        return self.cantidad * self.producto.precio
+
+
+# ----------------------
+# Cookie
+# ----------------------
+def _decodificar(valor):
+    items = {}
+    for par in (valor or '').split(','):
+        producto_id, _, cantidad = par.partition(':')
+        if producto_id.isdigit() and cantidad.isdigit() and int(cantidad) > 0:
+            items[int(producto_id)] = min(int(cantidad), MAX_CANTIDAD)
+    return items
+
+
+def leer(request):
+    """{producto_id: cantidad}; vacío si no hay cookie o la firma no es válida."""
+    if COOKIE not in request.COOKIES:
+        return {}
+    try:
+        valor = request.get_signed_cookie(COOKIE, salt=SAL, max_age=MAX_EDAD)
+    except (KeyError, signing.BadSignature):
+        return {}
+    return _decodificar(valor)
+
+
+def guardar(response, items):
+    if not items:
+        borrar(response)
+        return
+    valor = ','.join(f'{producto_id}:{cantidad}' for producto_id, cantidad in items.items())
+    response.set_signed_cookie(
+        COOKIE, valor, salt=SAL, max_age=int(MAX_EDAD.total_seconds()), httponly=True, samesite='Lax',
+    )
+
+
+def borrar(response):
+    response.delete_cookie(COOKIE, samesite='Lax')
+
+
+def cuenta(request):
+    return len(leer(request))
+
+
+# ----------------------
+# Operaciones (sólo sobre el dict)
+# ----------------------
+def agregar(items, producto_id, cantidad=1):
+    if producto_id not in items and len(items) >= MAX_PRODUCTOS:
+        raise CarritoLleno(f'El carrito admite hasta {MAX_PRODUCTOS} productos distintos.')
+    items[producto_id] = min(items.get(producto_id, 0) + max(cantidad, 1), MAX_CANTIDAD)
+    return items
+
+
+def cambiar(items, producto_id, cantidad):
+    if cantidad <= 0:
+        items.pop(producto_id, None)
+    elif producto_id in items:
+        items[producto_id] = min(cantidad, MAX_CANTIDAD)
+    return items
+
+
+def para_mostrar(items):
+    """ItemAnonimo por cada producto que todavía existe (una consulta)."""
+    productos = Producto.objects.select_related('artista').in_bulk(list(items))
+    return [ItemAnonimo(productos[pid], cantidad) for pid, cantidad in items.items() if pid in productos]
+
+
+# ----------------------
+# Fusión al iniciar sesión
+# ----------------------
+def fusionar(request, user):
+    """Suma el carrito de la cookie al `Cart` del usuario; devuelve el cart o None."""
+    items = leer(request)
+    if not items:
+        return None
+    try:
+        usuario = user.usuario
+    except ObjectDoesNotExist:
+        return None
+    existentes = set(Producto.objects.filter(pk__in=items).values_list('pk', flat=True))
+    items = {pid: cantidad for pid, cantidad in items.items() if pid in existentes}
+
+    with transaction.atomic():
+        cart, _ = Cart.objects.get_or_create(usuario=usuario)
+        actuales = dict(CartItem.objects.filter(cart=cart, producto_id__in=items).values_list('producto_id', 'cantidad'))
+        totales = {pid: actuales.get(pid, 0) + cantidad for pid, cantidad in items.items()}
+        if reservas.activas():
+            for producto in Producto.objects.filter(pk__in=totales).only('id', 'nombre_producto'):
+                try:
+                    reservas.reservar(cart, producto, totales[producto.pk])
+                except reservas.SinExistencias as error:
+                    # Se queda con lo que alcance, sin bajar lo que el carrito ya tenía
+                    totales[producto.pk] = actuales.get(producto.pk, 0)
+                    if error.disponibles > totales[producto.pk]:
+                        reservas.reservar(cart, producto, error.disponibles)
+                        totales[producto.pk] = error.disponibles
+        filas = [CartItem(cart=cart, producto_id=pid, cantidad=cantidad) for pid, cantidad in totales.items() if cantidad]
+        if connection.features.supports_update_conflicts_with_target:
+            CartItem.objects.bulk_create(
+                filas, update_conflicts=True, unique_fields=['cart', 'producto'], update_fields=['cantidad'],
+            )
+        else:
+            CartItem.objects.bulk_create([f for f in filas if f.producto_id not in actuales])
+            for fila in filas:
+                if fila.producto_id in actuales:
+                    CartItem.objects.filter(cart=cart, producto_id=fila.producto_id).update(cantidad=fila.cantidad)
+        carrito.reconciliar_contadores(Cart.objects.filter(pk=cart.pk))
+    cart.refresh_from_db(fields=['num_items', 'total_cantidad', 'updated'])
+    return cart
@@ -0,0 +1,103 @@
+"""Consultas del catálogo para las páginas públicas (artistas, comprar, género, tipo).
+
+Cada página obtiene sus productos en una sola consulta con el artista unido
+y sólo las columnas que usan las plantillas; el reparto por formato se hace
+en Python para no lanzar una consulta por cada tipo.
+
+El índice A-Z de artistas usa la columna `Artista.inicial`: el conteo por
+letra y los artistas de una letra salen del índice (inicial, nombre, id).
+"""
+from django.db.models import Count
+
+from .models import LETRAS, Artista, Producto
+
+# (clave en el contexto de la plantilla, tipo_slug)
+FORMATOS = (
+    ('vinilos', 'vinilo'),
+    ('cds', 'cd'),
+    ('cassettes', 'casete'),
+)
+
+# Columnas que leen las tarjetas de comprar.html / genero.html / tipo.html
+CAMPOS_TARJETA = (
+    'id', 'nombre_producto', 'precio', 'img', 'genero', 'tipo', 'tipo_slug',
+    'artista__id', 'artista__nombre_artista',
+)
+
+
+def productos_tarjeta(queryset=None):
+    """Aplica el join con el artista y la proyección de columnas de las tarjetas."""
+    if queryset is None:
+        queryset = Producto.objects.all()
+    return queryset.select_related('artista').only(*CAMPOS_TARJETA)
+
+
+def particionar_por_formato(productos):
+    """Reparte un iterable de productos en {'vinilos': [...], 'cds': [...], 'cassettes': [...]}."""
+    clave_por_slug = {slug: clave for clave, slug in FORMATOS}
+    grupos = {clave: [] for clave, _ in FORMATOS}
+    for producto in productos:
+        clave = clave_por_slug.get(producto.tipo_slug)
+        if clave is not None:
+            grupos[clave].append(producto)
+    return grupos
+
+
+def conteo_por_inicial():
+    """[(letra, cantidad de artistas)] para todas las LETRAS, en orden."""
+    conteos = dict(Artista.objects.order_by().values_list('inicial').annotate(n=Count('id')))
+    return [(letra, conteos.get(letra, 0)) for letra in LETRAS]
+
+
+def artistas_de_inicial(letra):
+    return Artista.objects.filter(inicial=letra).order_by('nombre_artista', 'id').only('id', 'nombre_artista')
+
+
+def _de_artista(artista):
+    return productos_tarjeta(Producto.objects.filter(artista=artista)).order_by('id')
+
+
+def _de_genero(genero_slug):
+    productos = Producto.objects.all()
+    if genero_slug:
+        productos = productos.filter(genero_slug=genero_slug)
+    return productos_tarjeta(productos).order_by('nombre_producto')
+
+
+def _de_tipo(tipo_slug):
+    return productos_tarjeta(Producto.objects.filter(tipo_slug=tipo_slug)).order_by('nombre_producto')
+
+
+def _agrupar_por_artista(productos):
+    por_artista = {}
+    for producto in productos:
+        por_artista.setdefault(producto.artista.nombre_artista, []).append(producto)
+    return productos, por_artista
+
+
+def productos_de_artista(artista):
+    """Productos de un artista agrupados por formato (una consulta)."""
+    return particionar_por_formato(_de_artista(artista))
+
+
+def productos_de_genero(genero_slug=None):
+    """Productos de un género (o de todos si no se indica) agrupados por formato (una consulta)."""
+    return particionar_por_formato(_de_genero(genero_slug))
+
+
+def productos_de_tipo(tipo_slug):
+    """Productos de un tipo ordenados por nombre y agrupados por artista (una consulta)."""
+    return _agrupar_por_artista(list(_de_tipo(tipo_slug)))
+
+
+# Versiones para las vistas async (misma consulta con el ORM asíncrono)
+async def aproductos_de_artista(artista):
+    return particionar_por_formato([p async for p in _de_artista(artista)])
+
+
+async def aproductos_de_genero(genero_slug=None):
+    return particionar_por_formato([p async for p in _de_genero(genero_slug)])
+
+
+async def aproductos_de_tipo(tipo_slug):
+    return _agrupar_por_artista([p async for p in _de_tipo(tipo_slug)])
@@ -0,0 +1,102 @@
+"""Conversión atómica de un `Cart` en `Pedido` + `DetallePedido`.
+
+Todo ocurre en una transacción con un número fijo de consultas sin importar
+cuántos productos tenga el carrito:
+
+1. se leen los items con sus productos bloqueados (`select_for_update`),
+2. un único UPDATE descuenta el stock de todos los productos, condicionado a
+   que cada uno tenga existencias suficientes; si alguna fila no se actualiza
+   la transacción se revierte,
+3. se crean el `Pedido` y todos los `DetallePedido` con `bulk_create`,
+4. se vacía el carrito (y se liberan sus reservas).
+
+Con reservas activas, el stock que cuenta es el que no tienen apartado otros
+carritos con una reserva vigente.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+
+from . import carrito, estadisticas, reservas, ventas
+from .models import CartItem, DetallePedido, Pedido, Producto
+
+
+class CheckoutError(Exception):
+    """Error de negocio al finalizar la compra (carrito vacío, sin stock...)."""
+
+
+class CarritoVacio(CheckoutError):
+    pass
+
+
+class StockInsuficiente(CheckoutError):
+    def __init__(self, productos):
+        self.productos = productos
+        nombres = ', '.join(p.nombre_producto for p in productos)
+        super().__init__(f'Stock insuficiente para: {nombres}')
+
+
+def crear_pedido(cart):
+    """Crea el pedido del carrito, descuenta stock y vacía el carrito.
+
+    Lanza `CarritoVacio` o `StockInsuficiente` sin modificar nada.
+    """
+    with transaction.atomic():
+        # Cantidades por producto; (cart, producto) es único en CartItem
+        cantidades = dict(CartItem.objects.filter(cart=cart).values_list('producto_id', 'cantidad'))
+        if not cantidades:
+            raise CarritoVacio('El carrito está vacío.')
+
+        # Bloquea las filas en orden de id para evitar interbloqueos entre compras
+        productos = list(
+            Producto.objects.select_for_update()
+            .filter(id__in=cantidades)
+            .order_by('id')
+            .only('id', 'artista_id', 'nombre_producto', 'genero', 'tipo', 'precio', 'stock')
+        )
+        apartado = reservas.reservado_por_otros(cantidades, cart.pk) if reservas.activas() else {}
+        sin_stock = [p for p in productos if p.stock - apartado.get(p.id, 0) < cantidades[p.id]]
+        if sin_stock:
+            raise StockInsuficiente(sin_stock)
+
+        # Un solo UPDATE condicional; el WHERE protege aunque el backend no bloquee filas
+        condicion = Q()
+        for producto_id, cantidad in cantidades.items():
+            condicion |= Q(id=producto_id, stock__gte=cantidad)
+        actualizados = Producto.objects.filter(condicion).update(
+            stock=Case(
+                *[When(id=producto_id, then=F('stock') - cantidad) for producto_id, cantidad in cantidades.items()],
+                default=F('stock'),
+                output_field=PositiveIntegerField(),
+            )
+        )
+        if actualizados != len(cantidades):
+            agotados = Producto.objects.filter(id__in=cantidades).only('nombre_producto', 'stock')
+            raise StockInsuficiente([p for p in agotados if p.stock < cantidades[p.id]] or list(agotados))
+
+        usuario_id = cart.usuario_id
+        total = sum((p.precio * cantidades[p.id] for p in productos), Decimal('0'))
+        pedido = Pedido.objects.create(
+            usuario_id=usuario_id,
+            cantidad_producto=sum(cantidades.values()),
+            total=total,
+        )
+        detalles = DetallePedido.objects.bulk_create([
+            DetallePedido(
+                pedido=pedido,
+                usuario_id=usuario_id,
+                producto=p,
+                cantidad_producto=cantidades[p.id],
+                precio=p.precio,
+                total=p.precio * cantidades[p.id],
+            )
+            for p in productos
+        ])
+        # bulk_create no dispara señales: se registran las ventas a mano
+        estadisticas.registrar_detalles([(p.artista_id, d.cantidad_producto, d.total) for p, d in zip(productos, detalles)])
+        ventas.registrar([ventas.linea(d, p) for p, d in zip(productos, detalles)])
+        # El UPDATE de stock no dispara señales
+        estadisticas.tocar_version('producto')
+        carrito.vaciar(cart)
+    return pedido
@@ -0,0 +1,140 @@
+"""Catálogo, clientes, carritos y pedidos sintéticos para medir rendimiento.
+
+`generar` siembra N artistas, M productos repartidos entre `TIPOS` y
+`GENEROS` y K clientes con carrito e historial de pedidos. Todo se escribe
+con `bulk_create` en lotes y con una semilla fija, así que los mismos
+parámetros dan siempre los mismos datos.
+
+Como en `importacion`, las escrituras masivas no disparan señales: al final
+se hace una sola vez lo que harían (slugs de facetas, contadores de los
+carritos, estadísticas, ventas por día, versiones de la API, caché de
+páginas e índice de búsqueda).
+
+Todos los nombres llevan `PREFIJO`, así que `limpiar` puede borrarlos de una
+base con datos reales.
+"""
+import random
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import busqueda, cache_catalogo, carrito, estadisticas, ventas
+from .models import Artista, Cart, CartItem, DetallePedido, Pedido, Producto, Usuario, inicial_de, normalizar_faceta
+
+PREFIJO = 'sintetico-'
+CLAVE = 'sintetico-clave'
+LOTE = 2000
+TIPOS = ['Vinilo', 'CD', 'Casete']
+GENEROS = ['Pop', 'Rock', 'K-Pop', 'Indie', 'Hip Hop', 'Electrónica', 'Jazz', 'Reggaetón']
+
+
+@dataclass
+class Resumen:
+    artistas: int = 0
+    productos: int = 0
+    clientes: int = 0
+    items: int = 0
+    pedidos: int = 0
+    detalles: int = 0
+
+
+def usuario_cliente(i):
+    return f'{PREFIJO}cliente-{i}'
+
+
+def usuario_staff():
+    return f'{PREFIJO}staff'
+
+
+def generar(artistas=50, productos=2000, clientes=200, pedidos=5, items=3, semilla=1):
+    """Siembra los datos y devuelve un `Resumen` con lo creado.
+
+    `pedidos` e `items` son por cliente: pedidos con 1 a 3 detalles cada uno
+    y carritos con `items` productos distintos.
+    """
+    azar = random.Random(semilla)
+    resumen = Resumen()
+    with transaction.atomic():
+        nuevos = Artista.objects.bulk_create([
+            Artista(nombre_artista=f'{PREFIJO}artista-{i}', inicial=inicial_de(PREFIJO), descripcion=f'Artista sintético {i}')
+            for i in range(artistas)
+        ], batch_size=LOTE)
+        resumen.artistas = len(nuevos)
+
+        filas = []
+        for i in range(productos):
+            genero, tipo = azar.choice(GENEROS), TIPOS[i % len(TIPOS)]
+            filas.append(Producto(
+                artista=nuevos[i % len(nuevos)], nombre_producto=f'{PREFIJO}producto-{i}',
+                genero=genero, tipo=tipo, genero_slug=normalizar_faceta(genero), tipo_slug=normalizar_faceta(tipo),
+                descripcion='', stock=azar.randint(0, 500), precio=Decimal(azar.randint(9900, 99900)) / 100,
+                novedad=azar.random() < 0.05,
+            ))
+        catalogo = Producto.objects.bulk_create(filas, batch_size=LOTE)
+        resumen.productos = len(catalogo)
+
+        # Todos comparten la misma clave: PBKDF2 se calcula una sola vez
+        clave = make_password(CLAVE)
+        User.objects.create_user(username=usuario_staff(), email=f'{usuario_staff()}@axolotl.test', password=CLAVE, is_staff=True)
+        User.objects.bulk_create([
+            User(username=usuario_cliente(i), email=f'{usuario_cliente(i)}@axolotl.test', password=clave)
+            for i in range(clientes)
+        ], batch_size=LOTE)
+        users = User.objects.filter(username__startswith=f'{PREFIJO}cliente-').order_by('id')
+        perfiles = Usuario.objects.bulk_create([
+            Usuario(user=user, nombre=user.username, email=user.email) for user in users.only('id', 'username', 'email')
+        ], batch_size=LOTE)
+        resumen.clientes = len(perfiles)
+
+        carts = Cart.objects.bulk_create([Cart(usuario=perfil) for perfil in perfiles], batch_size=LOTE)
+        items_carrito = [
+            CartItem(cart=cart, producto=producto, cantidad=azar.randint(1, 3))
+            for cart in carts for producto in azar.sample(catalogo, min(items, len(catalogo)))
+        ]
+        resumen.items = len(CartItem.objects.bulk_create(items_carrito, batch_size=LOTE))
+        carrito.reconciliar_contadores(Cart.objects.filter(usuario__in=perfiles))
+
+        lineas_por_pedido = [
+            (perfil, azar.sample(catalogo, min(azar.randint(1, 3), len(catalogo))))
+            for perfil in perfiles for _ in range(pedidos)
+        ]
+        cantidades = [[azar.randint(1, 2) for _ in lineas] for _, lineas in lineas_por_pedido]
+        nuevos_pedidos = Pedido.objects.bulk_create([
+            Pedido(
+                usuario=perfil, cantidad_producto=sum(cant),
+                total=sum((p.precio * c for p, c in zip(lineas, cant)), Decimal(0)),
+            )
+            for (perfil, lineas), cant in zip(lineas_por_pedido, cantidades)
+        ], batch_size=LOTE)
+        resumen.pedidos = len(nuevos_pedidos)
+        resumen.detalles = len(DetallePedido.objects.bulk_create([
+            DetallePedido(
+                pedido=pedido, usuario=perfil, producto=producto, cantidad_producto=c,
+                precio=producto.precio, total=producto.precio * c,
+            )
+            for pedido, (perfil, lineas), cant in zip(nuevos_pedidos, lineas_por_pedido, cantidades)
+            for producto, c in zip(lineas, cant)
+        ], batch_size=LOTE))
+
+        _despues_de_escribir()
+    return resumen
+
+
+def limpiar():
+    """Borra todo lo que lleva `PREFIJO` (clientes con sus pedidos y carritos, artistas con sus productos)."""
+    with transaction.atomic():
+        User.objects.filter(username__startswith=PREFIJO).delete()
+        Usuario.objects.filter(email__startswith=PREFIJO).delete()
+        Artista.objects.filter(nombre_artista__startswith=PREFIJO).delete()
+        _despues_de_escribir()
+
+
+def _despues_de_escribir():
+    estadisticas.recalcular()
+    ventas.recalcular()
+    estadisticas.tocar_version(*estadisticas.VERSIONADAS)
+    cache_catalogo.invalidar_todo()
+    busqueda.reindexar()
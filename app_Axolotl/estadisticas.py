@@ -0,0 +1,291 @@
+"""Estadísticas del panel de administración mantenidas incrementalmente.
+
+En lugar de hacer COUNT(*) sobre las tablas en cada carga del dashboard, los
+contadores viven en `Estadistica` y se ajustan con UPDATE ... F() desde las
+señales de los modelos. Los pedidos e ingresos se acumulan por hora en
+`EstadisticaHora` y las ventas por artista en `EstadisticaArtista`, así que
+`resumen()` hace un número fijo de consultas pequeñas e indexadas.
+
+Las escrituras masivas que no disparan señales (bulk_create, update) deben
+llamar a `registrar_detalles()`/`incrementar()` o correr después
+`manage.py recalcular_estadisticas`; los borrados masivos, a
+`descontar_pedidos()`/`descontar_detalles()` antes de borrar.
+
+También guarda la versión de cada tabla del catálogo (`version:<tabla>`):
+los microsegundos de la última escritura, siempre crecientes. La API JSON
+arma con ellas sus ETag y Last-Modified; las escrituras masivas deben
+llamar a `tocar_version()`.
+"""
+import time
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest, TruncHour
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    Artista, DetallePedido, Estadistica, EstadisticaArtista, EstadisticaHora,
+    Pedido, Producto, Usuario,
+)
+
+# clave del contador -> modelo que cuenta
+CONTADORES = {
+    'clientes': Usuario,
+    'artistas': Artista,
+    'productos': Producto,
+    'pedidos': Pedido,
+}
+
+STOCK_BAJO = 5
+
+# tabla -> modelo cuya versión se lleva para los ETag de la API
+VERSIONADAS = {
+    'artista': Artista,
+    'producto': Producto,
+}
+
+
+def _inicio_hora(fecha):
+    return fecha.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0) if fecha else None
+
+
+def _decimal(valor):
+    # Las vistas del panel guardan totales como float
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+
+
+def _upsert(modelo, filtro, **deltas):
+    """Suma `deltas` a la fila de `filtro`, creándola si no existe."""
+    cambios = {campo: F(campo) + delta for campo, delta in deltas.items()}
+    if modelo.objects.filter(**filtro).update(**cambios):
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**filtro, **deltas)
+    except IntegrityError:
+        # Otro proceso creó la fila entre el UPDATE y el INSERT
+        modelo.objects.filter(**filtro).update(**cambios)
+
+
+def incrementar(clave, delta=1):
+    if delta > 0:
+        _upsert(Estadistica, {'clave': clave}, valor=delta)
+    elif delta < 0:
+        Estadistica.objects.filter(clave=clave).update(valor=F('valor') + delta)
+
+
+def registrar_pedido(fecha, total, signo=1):
+    hora = _inicio_hora(fecha)
+    if signo > 0:
+        _upsert(EstadisticaHora, {'hora': hora}, pedidos=1, ingresos=total)
+    else:
+        EstadisticaHora.objects.filter(hora=hora).update(pedidos=F('pedidos') - 1, ingresos=F('ingresos') - total)
+
+
+def registrar_detalles(detalles, signo=1):
+    """Acumula unidades e ingresos por artista de una lista de (artista_id, cantidad, total)."""
+    por_artista = defaultdict(lambda: [0, Decimal('0')])
+    for artista_id, cantidad, total in detalles:
+        por_artista[artista_id][0] += cantidad
+        por_artista[artista_id][1] += _decimal(total)
+    for artista_id, (unidades, ingresos) in por_artista.items():
+        if signo > 0:
+            _upsert(EstadisticaArtista, {'artista_id': artista_id}, unidades=unidades, ingresos=ingresos)
+        else:
+            EstadisticaArtista.objects.filter(artista_id=artista_id).update(
+                unidades=F('unidades') - unidades, ingresos=F('ingresos') - ingresos,
+            )
+
+
+def descontar_pedidos(pedidos):
+    """Resta de `EstadisticaHora` un QuerySet de pedidos que se va a borrar sin señales (un UPDATE por hora)."""
+    por_hora = (
+        pedidos.annotate(h=TruncHour('fecha', tzinfo=dt_timezone.utc))
+        .order_by().values('h').annotate(n=Count('id'), t=Sum('total'))
+    )
+    for fila in por_hora:
+        EstadisticaHora.objects.filter(hora=fila['h']).update(
+            pedidos=F('pedidos') - fila['n'], ingresos=F('ingresos') - _decimal(fila['t'] or 0),
+        )
+
+
+def descontar_detalles(detalles):
+    """Resta de `EstadisticaArtista` un QuerySet de detalles que se va a borrar sin señales (un UPDATE por artista)."""
+    registrar_detalles(
+        detalles.order_by().values('producto__artista_id')
+        .annotate(u=Sum('cantidad_producto'), t=Sum('total')).values_list('producto__artista_id', 'u', 't'),
+        signo=-1,
+    )
+
+
+def tocar_version(*tablas):
+    """Marca que `tablas` cambiaron: la versión pasa a max(versión + 1, ahora en µs)."""
+    ahora = time.time_ns() // 1000
+    for tabla in tablas:
+        clave = f'version:{tabla}'
+        nueva = Greatest(F('valor') + 1, Value(ahora))
+        if Estadistica.objects.filter(clave=clave).update(valor=nueva):
+            continue
+        try:
+            with transaction.atomic():
+                Estadistica.objects.create(clave=clave, valor=ahora)
+        except IntegrityError:
+            Estadistica.objects.filter(clave=clave).update(valor=nueva)
+
+
+def versiones(tablas):
+    """{tabla: versión} en una consulta; 0 si la tabla todavía no tiene versión."""
+    claves = {f'version:{tabla}': tabla for tabla in tablas}
+    actuales = dict(Estadistica.objects.filter(clave__in=claves).values_list('clave', 'valor'))
+    return {tabla: actuales.get(clave, 0) for clave, tabla in claves.items()}
+
+
+# ----------------------
+# Lectura para el dashboard
+# ----------------------
+def resumen(horas=24, top=5):
+    ahora = timezone.now()
+    contadores = dict(Estadistica.objects.filter(clave__in=CONTADORES).values_list('clave', 'valor'))
+
+    desde = _inicio_hora(ahora) - timedelta(hours=horas - 1)
+    por_hora = list(EstadisticaHora.objects.filter(hora__gte=desde).order_by('hora').values('hora', 'pedidos', 'ingresos'))
+    inicio_hoy = timezone.localtime(ahora).replace(hour=0, minute=0, second=0, microsecond=0)
+    hoy = EstadisticaHora.objects.filter(hora__gte=inicio_hoy).aggregate(pedidos=Sum('pedidos'), ingresos=Sum('ingresos'))
+
+    return {
+        'clientes_count': contadores.get('clientes', 0),
+        'artistas_count': contadores.get('artistas', 0),
+        'productos_count': contadores.get('productos', 0),
+        'pedidos_count': contadores.get('pedidos', 0),
+        'pedidos_hoy': hoy['pedidos'] or 0,
+        'ingresos_hoy': hoy['ingresos'] or Decimal('0'),
+        'pedidos_por_hora': por_hora,
+        'stock_bajo': list(
+            Producto.objects.filter(stock__lte=STOCK_BAJO).order_by('stock', 'id')
+            .select_related('artista').only('id', 'nombre_producto', 'stock', 'artista__nombre_artista')[:10]
+        ),
+        'top_artistas': list(
+            EstadisticaArtista.objects.filter(unidades__gt=0).select_related('artista')
+            .only('unidades', 'ingresos', 'artista__nombre_artista').order_by('-unidades')[:top]
+        ),
+    }
+
+
+# ----------------------
+# Reconstrucción completa
+# ----------------------
+@transaction.atomic
+def recalcular():
+    """Reconstruye todas las estadísticas desde las tablas fuente."""
+    # Las versiones de tabla (version:*) no se derivan de los datos: se conservan
+    Estadistica.objects.filter(clave__in=CONTADORES).delete()
+    Estadistica.objects.bulk_create([
+        Estadistica(clave=clave, valor=modelo.objects.count()) for clave, modelo in CONTADORES.items()
+    ])
+
+    EstadisticaHora.objects.all().delete()
+    EstadisticaHora.objects.bulk_create([
+        EstadisticaHora(hora=fila['h'], pedidos=fila['n'], ingresos=fila['t'] or 0)
+        for fila in Pedido.objects.annotate(h=TruncHour('fecha', tzinfo=dt_timezone.utc))
+        .order_by().values('h').annotate(n=Count('id'), t=Sum('total'))
+    ], batch_size=1000)
+
+    EstadisticaArtista.objects.all().delete()
+    EstadisticaArtista.objects.bulk_create([
+        EstadisticaArtista(artista_id=fila['producto__artista'], unidades=fila['u'] or 0, ingresos=fila['t'] or 0)
+        for fila in DetallePedido.objects.order_by().values('producto__artista')
+        .annotate(u=Sum('cantidad_producto'), t=Sum('total'))
+    ], batch_size=1000)
+
+
+# ----------------------
+# Señales
+# ----------------------
+def _contador_creado(clave):
+    def receptor(sender, instance, created, **kwargs):
+        if created:
+            incrementar(clave, 1)
+    return receptor
+
+
+def _contador_borrado(clave):
+    def receptor(sender, instance, **kwargs):
+        incrementar(clave, -1)
+    return receptor
+
+
+for _clave, _modelo in CONTADORES.items():
+    post_save.connect(_contador_creado(_clave), sender=_modelo, weak=False, dispatch_uid=f'estadisticas_alta_{_clave}')
+    post_delete.connect(_contador_borrado(_clave), sender=_modelo, weak=False, dispatch_uid=f'estadisticas_baja_{_clave}')
+
+
+def _version_cambiada(tabla):
+    def receptor(sender, instance, **kwargs):
+        tocar_version(tabla)
+    return receptor
+
+
+for _tabla, _modelo in VERSIONADAS.items():
+    post_save.connect(_version_cambiada(_tabla), sender=_modelo, weak=False, dispatch_uid=f'version_guardado_{_tabla}')
+    post_delete.connect(_version_cambiada(_tabla), sender=_modelo, weak=False, dispatch_uid=f'version_borrado_{_tabla}')
+
+
+@receiver(pre_save, sender=Pedido)
+def _pedido_pre_save(sender, instance, **kwargs):
+    instance._total_previo = None
+    if instance.pk:
+        instance._total_previo = Pedido.objects.filter(pk=instance.pk).values_list('total', flat=True).first()
+
+
+@receiver(post_save, sender=Pedido)
+def _pedido_guardado(sender, instance, created, **kwargs):
+    if created:
+        registrar_pedido(instance.fecha, _decimal(instance.total))
+    elif getattr(instance, '_total_previo', None) is not None:
+        diferencia = _decimal(instance.total) - instance._total_previo
+        if diferencia:
+            EstadisticaHora.objects.filter(hora=_inicio_hora(instance.fecha)).update(ingresos=F('ingresos') + diferencia)
+
+
+@receiver(post_delete, sender=Pedido)
+def _pedido_borrado(sender, instance, **kwargs):
+    registrar_pedido(instance.fecha, _decimal(instance.total), signo=-1)
+
+
+@receiver(pre_save, sender=DetallePedido)
+def _detalle_pre_save(sender, instance, **kwargs):
+    instance._venta_previa = None
+    if instance.pk:
+        instance._venta_previa = (
+            DetallePedido.objects.filter(pk=instance.pk)
+            .values_list('producto__artista_id', 'cantidad_producto', 'total').first()
+        )
+
+
+@receiver(post_save, sender=DetallePedido)
+def _detalle_guardado(sender, instance, created, **kwargs):
+    artista_id = Producto.objects.filter(pk=instance.producto_id).values_list('artista_id', flat=True).first()
+    actual = (artista_id, instance.cantidad_producto, _decimal(instance.total))
+    if created:
+        registrar_detalles([actual])
+        return
+    previa = getattr(instance, '_venta_previa', None)
+    if previa is None or (previa[0], previa[1], _decimal(previa[2])) == actual:
+        return
+    # Edición desde el panel: sale lo anterior y entra lo nuevo (puede cambiar de artista)
+    if previa[0] is not None:
+        registrar_detalles([previa], signo=-1)
+    if artista_id is not None:
+        registrar_detalles([actual])
+
+
+@receiver(post_delete, sender=DetallePedido)
+def _detalle_borrado(sender, instance, **kwargs):
+    artista_id = Producto.objects.filter(pk=instance.producto_id).values_list('artista_id', flat=True).first()
+    if artista_id is not None:
+        registrar_detalles([(artista_id, instance.cantidad_producto, instance.total)], signo=-1)
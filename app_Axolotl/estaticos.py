@@ -0,0 +1,184 @@
+"""Archivos estáticos y media con caché de navegador de larga duración.
+
+- `AlmacenEstaticos`: storage de `collectstatic` que agrega el hash del
+  contenido al nombre (`style.3f2a...css`, vía ManifestStaticFilesStorage) y
+  escribe variantes precomprimidas `.gz` y `.br` (si está instalado el
+  paquete `brotli`) de los archivos de texto.
+- `servir`: vista para despliegues de una sola máquina sin servidor web
+  delante (`AXOLOTL_SERVIR_ESTATICOS`). Manda `Cache-Control: immutable` a
+  los archivos con hash en el nombre (estáticos y derivados de miniaturas),
+  ETag/Last-Modified con respuestas 304, peticiones `Range` (206) y elige la
+  variante precomprimida según `Accept-Encoding`.
+
+Las páginas HTML no pasan por aquí, así que una recarga sólo revalida el HTML.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('image/avif', '.avif')
+
+COMPRIMIBLES = ('.css', '.js', '.svg', '.html', '.txt', '.json', '.xml', '.map')
+TAMANO_MINIMO = 256
+
+UN_ANIO = 60 * 60 * 24 * 365
+CACHE_INMUTABLE = f'public, max-age={UN_ANIO}, immutable'
+CACHE_REVALIDAR = 'public, max-age=3600, must-revalidate'
+
+# style.3f2a9c1b7d0e.css (ManifestStaticFilesStorage) y derivados/<sha256[:20]>-<ancho>.<ext> (miniaturas)
+_CON_HASH_RE = re.compile(r'(\.[0-9a-f]{12}\.[^/]+$)|(^derivados/[0-9a-f]{20}-\d+\.[a-z]+$)')
+_RANGO_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _comprimidos(contenido):
+    """Variantes (sufijo, bytes) que valen la pena: al menos 5% más chicas que el original."""
+    variantes = [('.gz', gzip.compress(contenido, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variantes.append(('.br', brotli.compress(contenido, quality=11)))
+    return [(sufijo, datos) for sufijo, datos in variantes if len(datos) < len(contenido) * 0.95]
+
+
+class AlmacenEstaticos(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que además deja .gz/.br junto a cada archivo con hash."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for nombre in sorted(set(self.hashed_files.values())):
+            if not nombre.endswith(COMPRIMIBLES) or not self.exists(nombre):
+                continue
+            with self.open(nombre, 'rb') as archivo:
+                contenido = archivo.read()
+            if len(contenido) < TAMANO_MINIMO:
+                continue
+            for sufijo, datos in _comprimidos(contenido):
+                ruta = self.path(nombre + sufijo)
+                with open(ruta, 'wb') as destino:
+                    destino.write(datos)
+                yield nombre, nombre + sufijo, True
+
+
+# ----------------------
+# Servidor de archivos
+# ----------------------
+def _etag(stat, codificacion):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{"-" + codificacion if codificacion else ""}"'
+
+
+def _elegir_variante(ruta, request):
+    """Devuelve (ruta, codificación) de la mejor variante precomprimida aceptada."""
+    aceptadas = request.headers.get('Accept-Encoding', '')
+    for sufijo, codificacion in (('.br', 'br'), ('.gz', 'gzip')):
+        if codificacion in aceptadas and os.path.isfile(ruta + sufijo):
+            return ruta + sufijo, codificacion
+    return ruta, None
+
+
+def _rango(cabecera, tamano):
+    """(inicio, fin) inclusivo de un `Range: bytes=...` simple; None si no aplica, False si no es satisfacible."""
+    coincidencia = _RANGO_RE.match(cabecera.strip())
+    if not coincidencia:
+        return None  # rangos múltiples o mal formados: se responde el archivo completo
+    inicio, fin = coincidencia.groups()
+    if not inicio and not fin:
+        return None
+    if not inicio:
+        inicio, fin = max(tamano - int(fin), 0), tamano - 1
+    else:
+        inicio, fin = int(inicio), min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return False
+    return inicio, fin
+
+
+@require_safe
+def servir(request, ruta, raiz):
+    try:
+        completa = safe_join(raiz, ruta)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(completa):
+        raise Http404
+
+    rango = request.headers.get('Range')
+    # Los rangos se calculan sobre el archivo sin comprimir
+    archivo, codificacion = (completa, None) if rango else _elegir_variante(completa, request)
+    stat = os.stat(archivo)
+    etag = _etag(stat, codificacion)
+    inmutable = bool(_CON_HASH_RE.search(ruta.replace(os.sep, '/')))
+
+    cabeceras = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': CACHE_INMUTABLE if inmutable else CACHE_REVALIDAR,
+        'Accept-Ranges': 'bytes',
+    }
+    if os.path.isfile(completa + '.gz') or os.path.isfile(completa + '.br'):
+        cabeceras['Vary'] = 'Accept-Encoding'
+
+    si_no_coincide = request.headers.get('If-None-Match')
+    if si_no_coincide is not None:
+        no_modificado = etag in [e.strip() for e in si_no_coincide.split(',')] or si_no_coincide.strip() == '*'
+    else:
+        desde = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        no_modificado = desde is not None and int(stat.st_mtime) <= desde
+    if no_modificado:
+        respuesta = HttpResponseNotModified()
+        for clave, valor in cabeceras.items():
+            respuesta[clave] = valor
+        return respuesta
+
+    tipo = mimetypes.guess_type(completa)[0] or 'application/octet-stream'
+    si_rango = request.headers.get('If-Range')
+    if rango and (si_rango is None or si_rango.strip() == etag):
+        limites = _rango(rango, stat.st_size)
+        if limites is False:
+            respuesta = HttpResponse(status=416)
+            respuesta['Content-Range'] = f'bytes */{stat.st_size}'
+            return respuesta
+        if limites:
+            inicio, fin = limites
+            with open(archivo, 'rb') as f:
+                f.seek(inicio)
+                parte = f.read(fin - inicio + 1)
+            respuesta = HttpResponse(parte if request.method == 'GET' else b'', status=206, content_type=tipo)
+            respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{stat.st_size}'
+            respuesta['Content-Length'] = str(len(parte))
+            for clave, valor in cabeceras.items():
+                respuesta[clave] = valor
+            return respuesta
+
+    respuesta = FileResponse(open(archivo, 'rb'), content_type=tipo)
+    if codificacion:
+        respuesta['Content-Encoding'] = codificacion
+    for clave, valor in cabeceras.items():
+        respuesta[clave] = valor
+    return respuesta
+
+
+def urlpatterns():
+    """Rutas de STATIC_URL y MEDIA_URL servidas por `servir`."""
+    def prefijo(url):
+        return re.escape(url.lstrip('/'))
+
+    return [
+        re_path(rf'^{prefijo(settings.STATIC_URL)}(?P<ruta>.+)$', servir, {'raiz': settings.STATIC_ROOT}),
+        re_path(rf'^{prefijo(settings.MEDIA_URL)}(?P<ruta>.+)$', servir, {'raiz': settings.MEDIA_ROOT}),
+    ]
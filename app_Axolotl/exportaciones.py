@@ -0,0 +1,325 @@
+"""Exportación de pedidos y detalles de pedido a CSV o XLSX sin cargarlos en memoria.
+
+`filas` lee la base con `.iterator(chunk_size=LOTE)` (cursor del lado del
+servidor en PostgreSQL, `fetchmany` en SQLite) y pide sólo las columnas que
+se exportan con `values_list`, sin armar instancias. `a_csv` y `a_xlsx` van
+convirtiendo esas filas en bloques de texto o bytes a medida que llegan, así
+que la memoria no depende de cuántas filas haya y el primer bloque sale
+apenas la base devuelve la primera tanda.
+
+Los filtros (`desde`, `hasta`, `artista`, `producto`) vienen ya validados por
+`FiltroExportacionForm`. Las fechas son días completos en la zona horaria
+actual y se traducen a un rango sobre `fecha`, que usa el índice
+(fecha, id) del mismo orden en que se exporta.
+
+Bajo ASGI, Django consume un iterador síncrono entero (`sync_to_async(list)`)
+antes de mandar el primer byte; `respuesta` le pasa entonces un generador
+async que pide los bloques de a uno en el hilo de la conexión.
+
+Nombres y emails los escribe el cliente: el texto que empieza como una
+fórmula (`=`, `+`, `-`, `@`) se exporta con un apóstrofo delante para que
+Excel o LibreOffice no lo evalúen.
+
+El XLSX se escribe a mano (SpreadsheetML mínimo dentro de un zip en modo
+streaming), sin depender de openpyxl. Excel no abre hojas de más de
+`MAX_FILAS_XLSX` filas: si hay más, la hoja se corta con una fila de aviso y
+hay que usar CSV.
+"""
+import csv
+import datetime
+import io
+import re
+import zipfile
+from dataclasses import dataclass
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Exists, OuterRef
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import DetallePedido, Pedido
+
+LOTE = 2000
+FORMATOS = ('csv', 'xlsx')
+TIPOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+# Límite de filas de una hoja de Excel (encabezado incluido)
+MAX_FILAS_XLSX = 1048576
+AVISO_TRUNCADO = 'Exportación cortada en el límite de filas de Excel: usar CSV para el resto.'
+# Prefijos que una planilla interpreta como fórmula
+_FORMULA = ('=', '+', '-', '@')
+
+
+@dataclass
+class Exportacion:
+    encabezados: list
+    columnas: list  # para values_list, en el orden de los encabezados
+
+
+EXPORTACIONES = {
+    'pedidos': Exportacion(
+        ['id', 'fecha', 'cliente', 'email', 'cantidad_producto', 'total'],
+        ['id', 'fecha', 'usuario__nombre', 'usuario__email', 'cantidad_producto', 'total'],
+    ),
+    'detalles': Exportacion(
+        ['id', 'pedido', 'fecha', 'cliente', 'email', 'producto_id', 'producto', 'artista', 'genero', 'tipo',
+         'cantidad_producto', 'precio', 'total'],
+        ['id', 'pedido_id', 'fecha', 'usuario__nombre', 'usuario__email', 'producto_id', 'producto__nombre_producto',
+         'producto__artista__nombre_artista', 'producto__genero', 'producto__tipo', 'cantidad_producto', 'precio', 'total'],
+    ),
+}
+
+
+# ----------------------
+# Consultas
+# ----------------------
+def _inicio_del_dia(dia):
+    return timezone.make_aware(datetime.datetime.combine(dia, datetime.time.min))
+
+
+def consulta(nombre, filtros):
+    """QuerySet de tuplas (values_list) de `nombre` ('pedidos' o 'detalles') con los filtros."""
+    if nombre == 'pedidos':
+        qs = Pedido.objects.all()
+        if filtros.get('artista') or filtros.get('producto'):
+            # Exists y no un join: un pedido con varios detalles del artista sale una sola vez
+            detalles = DetallePedido.objects.filter(pedido=OuterRef('pk'))
+            if filtros.get('artista'):
+                detalles = detalles.filter(producto__artista_id=filtros['artista'])
+            if filtros.get('producto'):
+                detalles = detalles.filter(producto_id=filtros['producto'])
+            qs = qs.filter(Exists(detalles))
+    else:
+        qs = DetallePedido.objects.all()
+        if filtros.get('artista'):
+            qs = qs.filter(producto__artista_id=filtros['artista'])
+        if filtros.get('producto'):
+            qs = qs.filter(producto_id=filtros['producto'])
+    if filtros.get('desde'):
+        qs = qs.filter(fecha__gte=_inicio_del_dia(filtros['desde']))
+    if filtros.get('hasta'):
+        qs = qs.filter(fecha__lt=_inicio_del_dia(filtros['hasta'] + datetime.timedelta(days=1)))
+    return qs.order_by('fecha', 'id').values_list(*EXPORTACIONES[nombre].columnas)
+
+
+def filas(nombre, filtros):
+    """Genera las filas de la exportación leyendo de a LOTE, con `fecha` en hora local sin zona."""
+    # La zona se resuelve una vez: timezone.localtime por fila pesa más que el resto de la fila
+    zona = timezone.get_current_timezone()
+    indice = EXPORTACIONES[nombre].columnas.index('fecha')
+    for fila in consulta(nombre, filtros).iterator(chunk_size=LOTE):
+        fila = list(fila)
+        if fila[indice] is not None:
+            fila[indice] = fila[indice].astimezone(zona).replace(tzinfo=None)
+        yield fila
+
+
+def _texto(valor):
+    return "'" + valor if valor.startswith(_FORMULA) else valor
+
+
+# ----------------------
+# CSV
+# ----------------------
+def a_csv(encabezados, filas, bom=True):
+    """Genera el CSV en bloques de LOTE filas; el BOM hace que Excel lo abra como UTF-8."""
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(encabezados)
+    yield ('\ufeff' if bom else '') + salida.getvalue()
+    salida.seek(0)
+    salida.truncate()
+    for numero, fila in enumerate(filas, start=1):
+        # csv ya escribe None como vacío; sólo las fechas y el texto necesitan tratamiento
+        escritor.writerow([
+            v.strftime('%Y-%m-%d %H:%M:%S') if type(v) is datetime.datetime else _texto(v) if type(v) is str else v
+            for v in fila
+        ])
+        if numero % LOTE == 0:
+            yield salida.getvalue()
+            salida.seek(0)
+            salida.truncate()
+    if salida.tell():
+        yield salida.getvalue()
+
+
+# ----------------------
+# XLSX
+# ----------------------
+_CONTENIDO_FIJO = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Estilo 1: fecha y hora (formato 22 de Excel); estilo 2: encabezado en negrita
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+_INICIO_HOJA = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_FIN_HOJA = '</sheetData></worksheet>'
+# Caracteres de control que XML 1.0 no admite ni escapados
+_NO_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+_EPOCA_EXCEL = datetime.datetime(1899, 12, 30)
+
+
+class _Tubo:
+    """Archivo de sólo escritura sin seek: zipfile escribe en modo streaming y se vacía por bloques."""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes.clear()
+        return datos
+
+
+def _columna(indice):
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _celda(ref, valor, estilo=''):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return f'<c r="{ref}" t="b"{estilo}><v>{int(valor)}</v></c>'
+    if isinstance(valor, datetime.datetime):
+        serie = (valor - _EPOCA_EXCEL).total_seconds() / 86400
+        return f'<c r="{ref}" s="1"><v>{serie}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c r="{ref}"{estilo}><v>{valor}</v></c>'
+    return f'<c r="{ref}" t="inlineStr"{estilo}><is><t xml:space="preserve">{escape(_NO_XML.sub("", _texto(str(valor))))}</t></is></c>'
+
+
+def _fila(numero, columnas, valores, estilo=''):
+    celdas = ''.join(_celda(f'{columna}{numero}', valor, estilo) for columna, valor in zip(columnas, valores))
+    return f'<row r="{numero}">{celdas}</row>'
+
+
+def a_xlsx(encabezados, filas, hoja='Datos'):
+    """Genera los bytes de un XLSX de una hoja a medida que lee las filas."""
+    columnas = [_columna(i) for i in range(len(encabezados))]
+    tubo = _Tubo()
+    with zipfile.ZipFile(tubo, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as archivo:
+        for nombre, contenido in _CONTENIDO_FIJO.items():
+            archivo.writestr(nombre, contenido.replace('{hoja}', escape(hoja)))
+        with archivo.open('xl/worksheets/sheet1.xml', 'w') as xml:
+            xml.write((_INICIO_HOJA + _fila(1, columnas, encabezados, ' s="2"')).encode())
+            yield tubo.vaciar()
+            bloque = []
+            for numero, fila in enumerate(filas, start=2):
+                if numero == MAX_FILAS_XLSX:
+                    bloque.append(_fila(numero, columnas, [AVISO_TRUNCADO]))
+                    break
+                bloque.append(_fila(numero, columnas, fila))
+                if len(bloque) == LOTE:
+                    xml.write(''.join(bloque).encode())
+                    bloque.clear()
+                    datos = tubo.vaciar()
+                    if datos:
+                        yield datos
+            xml.write((''.join(bloque) + _FIN_HOJA).encode())
+    yield tubo.vaciar()
+
+
+# ----------------------
+# Salidas
+# ----------------------
+def bloques(nombre, filtros, formato, bom=True):
+    """Genera la exportación `nombre` en `formato` ('csv': str, 'xlsx': bytes)."""
+    encabezados = EXPORTACIONES[nombre].encabezados
+    if formato == 'xlsx':
+        return a_xlsx(encabezados, filas(nombre, filtros), hoja=nombre)
+    return a_csv(encabezados, filas(nombre, filtros), bom=bom)
+
+
+def nombre_archivo(nombre, filtros, formato):
+    partes = [nombre]
+    if filtros.get('desde'):
+        partes.append(f"desde-{filtros['desde']:%Y%m%d}")
+    if filtros.get('hasta'):
+        partes.append(f"hasta-{filtros['hasta']:%Y%m%d}")
+    for clave in ('artista', 'producto'):
+        if filtros.get(clave):
+            partes.append(f'{clave}-{filtros[clave]}')
+    return '_'.join(partes) + f'.{formato}'
+
+
+async def _de_a_uno(generador):
+    """Recorre `generador` desde ASGI pidiendo un bloque por vez en el hilo de la conexión a la base."""
+    siguiente = sync_to_async(next)
+    try:
+        while (bloque := await siguiente(generador, None)) is not None:
+            yield bloque
+    finally:
+        # Si el cliente corta, el cursor se cierra en el mismo hilo que lo abrió
+        await sync_to_async(generador.close)()
+
+
+def respuesta(request, nombre, filtros):
+    """StreamingHttpResponse con la exportación como archivo adjunto."""
+    formato = filtros.get('formato') or 'csv'
+    contenido = bloques(nombre, filtros, formato)
+    if isinstance(request, ASGIRequest):
+        contenido = _de_a_uno(contenido)
+    salida = StreamingHttpResponse(contenido, content_type=TIPOS[formato])
+    salida['Content-Disposition'] = f'attachment; filename="{nombre_archivo(nombre, filtros, formato)}"'
+    # Que un proxy (nginx) no junte toda la respuesta antes de mandarla
+    salida['X-Accel-Buffering'] = 'no'
+    return salida
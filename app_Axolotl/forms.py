@@ -1,4 +1,7 @@
+from datetime import timedelta
+
 from django import forms
+from django.utils import timezone
 from .models import Artista, Producto, Usuario
 
 
@@ -24,3 +27,45 @@ class UsuarioForm(forms.ModelForm):
     class Meta:
         model = Usuario
         fields = ['nombre', 'email', 'tel', 'direccion', 'codigo_postal', 'profile_image']
+
+
+class RangoFechasForm(forms.Form):
+    desde = forms.DateField(required=False)
+    hasta = forms.DateField(required=False)
+
+    def clean(self):
+        datos = super().clean()
+        desde, hasta = datos.get('desde'), datos.get('hasta')
+        if desde and hasta and desde > hasta:
+            raise forms.ValidationError('La fecha "desde" no puede ser posterior a "hasta".')
+        return datos
+
+
+class FiltroExportacionForm(RangoFechasForm):
+    """Filtros de las exportaciones de pedidos y detalles (ver exportaciones.py)."""
+    artista = forms.IntegerField(required=False, min_value=1)
+    producto = forms.IntegerField(required=False, min_value=1)
+    formato = forms.ChoiceField(required=False, choices=[('csv', 'CSV'), ('xlsx', 'Excel (XLSX)')])
+
+    def clean(self):
+        datos = super().clean()
+        datos['formato'] = datos.get('formato') or 'csv'
+        return datos
+
+
+class ReporteVentasForm(RangoFechasForm):
+    """Rango y orden del reporte de ventas; sin fechas, los últimos DIAS_POR_DEFECTO días."""
+    DIAS_POR_DEFECTO = 30
+    MAX_DIAS = 731
+    orden = forms.ChoiceField(required=False, choices=[('ingresos', 'Ingresos'), ('unidades', 'Unidades'), ('pedidos', 'Pedidos')])
+
+    def clean(self):
+        datos = super().clean()
+        hasta = datos.get('hasta') or timezone.localdate()
+        desde = datos.get('desde') or hasta - timedelta(days=self.DIAS_POR_DEFECTO - 1)
+        if desde > hasta:
+            raise forms.ValidationError('La fecha "desde" no puede ser posterior a "hasta".')
+        if (hasta - desde).days >= self.MAX_DIAS:
+            raise forms.ValidationError(f'El rango no puede pasar de {self.MAX_DIAS} días.')
+        datos.update(desde=desde, hasta=hasta, orden=datos.get('orden') or 'ingresos')
+        return datos
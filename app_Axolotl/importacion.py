@@ -0,0 +1,315 @@
+"""Importación y exportación masiva del catálogo (CSV o JSONL).
+
+El archivo se lee fila por fila y se escribe en lotes (`LOTE`), cada uno en
+su propia transacción, así que la memoria no crece con el tamaño del archivo:
+sólo se mantienen el lote actual y un mapa nombre -> id de los artistas.
+
+Como `Artista` y `Producto` no tienen una clave natural única en la base,
+cada lote resuelve primero qué filas ya existen (artistas con el mapa en
+memoria; productos por artista, nombre y tipo en una consulta) y luego
+escribe con `bulk_create`: las nuevas como INSERT y las existentes como
+upsert sobre la PK (`update_conflicts=True, unique_fields=['id']`), que en
+SQLite y PostgreSQL es lineal; `bulk_update` arma un CASE por columna que
+crece con el cuadrado del lote y sólo se usa si el motor no soporta upsert.
+
+Las escrituras masivas no llaman a `save()` ni disparan señales: los campos
+derivados (slugs, inicial del artista) se calculan al armar las filas y al
+terminar se ajustan los contadores del dashboard, las versiones de la API,
+el caché de páginas y el índice de búsqueda. Las imágenes se importan como rutas del storage
+(`productos_img/x.jpg`); los archivos deben existir en MEDIA_ROOT.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from . import busqueda, cache_catalogo, estadisticas
+from .models import Artista, Producto, inicial_de, normalizar_faceta
+
+LOTE = 2000
+FORMATOS = ('csv', 'jsonl')
+
+CAMPOS_ARTISTA = ['nombre_artista', 'descripcion', 'foto']
+CAMPOS_PRODUCTO = [
+    'artista', 'nombre_producto', 'genero', 'tipo', 'descripcion', 'stock', 'precio', 'novedad', 'img',
+]
+# Columnas sin las que no se puede crear un producto nuevo
+OBLIGATORIOS_PRODUCTO = ('artista', 'nombre_producto', 'genero', 'tipo', 'stock', 'precio')
+
+_VERDADERO = {'1', 'true', 'si', 'sí', 'yes'}
+
+
+class FilaInvalida(ValueError):
+    pass
+
+
+@dataclass
+class Resultado:
+    leidas: int = 0
+    creadas: int = 0
+    actualizadas: int = 0
+    artistas_creados: int = 0
+    errores: list = field(default_factory=list)  # (número de fila, mensaje)
+
+
+# ----------------------
+# Lectura y escritura de archivos
+# ----------------------
+def formato_de(nombre, formato=None):
+    formato = formato or ('jsonl' if str(nombre).endswith(('.jsonl', '.ndjson')) else 'csv')
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato no soportado: {formato}')
+    return formato
+
+
+def leer_filas(archivo, formato):
+    """Genera (número de fila, dict) de un archivo de texto abierto."""
+    if formato == 'csv':
+        for numero, fila in enumerate(csv.DictReader(archivo), start=2):
+            yield numero, fila
+    else:
+        for numero, linea in enumerate(archivo, start=1):
+            if linea.strip():
+                try:
+                    fila = json.loads(linea)
+                except json.JSONDecodeError as error:
+                    yield numero, FilaInvalida(f'JSON inválido: {error.msg}')
+                    continue
+                yield numero, fila if isinstance(fila, dict) else FilaInvalida('se esperaba un objeto JSON')
+
+
+def escribir_filas(salida, formato, campos, filas):
+    """Escribe un iterable de dicts; devuelve cuántas filas escribió."""
+    total = 0
+    if formato == 'csv':
+        escritor = csv.DictWriter(salida, fieldnames=campos)
+        escritor.writeheader()
+        for fila in filas:
+            escritor.writerow(fila)
+            total += 1
+    else:
+        for fila in filas:
+            salida.write(json.dumps(fila, ensure_ascii=False, default=str) + '\n')
+            total += 1
+    return total
+
+
+def _lotes(filas, resultado, tamano):
+    lote = []
+    for numero, fila in filas:
+        resultado.leidas += 1
+        if isinstance(fila, Exception):
+            resultado.errores.append((numero, str(fila)))
+            continue
+        lote.append((numero, fila))
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# ----------------------
+# Conversión de valores
+# ----------------------
+def _texto(fila, campo):
+    valor = fila.get(campo)
+    return '' if valor is None else str(valor).strip()
+
+
+def _valores_producto(fila):
+    """Campos del modelo presentes en la fila, ya convertidos."""
+    valores = {}
+    for campo in ('genero', 'tipo', 'descripcion', 'img'):
+        if campo in fila:
+            valores[campo] = _texto(fila, campo) or (None if campo == 'img' else '')
+    if 'stock' in fila:
+        try:
+            valores['stock'] = int(_texto(fila, 'stock'))
+        except ValueError:
+            raise FilaInvalida(f"stock inválido: {fila.get('stock')!r}")
+        if valores['stock'] < 0:
+            raise FilaInvalida('stock negativo')
+    if 'precio' in fila:
+        # Mismas reglas que el modelo: número finito de hasta 8 dígitos con 2 decimales
+        try:
+            valores['precio'] = Producto._meta.get_field('precio').clean(_texto(fila, 'precio'), None)
+        except ValidationError as error:
+            raise FilaInvalida(f"precio inválido: {fila.get('precio')!r} ({' '.join(error.messages)})")
+    if 'novedad' in fila:
+        valor = fila.get('novedad')
+        valores['novedad'] = valor if isinstance(valor, bool) else _texto(fila, 'novedad').lower() in _VERDADERO
+    if 'genero' in valores:
+        valores['genero_slug'] = normalizar_faceta(valores['genero'])
+    if 'tipo' in valores:
+        valores['tipo_slug'] = normalizar_faceta(valores['tipo'])
+    return valores
+
+
+# ----------------------
+# Importación
+# ----------------------
+def _actualizar(modelo, objetos, columnas):
+    """Escribe `columnas` de filas existentes; `objetos` trae la fila completa."""
+    if not objetos or not columnas:
+        return
+    if connection.features.supports_update_conflicts_with_target:
+        modelo.objects.bulk_create(objetos, update_conflicts=True, unique_fields=['id'], update_fields=sorted(columnas))
+    else:
+        modelo.objects.bulk_update(objetos, sorted(columnas))
+
+
+def _mapa_artistas():
+    # nombre -> id; si hay nombres repetidos gana el id más bajo
+    mapa = {}
+    for artista_id, nombre in Artista.objects.order_by('-id').values_list('id', 'nombre_artista').iterator(chunk_size=LOTE):
+        mapa[nombre] = artista_id
+    return mapa
+
+
+def importar_artistas(filas, lote=LOTE, progreso=None):
+    resultado = Resultado()
+    mapa = _mapa_artistas()
+    for bloque in _lotes(filas, resultado, lote):
+        nuevos, existentes = {}, {}
+        for numero, fila in bloque:
+            nombre = _texto(fila, 'nombre_artista')
+            if not nombre:
+                resultado.errores.append((numero, 'nombre_artista vacío'))
+                continue
+            valores = {c: _texto(fila, c) or (None if c == 'foto' else '') for c in ('descripcion', 'foto') if c in fila}
+            if nombre in mapa:
+                existentes[mapa[nombre]] = valores
+            else:
+                nuevos[nombre] = valores
+        with transaction.atomic():
+            # Sólo se actualizan las columnas que trae el archivo
+            objetos, columnas = Artista.objects.in_bulk(existentes), set()
+            for artista_id, valores in existentes.items():
+                for campo, valor in valores.items():
+                    setattr(objetos[artista_id], campo, valor)
+                columnas.update(valores)
+            _actualizar(Artista, list(objetos.values()), columnas)
+            creados = Artista.objects.bulk_create(
+                [
+                    Artista(nombre_artista=nombre, inicial=inicial_de(nombre), **{'descripcion': '', **valores})
+                    for nombre, valores in nuevos.items()
+                ]
+            )
+        for objeto in creados:
+            mapa[objeto.nombre_artista] = objeto.id
+        resultado.creadas += len(creados)
+        resultado.actualizadas += len(existentes)
+        if progreso:
+            progreso(resultado)
+    _despues_de_importar(artistas=resultado.creadas, productos=0)
+    return resultado
+
+
+def importar_productos(filas, lote=LOTE, progreso=None, crear_artistas=True):
+    resultado = Resultado()
+    mapa = _mapa_artistas()
+    for bloque in _lotes(filas, resultado, lote):
+        candidatos, pendientes = {}, set()
+        for numero, fila in bloque:
+            try:
+                nombre_artista = _texto(fila, 'artista')
+                nombre = _texto(fila, 'nombre_producto')
+                if not nombre_artista or not nombre:
+                    raise FilaInvalida('artista y nombre_producto son obligatorios')
+                valores = _valores_producto(fila)
+            except FilaInvalida as error:
+                resultado.errores.append((numero, str(error)))
+                continue
+            if nombre_artista not in mapa:
+                if not crear_artistas:
+                    resultado.errores.append((numero, f'artista desconocido: {nombre_artista}'))
+                    continue
+                pendientes.add(nombre_artista)  # se crea abajo, en la misma transacción del lote
+            # Dentro de un lote, la última fila de la misma clave gana
+            clave = (nombre_artista, nombre, valores.get('tipo_slug'))
+            candidatos[clave] = (numero, valores)
+
+        with transaction.atomic():
+            if pendientes:
+                for objeto in Artista.objects.bulk_create([
+                    Artista(nombre_artista=n, inicial=inicial_de(n), descripcion='') for n in sorted(pendientes)
+                ]):
+                    mapa[objeto.nombre_artista] = objeto.id
+                resultado.artistas_creados += len(pendientes)
+
+            ids_artistas = {mapa[artista] for artista, _, _ in candidatos}
+            nombres = {nombre for _, nombre, _ in candidatos}
+            existentes = {}
+            for producto in Producto.objects.filter(artista_id__in=ids_artistas, nombre_producto__in=nombres):
+                existentes[(producto.artista_id, producto.nombre_producto, producto.tipo_slug)] = producto
+                existentes.setdefault((producto.artista_id, producto.nombre_producto, None), producto)
+
+            nuevos, actualizados, columnas = [], {}, set()
+            for (nombre_artista, nombre, tipo_slug), (numero, valores) in candidatos.items():
+                artista_id = mapa[nombre_artista]
+                producto = existentes.get((artista_id, nombre, tipo_slug))
+                if producto is not None:
+                    for campo, valor in valores.items():
+                        setattr(producto, campo, valor)
+                    actualizados[producto.id] = producto
+                    columnas.update(valores)
+                    continue
+                faltan = [c for c in OBLIGATORIOS_PRODUCTO if c not in valores and c not in ('artista', 'nombre_producto')]
+                if faltan:
+                    resultado.errores.append((numero, f"faltan columnas para crear: {', '.join(faltan)}"))
+                    continue
+                nuevos.append(Producto(artista_id=artista_id, nombre_producto=nombre, **{'descripcion': '', **valores}))
+
+            _actualizar(Producto, list(actualizados.values()), columnas)
+            resultado.actualizadas += len(actualizados)
+            Producto.objects.bulk_create(nuevos)
+            resultado.creadas += len(nuevos)
+        if progreso:
+            progreso(resultado)
+    _despues_de_importar(artistas=resultado.artistas_creados, productos=resultado.creadas)
+    return resultado
+
+
+def _despues_de_importar(artistas, productos):
+    """Lo que las señales harían fila por fila, una sola vez para toda la importación."""
+    if artistas:
+        estadisticas.incrementar('artistas', artistas)
+    if productos:
+        estadisticas.incrementar('productos', productos)
+    estadisticas.tocar_version('artista', 'producto')
+    cache_catalogo.invalidar_todo()
+    busqueda.reindexar()
+
+
+# ----------------------
+# Exportación
+# ----------------------
+def exportar_artistas():
+    for artista in Artista.objects.order_by('id').only(*CAMPOS_ARTISTA).iterator(chunk_size=LOTE):
+        yield {
+            'nombre_artista': artista.nombre_artista,
+            'descripcion': artista.descripcion,
+            'foto': artista.foto.name or '',
+        }
+
+
+def exportar_productos():
+    productos = (
+        Producto.objects.select_related('artista').order_by('id')
+        .only(*[c for c in CAMPOS_PRODUCTO if c != 'artista'], 'artista__nombre_artista')
+    )
+    for producto in productos.iterator(chunk_size=LOTE):
+        yield {
+            'artista': producto.artista.nombre_artista,
+            'nombre_producto': producto.nombre_producto,
+            'genero': producto.genero,
+            'tipo': producto.tipo,
+            'descripcion': producto.descripcion,
+            'stock': producto.stock,
+            'precio': str(producto.precio),
+            'novedad': int(producto.novedad),
+            'img': producto.img.name or '',
+        }
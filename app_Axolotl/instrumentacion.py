@@ -0,0 +1,280 @@
+"""Medición por vista: latencia, consultas SQL, tiempo en BD y en plantillas.
+
+Piezas:
+
+- `InstrumentacionMiddleware` (primero en MIDDLEWARE) abre una medición por
+  petición en un contextvar y al terminar la suma a la serie del nombre de la
+  URL (`comprar_frontend`, `ver_detalles_pedidos`...).
+- Un execute wrapper que se agrega a cada conexión al crearse
+  (`connection_created`) cuenta consultas y tiempo de BD de la medición
+  activa. Como vive en la conexión y lee un contextvar, también mide las
+  consultas que el ORM async corre en otro hilo (sync_to_async copia el
+  contexto).
+- `PlantillasMedidas`, backend de plantillas (TEMPLATES['BACKEND']) que
+  mide `render()` de la plantilla principal; los include y extends quedan
+  dentro de ese tiempo.
+- Consultas repetidas: si el mismo SQL (con sus placeholders, sin
+  parámetros) se ejecuta `UMBRAL_REPETIDAS` veces o más en una petición se
+  cuenta como sospecha de N+1 y se guarda el ejemplo.
+
+Cada serie guarda las últimas `MUESTRAS` peticiones para los percentiles
+(se ordenan sólo al pedir el reporte) y totales acumulados para Prometheus.
+Los datos son por proceso, como los contadores de `cache_catalogo`.
+"""
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+MUESTRAS = 1000
+UMBRAL_REPETIDAS = 5
+PERCENTILES = (50, 90, 99)
+SIN_RUTA = '<sin_ruta>'
+
+_actual = ContextVar('axolotl_medicion', default=None)
+_series = {}
+_lock = threading.Lock()
+
+
+def activa():
+    return getattr(settings, 'AXOLOTL_INSTRUMENTACION', True)
+
+
+@dataclass
+class Medicion:
+    consultas: int = 0
+    tiempo_bd: float = 0.0
+    tiempo_plantillas: float = 0.0
+    sql: Counter = field(default_factory=Counter)
+
+    def repetida(self):
+        """(sql, veces) de la consulta más repetida si pasa el umbral, si no None."""
+        if not self.sql:
+            return None
+        sql, veces = self.sql.most_common(1)[0]
+        return (sql, veces) if veces >= UMBRAL_REPETIDAS else None
+
+
+class _Serie:
+    def __init__(self):
+        self.latencia = deque(maxlen=MUESTRAS)
+        self.consultas = deque(maxlen=MUESTRAS)
+        self.tiempo_bd = deque(maxlen=MUESTRAS)
+        self.tiempo_plantillas = deque(maxlen=MUESTRAS)
+        self.peticiones = 0
+        self.suma_latencia = 0.0
+        self.suma_consultas = 0
+        self.suma_bd = 0.0
+        self.suma_plantillas = 0.0
+        self.con_repetidas = 0
+        self.ultima_repetida = None
+
+    def agregar(self, latencia, medicion, repetida):
+        self.latencia.append(latencia)
+        self.consultas.append(medicion.consultas)
+        self.tiempo_bd.append(medicion.tiempo_bd)
+        self.tiempo_plantillas.append(medicion.tiempo_plantillas)
+        self.peticiones += 1
+        self.suma_latencia += latencia
+        self.suma_consultas += medicion.consultas
+        self.suma_bd += medicion.tiempo_bd
+        self.suma_plantillas += medicion.tiempo_plantillas
+        if repetida:
+            self.con_repetidas += 1
+            self.ultima_repetida = repetida
+
+
+def _registrar(vista, latencia, medicion):
+    repetida = medicion.repetida()
+    with _lock:
+        serie = _series.get(vista)
+        if serie is None:
+            serie = _series[vista] = _Serie()
+        primera_vez = repetida is not None and serie.con_repetidas == 0
+        serie.agregar(latencia, medicion, repetida)
+    if primera_vez:
+        logger.warning('Posible N+1 en %s: %d veces %s', vista, repetida[1], repetida[0][:300])
+
+
+# ----------------------
+# Base de datos
+# ----------------------
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.tiempo_bd += time.perf_counter() - inicio
+        medicion.consultas += 1
+        medicion.sql[sql] += 1
+
+
+@receiver(connection_created, dispatch_uid='axolotl_instrumentacion_bd')
+def _instalar_en_conexion(sender, connection, **kwargs):
+    # La lista sobrevive a las reconexiones del mismo alias
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _medir_consulta)
+
+
+# ----------------------
+# Plantillas
+# ----------------------
+class _PlantillaMedida:
+    def __init__(self, plantilla):
+        self.plantilla = plantilla
+
+    def __getattr__(self, nombre):
+        return getattr(self.plantilla, nombre)
+
+    def render(self, context=None, request=None):
+        medicion = _actual.get()
+        if medicion is None:
+            return self.plantilla.render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return self.plantilla.render(context, request)
+        finally:
+            medicion.tiempo_plantillas += time.perf_counter() - inicio
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """DjangoTemplates que suma el tiempo de render a la medición activa."""
+
+    def from_string(self, template_code):
+        return _PlantillaMedida(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _PlantillaMedida(super().get_template(template_name))
+
+
+# ----------------------
+# Middleware
+# ----------------------
+class InstrumentacionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def _terminar(self, request, inicio, medicion):
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = (coincidencia.url_name or coincidencia.view_name) if coincidencia else SIN_RUTA
+        _registrar(vista or SIN_RUTA, time.perf_counter() - inicio, medicion)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        if not activa():
+            return self.get_response(request)
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            _actual.reset(token)
+            self._terminar(request, inicio, medicion)
+
+    async def __acall__(self, request):
+        if not activa():
+            return await self.get_response(request)
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            _actual.reset(token)
+            self._terminar(request, inicio, medicion)
+
+
+# ----------------------
+# Reportes
+# ----------------------
+def _percentil(ordenados, p):
+    if not ordenados:
+        return 0
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def _percentiles(valores):
+    ordenados = sorted(valores)
+    return {f'p{p}': _percentil(ordenados, p) for p in PERCENTILES}
+
+
+def reporte():
+    """{vista: resumen} con percentiles de las últimas MUESTRAS peticiones (tiempos en ms)."""
+    with _lock:
+        copia = {
+            vista: (list(s.latencia), list(s.consultas), list(s.tiempo_bd), list(s.tiempo_plantillas),
+                    s.peticiones, s.con_repetidas, s.ultima_repetida)
+            for vista, s in _series.items()
+        }
+    resultado = {}
+    for vista, (latencia, consultas, bd, plantillas, peticiones, con_repetidas, repetida) in sorted(copia.items()):
+        resultado[vista] = {
+            'peticiones': peticiones,
+            'latencia_ms': {k: round(v * 1000, 2) for k, v in _percentiles(latencia).items()},
+            'consultas': _percentiles(consultas),
+            'bd_ms': {k: round(v * 1000, 2) for k, v in _percentiles(bd).items()},
+            'plantillas_ms': {k: round(v * 1000, 2) for k, v in _percentiles(plantillas).items()},
+            'peticiones_con_repetidas': con_repetidas,
+            'consulta_repetida': {'sql': repetida[0][:500], 'veces': repetida[1]} if repetida else None,
+        }
+    return resultado
+
+
+def reiniciar():
+    with _lock:
+        _series.clear()
+
+
+def metricas_prometheus():
+    """Resumen por vista en formato de texto de Prometheus (cuantiles de las últimas MUESTRAS)."""
+    with _lock:
+        series = sorted(
+            (vista, s.peticiones, s.suma_latencia, s.suma_consultas, s.suma_bd, s.suma_plantillas, s.con_repetidas,
+             list(s.latencia), list(s.consultas), list(s.tiempo_bd), list(s.tiempo_plantillas))
+            for vista, s in _series.items()
+        )
+    metricas = [
+        ('axolotl_peticion_segundos', 'Latencia de la petición.', 2, 7),
+        ('axolotl_peticion_consultas', 'Consultas SQL por petición.', 3, 8),
+        ('axolotl_peticion_bd_segundos', 'Tiempo en la base de datos por petición.', 4, 9),
+        ('axolotl_peticion_plantillas_segundos', 'Tiempo de render de plantillas por petición.', 5, 10),
+    ]
+    lineas = []
+    for nombre, ayuda, i_suma, i_muestras in metricas:
+        lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} summary']
+        for fila in series:
+            vista, peticiones = fila[0], fila[1]
+            ordenados = sorted(fila[i_muestras])
+            for p in PERCENTILES:
+                lineas.append(f'{nombre}{{vista="{vista}",quantile="{p / 100}"}} {_percentil(ordenados, p)}')
+            lineas.append(f'{nombre}_sum{{vista="{vista}"}} {fila[i_suma]}')
+            lineas.append(f'{nombre}_count{{vista="{vista}"}} {peticiones}')
+    lineas += [
+        '# HELP axolotl_peticiones_con_repetidas_total Peticiones con una consulta repetida (posible N+1).',
+        '# TYPE axolotl_peticiones_con_repetidas_total counter',
+    ]
+    for fila in series:
+        lineas.append(f'axolotl_peticiones_con_repetidas_total{{vista="{fila[0]}"}} {fila[6]}')
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from app_Axolotl import auditoria_consultas, rendimiento
+
+
+class Command(BaseCommand):
+    help = (
+        'Pide cada ruta de app_Axolotl/urls.py con datos sintéticos de dos tamaños en una base '
+        'temporal y falla si alguna hace más consultas con más datos (N+1), mostrando el SQL '
+        'repetido y de qué línea de código o plantilla sale.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rutas', help='Nombres de ruta separados por comas (por defecto, todas).')
+        parser.add_argument('--todas', action='store_true', help='Lista también las vistas que no crecen.')
+
+    def handle(self, *args, **options):
+        nombres = options['rutas'].split(',') if options['rutas'] else None
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['*']), rendimiento.base_temporal():
+            vistas = auditoria_consultas.auditar(nombres)
+        texto = auditoria_consultas.reporte(vistas, todas=options['todas'])
+        if texto:
+            self.stdout.write(texto)
+        crecen = [v.nombre for v in vistas.values() if v.crece]
+        if crecen:
+            raise CommandError(f'{len(crecen)} vistas hacen más consultas con más datos: {", ".join(crecen)}')
+        self.stdout.write(self.style.SUCCESS(f'{len(vistas)} rutas revisadas: ninguna crece con los datos.'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from app_Axolotl import importacion
+
+
+class Command(BaseCommand):
+    help = 'Exporta artistas o productos a CSV/JSONL leyendo la base por bloques.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', nargs='?', default='-', help="Ruta de salida o '-' para stdout")
+        parser.add_argument('--modelo', choices=['productos', 'artistas'], default='productos')
+        parser.add_argument('--formato', choices=importacion.FORMATOS, help='Por defecto según la extensión')
+
+    def handle(self, *args, **options):
+        formato = importacion.formato_de(options['archivo'], options['formato'])
+        if options['modelo'] == 'artistas':
+            campos, filas = importacion.CAMPOS_ARTISTA, importacion.exportar_artistas()
+        else:
+            campos, filas = importacion.CAMPOS_PRODUCTO, importacion.exportar_productos()
+
+        if options['archivo'] == '-':
+            total = importacion.escribir_filas(self.stdout, formato, campos, filas)
+        else:
+            with open(options['archivo'], 'w', encoding='utf-8', newline='') as salida:
+                total = importacion.escribir_filas(salida, formato, campos, filas)
+        self.stderr.write(f'{total} filas exportadas')
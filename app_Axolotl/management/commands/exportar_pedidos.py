@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Axolotl import exportaciones
+from app_Axolotl.forms import FiltroExportacionForm
+
+
+class Command(BaseCommand):
+    help = 'Exporta pedidos o detalles de pedido a CSV/XLSX leyendo la base por bloques.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', nargs='?', default='-', help="Ruta de salida o '-' para stdout (sólo CSV)")
+        parser.add_argument('--modelo', choices=list(exportaciones.EXPORTACIONES), default='pedidos')
+        parser.add_argument('--formato', choices=exportaciones.FORMATOS, help='Por defecto según la extensión')
+        parser.add_argument('--desde', help='Fecha inicial AAAA-MM-DD (inclusive)')
+        parser.add_argument('--hasta', help='Fecha final AAAA-MM-DD (inclusive)')
+        parser.add_argument('--artista', type=int, help='ID del artista')
+        parser.add_argument('--producto', type=int, help='ID del producto')
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        formato = options['formato'] or ('xlsx' if archivo.endswith('.xlsx') else 'csv')
+        form = FiltroExportacionForm({
+            clave: options[clave] for clave in ('desde', 'hasta', 'artista', 'producto') if options[clave] is not None
+        } | {'formato': formato})
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        if archivo == '-' and formato == 'xlsx':
+            raise CommandError('XLSX necesita un archivo de salida.')
+
+        bloques = exportaciones.bloques(options['modelo'], form.cleaned_data, formato, bom=archivo != '-')
+        if archivo == '-':
+            for bloque in bloques:
+                self.stdout.write(bloque, ending='')
+        elif formato == 'xlsx':
+            with open(archivo, 'wb') as salida:
+                for bloque in bloques:
+                    salida.write(bloque)
+        else:
+            with open(archivo, 'w', encoding='utf-8', newline='') as salida:
+                for bloque in bloques:
+                    salida.write(bloque)
+        self.stderr.write(f'{options["modelo"]} exportados a {archivo}')
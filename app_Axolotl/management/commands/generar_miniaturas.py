@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from app_Axolotl import miniaturas
+
+
+class Command(BaseCommand):
+    help = 'Genera los derivados (miniaturas WebP/AVIF/JPEG) de todas las imágenes del catálogo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forzar', action='store_true', help='Reescribe los manifiestos aunque existan.')
+
+    def handle(self, *args, **options):
+        total = fallidas = 0
+        for modelo, campo in miniaturas.CAMPOS.items():
+            nombres = (
+                modelo.objects.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+                .values_list(campo, flat=True).distinct().iterator(chunk_size=500)
+            )
+            for nombre in nombres:
+                fieldfile = getattr(modelo(**{campo: nombre}), campo)
+                miniaturas.descartar_fallo(nombre)
+                if options['forzar']:
+                    datos = miniaturas.generar(nombre, fieldfile.storage)
+                else:
+                    datos = miniaturas.manifiesto(fieldfile)
+                total += 1
+                if datos is None:
+                    fallidas += 1
+                    self.stderr.write(f'  sin miniaturas: {nombre}')
+        self.stdout.write(self.style.SUCCESS(f'Imágenes procesadas: {total} (fallidas: {fallidas})'))
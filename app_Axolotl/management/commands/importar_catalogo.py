@@ -0,0 +1,58 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Axolotl import importacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa artistas o productos desde CSV/JSONL (upsert por lotes). '
+        'Productos: artista, nombre_producto, genero, tipo, descripcion, stock, precio, novedad, img. '
+        'Artistas: nombre_artista, descripcion, foto.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo o '-' para stdin")
+        parser.add_argument('--modelo', choices=['productos', 'artistas'], default='productos')
+        parser.add_argument('--formato', choices=importacion.FORMATOS, help='Por defecto según la extensión')
+        parser.add_argument('--lote', type=int, default=importacion.LOTE)
+        parser.add_argument(
+            '--sin-crear-artistas', action='store_true',
+            help='Rechaza productos de artistas que no existen en vez de crearlos',
+        )
+
+    def handle(self, *args, **options):
+        formato = importacion.formato_de(options['archivo'], options['formato'])
+        inicio = time.perf_counter()
+
+        def progreso(resultado):
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(
+                f'  {resultado.leidas} filas leídas ({resultado.leidas / segundos:.0f}/s), '
+                f'{resultado.creadas} creadas, {resultado.actualizadas} actualizadas'
+            )
+
+        try:
+            archivo = sys.stdin if options['archivo'] == '-' else open(options['archivo'], encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(str(error))
+        with archivo:
+            filas = importacion.leer_filas(archivo, formato)
+            if options['modelo'] == 'artistas':
+                resultado = importacion.importar_artistas(filas, options['lote'], progreso)
+            else:
+                resultado = importacion.importar_productos(
+                    filas, options['lote'], progreso, crear_artistas=not options['sin_crear_artistas'],
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.leidas} filas en {time.perf_counter() - inicio:.1f} s: {resultado.creadas} creadas, '
+            f'{resultado.actualizadas} actualizadas, {resultado.artistas_creados} artistas nuevos, '
+            f'{len(resultado.errores)} con errores'
+        ))
+        for numero, mensaje in resultado.errores[:20]:
+            self.stderr.write(f'  fila {numero}: {mensaje}')
+        if len(resultado.errores) > 20:
+            self.stderr.write(f'  ... y {len(resultado.errores) - 20} más')
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_Axolotl import reservas
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra por lotes las reservas de stock vencidas. Con --cada N repite cada N segundos '
+        '(para correrlo como proceso aparte); sin él se ejecuta una vez (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=reservas.LOTE)
+        parser.add_argument('--cada', type=float, help='Segundos entre barridos; sin esta opción corre una sola vez')
+
+    def handle(self, *args, **options):
+        while True:
+            borradas = reservas.liberar_vencidas(options['lote'])
+            if borradas or not options['cada']:
+                self.stdout.write(f'{borradas} reservas vencidas liberadas')
+            if not options['cada']:
+                return
+            time.sleep(options['cada'])
@@ -0,0 +1,45 @@
+import time
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+USUARIO = 'medicion-login'
+CLAVE = 'medicion-login-clave'
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el costo del login (POST a login_frontend): inicios de sesión por segundo y '
+        'consultas por login. Usa un hasher rápido para que el resultado refleje la base de '
+        'datos y no PBKDF2. Crea y borra su propio usuario.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=200)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], ALLOWED_HOSTS=['*'])
+    def handle(self, *args, **options):
+        User.objects.filter(username=USUARIO).delete()
+        User.objects.create_user(username=USUARIO, email=f'{USUARIO}@axolotl.test', password=CLAVE)
+        url = reverse('login_frontend')
+        datos = {'username': USUARIO, 'password': CLAVE}
+        try:
+            with CaptureQueriesContext(connection) as consultas:
+                Client().post(url, datos)
+            tipos = Counter(q['sql'].split(None, 1)[0].upper() for q in consultas.captured_queries)
+
+            iteraciones = options['iteraciones']
+            inicio = time.perf_counter()
+            for _ in range(iteraciones):
+                Client().post(url, datos)
+            duracion = time.perf_counter() - inicio
+        finally:
+            User.objects.filter(username=USUARIO).delete()
+
+        self.stdout.write(f'Consultas por login: {len(consultas.captured_queries)} ({dict(sorted(tipos.items()))})')
+        self.stdout.write(f'Logins: {iteraciones} en {duracion:.2f} s ({iteraciones / duracion:.1f}/s)')
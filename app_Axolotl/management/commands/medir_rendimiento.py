@@ -0,0 +1,137 @@
+import json
+import threading
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, get_internal_wsgi_application
+from django.test import override_settings
+from django.test.testcases import QuietWSGIRequestHandler
+
+from app_Axolotl import datos_sinteticos, rendimiento
+
+DATOS = ('artistas', 'productos', 'clientes', 'pedidos', 'items', 'semilla')
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de rendimiento de las vistas más usadas de la tienda y el panel. Siembra datos '
+        'sintéticos en una base temporal (o en la configurada con --base-actual), mide latencia '
+        'y consultas con el Client de pruebas y throughput con hilos HTTP concurrentes, y compara '
+        'con la referencia JSON: si hay regresiones termina con error.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--artistas', type=int, default=50)
+        parser.add_argument('--productos', type=int, default=2000)
+        parser.add_argument('--clientes', type=int, default=200)
+        parser.add_argument('--pedidos', type=int, default=5, help='Pedidos por cliente.')
+        parser.add_argument('--items', type=int, default=3, help='Productos en el carrito de cada cliente.')
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--iteraciones', type=int, default=50, help='Peticiones por escenario con el Client.')
+        parser.add_argument('--concurrencia', type=int, default=8)
+        parser.add_argument('--segundos', type=float, default=3, help='Duración de cada escenario HTTP; 0 lo omite.')
+        parser.add_argument('--escenarios', help='Nombres de URL separados por comas (por defecto, todos).')
+        parser.add_argument('--url', help='Servidor externo (http://host:puerto) para la parte HTTP; requiere --base-actual.')
+        parser.add_argument(
+            '--base-actual', action='store_true',
+            help='Usa la base configurada (los datos sintéticos se borran al terminar) en lugar de una temporal.',
+        )
+        parser.add_argument('--referencia', default=str(rendimiento.REFERENCIA))
+        parser.add_argument('--guardar', action='store_true', help='Guarda el resultado como nueva referencia.')
+        parser.add_argument('--tolerancia', type=float, default=rendimiento.TOLERANCIA)
+
+    def handle(self, *args, **options):
+        if options['url'] and not options['base_actual']:
+            raise CommandError('--url mide otro servidor: los datos deben sembrarse en su base con --base-actual.')
+        escenarios = rendimiento.ESCENARIOS
+        if options['escenarios']:
+            nombres = options['escenarios'].split(',')
+            escenarios = [e for e in escenarios if e.nombre in nombres]
+            if len(escenarios) != len(nombres):
+                raise CommandError(f'Escenarios disponibles: {", ".join(e.nombre for e in rendimiento.ESCENARIOS)}')
+
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['*']):
+            if options['base_actual']:
+                datos_sinteticos.limpiar()
+                try:
+                    resultado = self._sembrar_y_medir(escenarios, options)
+                finally:
+                    datos_sinteticos.limpiar()
+            else:
+                with rendimiento.base_temporal():
+                    resultado = self._sembrar_y_medir(escenarios, options)
+
+        self._reportar(resultado)
+        self._comparar(resultado, options)
+
+    def _sembrar_y_medir(self, escenarios, options):
+        resumen = datos_sinteticos.generar(**{k: options[k] for k in DATOS})
+        self.stdout.write(f'Datos: {resumen}')
+        objetivos = rendimiento.Objetivos.desde_base()
+        resultado = {
+            'parametros': {k: options[k] for k in DATOS + ('iteraciones', 'concurrencia', 'segundos')},
+            'cliente': rendimiento.correr_cliente(
+                escenarios, objetivos, rendimiento.clientes_de_prueba(0), options['iteraciones'],
+            ),
+        }
+        if options['segundos'] > 0:
+            # Otro cliente: su carrito no trae lo que agregó la pasada anterior
+            cookies = rendimiento.cookies_de(rendimiento.clientes_de_prueba(1))
+            with _servidor(options['url']) as base:
+                resultado['http'] = rendimiento.correr_http(
+                    base, escenarios, objetivos, cookies, options['concurrencia'], options['segundos'],
+                )
+        return resultado
+
+    def _reportar(self, resultado):
+        for modo in ('cliente', 'http'):
+            if modo not in resultado:
+                continue
+            self.stdout.write(f'\n{modo}:')
+            self.stdout.write(f'{"escenario":<22} {"pet.":>6} {"err.":>5} {"pet/s":>8} {"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"SQL":>5}')
+            for nombre, r in resultado[modo].items():
+                self.stdout.write(
+                    f'{nombre:<22} {r["peticiones"]:>6} {r["errores"]:>5} {r["rps"]:>8} {r["p50_ms"]:>8} '
+                    f'{r["p90_ms"]:>8} {r["p99_ms"]:>8} {r.get("consultas", ""):>5}'
+                )
+
+    def _comparar(self, resultado, options):
+        ruta = Path(options['referencia'])
+        if options['guardar']:
+            ruta.write_text(json.dumps(resultado, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f'\nReferencia guardada en {ruta}'))
+            return
+        if not ruta.exists():
+            self.stdout.write(self.style.WARNING(f'\nSin referencia en {ruta}; usa --guardar para crearla.'))
+            return
+        referencia = json.loads(ruta.read_text(encoding='utf-8'))
+        if referencia.get('parametros') != resultado['parametros']:
+            self.stdout.write(self.style.WARNING('\nLa referencia se midió con otros parámetros; la comparación es orientativa.'))
+        regresiones = rendimiento.comparar(
+            {modo: resultado[modo] for modo in ('cliente', 'http') if modo in resultado}, referencia, options['tolerancia'],
+        )
+        for regresion in regresiones:
+            self.stderr.write(regresion)
+        if regresiones:
+            raise CommandError(f'{len(regresiones)} regresiones respecto a {ruta}')
+        self.stdout.write(self.style.SUCCESS(f'\nSin regresiones respecto a {ruta} (tolerancia {options["tolerancia"]:.0%}).'))
+
+
+class _servidor:
+    """URL base del servidor externo o de uno WSGI con hilos levantado en este proceso."""
+
+    def __init__(self, url=None):
+        self.url = url
+
+    def __enter__(self):
+        if self.url:
+            return self.url.rstrip('/')
+        self.wsgi = ThreadedWSGIServer(('127.0.0.1', 0), QuietWSGIRequestHandler, allow_reuse_address=False)
+        self.wsgi.set_app(get_internal_wsgi_application())
+        threading.Thread(target=self.wsgi.serve_forever, daemon=True).start()
+        return f'http://127.0.0.1:{self.wsgi.server_address[1]}'
+
+    def __exit__(self, *exc):
+        if not self.url:
+            self.wsgi.shutdown()
+            self.wsgi.server_close()
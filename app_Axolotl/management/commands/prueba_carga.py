@@ -0,0 +1,103 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+
+from app_Axolotl import carrito
+from app_Axolotl.models import Artista, Cart, CartItem, Producto, Usuario
+
+PREFIJO = 'carga-'
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga de escrituras: N usuarios concurrentes agregan productos a su carrito '
+        'durante S segundos contra la base de datos configurada (AXOLOTL_DB). '
+        'Crea y borra sus propios datos de prueba.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=8)
+        parser.add_argument('--segundos', type=float, default=10)
+        parser.add_argument('--productos', type=int, default=20)
+
+    def handle(self, *args, **options):
+        usuarios = options['usuarios']
+        self.stdout.write(
+            f'Base de datos: {connection.vendor} ({connection.settings_dict["NAME"]}), '
+            f'{usuarios} usuarios, {options["segundos"]} s'
+        )
+        carts, productos = self._preparar(usuarios, options['productos'])
+        try:
+            resultados = self._correr(carts, productos, options['segundos'])
+        finally:
+            self._limpiar()
+
+        latencias = sorted(l for r in resultados for l in r['latencias'])
+        operaciones = len(latencias)
+        errores = sum(r['errores'] for r in resultados)
+        duracion = max(r['duracion'] for r in resultados)
+        self.stdout.write(f'Escrituras: {operaciones} ({operaciones / duracion:.1f}/s)')
+        self.stdout.write(f'Errores "database is locked"/bloqueos: {errores}')
+        if latencias:
+            p95 = latencias[int(len(latencias) * 0.95) - 1] if len(latencias) >= 20 else latencias[-1]
+            self.stdout.write(
+                f'Latencia ms: p50={statistics.median(latencias) * 1000:.1f} p95={p95 * 1000:.1f} '
+                f'max={latencias[-1] * 1000:.1f}'
+            )
+
+    def _preparar(self, usuarios, n_productos):
+        self._limpiar()
+        artista = Artista.objects.create(nombre_artista=f'{PREFIJO}artista', descripcion='')
+        productos = [
+            Producto.objects.create(
+                artista=artista, nombre_producto=f'{PREFIJO}{i}', genero='Pop', tipo='Vinilo',
+                descripcion='', stock=1000, precio=100,
+            )
+            for i in range(n_productos)
+        ]
+        carts = []
+        for i in range(usuarios):
+            usuario = Usuario.objects.create(nombre=f'{PREFIJO}{i}', email=f'{PREFIJO}{i}@axolotl.test')
+            carts.append(Cart.objects.create(usuario=usuario))
+        return carts, productos
+
+    def _limpiar(self):
+        CartItem.objects.filter(cart__usuario__email__startswith=PREFIJO).delete()
+        Usuario.objects.filter(email__startswith=PREFIJO).delete()
+        Artista.objects.filter(nombre_artista=f'{PREFIJO}artista').delete()
+
+    def _correr(self, carts, productos, segundos):
+        barrera = threading.Barrier(len(carts))
+        resultados = [None] * len(carts)
+
+        def trabajador(indice, cart):
+            latencias, errores = [], 0
+            barrera.wait()
+            inicio = time.perf_counter()
+            fin = inicio + segundos
+            i = indice
+            try:
+                while time.perf_counter() < fin:
+                    t0 = time.perf_counter()
+                    try:
+                        carrito.agregar_producto(cart, productos[i % len(productos)], 1)
+                        latencias.append(time.perf_counter() - t0)
+                    except OperationalError:
+                        errores += 1
+                    i += 1
+            finally:
+                resultados[indice] = {
+                    'latencias': latencias, 'errores': errores, 'duracion': time.perf_counter() - inicio,
+                }
+                close_old_connections()
+                connection.close()
+
+        hilos = [threading.Thread(target=trabajador, args=(i, cart)) for i, cart in enumerate(carts)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados
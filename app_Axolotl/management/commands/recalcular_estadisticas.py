@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app_Axolotl import estadisticas
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye las estadísticas del panel (contadores, pedidos por hora, ventas por artista).'
+
+    def handle(self, *args, **options):
+        estadisticas.recalcular()
+        self.stdout.write(self.style.SUCCESS('Estadísticas recalculadas.'))
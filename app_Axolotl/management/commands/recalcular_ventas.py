@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_Axolotl import ventas
+from app_Axolotl.forms import RangoFechasForm
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye las ventas por día (totales, productos, artistas, géneros y tipos) desde los detalles de pedido.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primer día AAAA-MM-DD (por defecto, el del primer detalle)')
+        parser.add_argument('--hasta', help='Último día AAAA-MM-DD (por defecto, el del último detalle)')
+
+    def handle(self, *args, **options):
+        form = RangoFechasForm({clave: options[clave] for clave in ('desde', 'hasta') if options[clave]})
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+        dias = ventas.recalcular(form.cleaned_data['desde'], form.cleaned_data['hasta'])
+        self.stdout.write(self.style.SUCCESS(f'Ventas recalculadas: {dias} días con ventas.'))
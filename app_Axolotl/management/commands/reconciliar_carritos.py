@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app_Axolotl.carrito import reconciliar_contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula num_items/total_cantidad de cada Cart a partir de sus CartItem.'
+
+    def handle(self, *args, **options):
+        reparados = reconciliar_contadores()
+        self.stdout.write(self.style.SUCCESS(f'Carritos reparados: {reparados}'))
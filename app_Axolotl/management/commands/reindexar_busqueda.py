@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app_Axolotl import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de artistas y productos.'
+
+    def handle(self, *args, **options):
+        total = busqueda.reindexar()
+        self.stdout.write(self.style.SUCCESS(f'Filas indexadas: {total}'))
@@ -0,0 +1,29 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Copia la base SQLite primaria a las réplicas locales (AXOLOTL_SQLITE_REPLICA).'
+
+    def handle(self, *args, **options):
+        primario = connections['default'].settings_dict
+        if primario['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Sólo para SQLite; en PostgreSQL la réplica la mantiene la replicación.')
+        if not settings.AXOLOTL_REPLICAS:
+            raise CommandError('No hay réplicas configuradas (AXOLOTL_SQLITE_REPLICA).')
+        origen = sqlite3.connect(str(primario['NAME']))
+        try:
+            for alias in settings.AXOLOTL_REPLICAS:
+                connections[alias].close()
+                destino = sqlite3.connect(str(connections[alias].settings_dict['NAME']))
+                try:
+                    # API de respaldo en línea: copia consistente aunque el primario esté en uso
+                    origen.backup(destino)
+                finally:
+                    destino.close()
+                self.stdout.write(self.style.SUCCESS(f'Réplica {alias} sincronizada'))
+        finally:
+            origen.close()
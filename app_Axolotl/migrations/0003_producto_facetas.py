@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:22
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def poblar_facetas(apps, schema_editor):
+    # Normaliza los valores de texto libre existentes (en lotes para catálogos grandes)
+    Producto = apps.get_model('app_Axolotl', 'Producto')
+    lote = []
+    for producto in Producto.objects.only('id', 'genero', 'tipo').iterator(chunk_size=2000):
+        producto.genero_slug = slugify(producto.genero or '')
+        producto.tipo_slug = slugify(producto.tipo or '')
+        lote.append(producto)
+        if len(lote) >= 2000:
+            Producto.objects.bulk_update(lote, ['genero_slug', 'tipo_slug'])
+            lote = []
+    if lote:
+        Producto.objects.bulk_update(lote, ['genero_slug', 'tipo_slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Axolotl', '0002_usuario_profile_image_cart_cartitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='genero_slug',
+            field=models.SlugField(db_index=False, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='tipo_slug',
+            field=models.SlugField(db_index=False, default='', editable=False),
+        ),
+        migrations.RunPython(poblar_facetas, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['genero_slug', 'nombre_producto'], name='producto_genero_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['tipo_slug', 'nombre_producto'], name='producto_tipo_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['novedad', '-id'], name='producto_novedad_id_idx'),
+        ),
+    ]
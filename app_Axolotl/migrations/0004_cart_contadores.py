@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:24
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def calcular_contadores(apps, schema_editor):
+    Cart = apps.get_model('app_Axolotl', 'Cart')
+    CartItem = apps.get_model('app_Axolotl', 'CartItem')
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    Cart.objects.update(
+        num_items=Coalesce(Subquery(items.annotate(n=Count('id')).values('n')), Value(0), output_field=IntegerField()),
+        total_cantidad=Coalesce(Subquery(items.annotate(n=Sum('cantidad')).values('n')), Value(0), output_field=IntegerField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Axolotl', '0003_producto_facetas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='num_items',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total_cantidad',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
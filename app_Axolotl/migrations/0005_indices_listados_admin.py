@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Axolotl', '0004_cart_contadores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='artista',
+            index=models.Index(fields=['nombre_artista', 'id'], name='artista_nombre_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='detallepedido',
+            index=models.Index(fields=['-fecha', '-id'], name='detalle_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['-fecha', '-id'], name='pedido_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['nombre', 'id'], name='usuario_nombre_id_idx'),
+        ),
+    ]
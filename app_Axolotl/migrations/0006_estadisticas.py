@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:29
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+
+
+def sembrar_estadisticas(apps, schema_editor):
+    # Valores iniciales; desde aquí los mantienen las señales de estadisticas.py
+    get = lambda nombre: apps.get_model('app_Axolotl', nombre)
+    Estadistica = get('Estadistica')
+    for clave, modelo in [('clientes', 'Usuario'), ('artistas', 'Artista'), ('productos', 'Producto'), ('pedidos', 'Pedido')]:
+        Estadistica.objects.create(clave=clave, valor=get(modelo).objects.count())
+    get('EstadisticaHora').objects.bulk_create([
+        get('EstadisticaHora')(hora=fila['h'], pedidos=fila['n'], ingresos=fila['t'] or 0)
+        for fila in get('Pedido').objects.annotate(h=TruncHour('fecha', tzinfo=datetime.timezone.utc))
+        .order_by().values('h').annotate(n=Count('id'), t=Sum('total'))
+    ], batch_size=1000)
+    get('EstadisticaArtista').objects.bulk_create([
+        get('EstadisticaArtista')(artista_id=fila['producto__artista'], unidades=fila['u'] or 0, ingresos=fila['t'] or 0)
+        for fila in get('DetallePedido').objects.order_by().values('producto__artista')
+        .annotate(u=Sum('cantidad_producto'), t=Sum('total'))
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Axolotl', '0005_indices_listados_admin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Estadistica',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=50, unique=True)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EstadisticaArtista',
+            fields=[
+                ('artista', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadistica', serialize=False, to='app_Axolotl.artista')),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EstadisticaHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField(unique=True)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['stock'], name='producto_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='estadisticaartista',
+            index=models.Index(fields=['-unidades'], name='estadistica_artista_unid_idx'),
+        ),
+        migrations.RunPython(sembrar_estadisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+TABLA = 'app_axolotl_busqueda'
+TABLA_VOCAB = 'app_axolotl_busqueda_vocab'
+
+
+def crear_indice(apps, schema_editor):
+    # Índice FTS5 de app_Axolotl/busqueda.py; sólo existe en SQLite
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Artista = apps.get_model('app_Axolotl', 'Artista')
+    Producto = apps.get_model('app_Axolotl', 'Producto')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5(
+            tipo UNINDEXED, objeto_id UNINDEXED, nombre, artista, genero, descripcion,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )""")
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_VOCAB} USING fts5vocab({TABLA}, 'row')")
+        sql = (
+            f'INSERT INTO {TABLA} (rowid, tipo, objeto_id, nombre, artista, genero, descripcion) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s)'
+        )
+        cursor.executemany(sql, [
+            (a.id * 2, 'artista', a.id, a.nombre_artista, a.nombre_artista, '', a.descripcion)
+            for a in Artista.objects.all().iterator()
+        ])
+        cursor.executemany(sql, [
+            (p.id * 2 + 1, 'producto', p.id, p.nombre_producto, p.artista.nombre_artista, p.genero, p.descripcion)
+            for p in Producto.objects.select_related('artista').iterator()
+        ])
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLA_VOCAB}')
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLA}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Axolotl', '0006_estadisticas'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
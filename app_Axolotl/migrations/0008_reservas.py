@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Axolotl', '0007_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('expira', models.DateTimeField()),
+                ('cart', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='app_Axolotl.cart')),
+                ('producto', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='app_Axolotl.producto')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['producto', 'expira', 'cantidad'], name='reserva_producto_expira_idx'), models.Index(fields=['expira'], name='reserva_expira_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cart', 'producto'), name='reserva_cart_producto_uniq')],
+            },
+        ),
+    ]
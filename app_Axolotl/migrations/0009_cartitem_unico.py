@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:04
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def juntar_repetidos(apps, schema_editor):
+    # Los items repetidos (carreras al agregar) se suman en el de id más bajo
+    Cart = apps.get_model('app_Axolotl', 'Cart')
+    CartItem = apps.get_model('app_Axolotl', 'CartItem')
+    repetidos = (
+        CartItem.objects.values('cart_id', 'producto_id')
+        .annotate(n=Count('id'), primero=Min('id'), total=Sum('cantidad'))
+        .filter(n__gt=1)
+    )
+    carts = set()
+    for fila in repetidos:
+        CartItem.objects.filter(pk=fila['primero']).update(cantidad=fila['total'])
+        CartItem.objects.filter(cart_id=fila['cart_id'], producto_id=fila['producto_id']).exclude(pk=fila['primero']).delete()
+        carts.add(fila['cart_id'])
+    if carts:
+        items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        Cart.objects.filter(pk__in=carts).update(
+            num_items=Coalesce(Subquery(items.annotate(n=Count('id')).values('n')), Value(0), output_field=IntegerField()),
+            total_cantidad=Coalesce(Subquery(items.annotate(n=Sum('cantidad')).values('n')), Value(0), output_field=IntegerField()),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Axolotl', '0008_reservas'),
+    ]
+
+    operations = [
+        migrations.RunPython(juntar_repetidos, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'producto'), name='cartitem_cart_producto_uniq'),
+        ),
+    ]
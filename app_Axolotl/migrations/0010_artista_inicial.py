@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:24
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _inicial(nombre):
+    # Copia de models.inicial_de al momento de la migración
+    for caracter in unicodedata.normalize('NFKD', nombre or ''):
+        if unicodedata.combining(caracter) or not caracter.isalnum():
+            continue
+        caracter = caracter.upper()[0]
+        caracter = {'Æ': 'A', 'Ð': 'D', 'Đ': 'D', 'Ł': 'L', 'Ø': 'O', 'Œ': 'O', 'Þ': 'T'}.get(caracter, caracter)
+        return caracter if 'A' <= caracter <= 'Z' else '#'
+    return '#'
+
+
+def poblar_iniciales(apps, schema_editor):
+    # En lotes para catálogos grandes
+    Artista = apps.get_model('app_Axolotl', 'Artista')
+    lote = []
+    for artista in Artista.objects.only('id', 'nombre_artista').iterator(chunk_size=2000):
+        artista.inicial = _inicial(artista.nombre_artista)
+        lote.append(artista)
+        if len(lote) >= 2000:
+            Artista.objects.bulk_update(lote, ['inicial'])
+            lote = []
+    if lote:
+        Artista.objects.bulk_update(lote, ['inicial'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Axolotl', '0009_cartitem_unico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artista',
+            name='inicial',
+            field=models.CharField(default='#', editable=False, max_length=1),
+        ),
+        migrations.RunPython(poblar_iniciales, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='artista',
+            index=models.Index(fields=['inicial', 'nombre_artista', 'id'], name='artista_inicial_nombre_idx'),
+        ),
+    ]
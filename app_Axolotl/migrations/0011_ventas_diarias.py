@@ -0,0 +1,138 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+
+
+def sembrar_ventas(apps, schema_editor):
+    # Histórico inicial; desde aquí lo mantiene ventas.py (o manage.py recalcular_ventas)
+    get = lambda nombre: apps.get_model('app_Axolotl', nombre)
+    detalles = get('DetallePedido').objects.annotate(d=TruncDate('fecha')).order_by()
+    sumas = {'u': Sum('cantidad_producto'), 'i': Sum('total'), 'p': Count('pedido', distinct=True)}
+
+    def en_lotes(modelo, filas, armar):
+        lote = []
+        for fila in filas.annotate(**sumas).iterator(chunk_size=2000):
+            lote.append(modelo(dia=fila['d'], unidades=fila['u'], ingresos=fila['i'], pedidos=fila['p'], **armar(fila)))
+            if len(lote) >= 2000:
+                modelo.objects.bulk_create(lote)
+                lote = []
+        if lote:
+            modelo.objects.bulk_create(lote)
+
+    en_lotes(get('VentaDia'), detalles.values('d'), lambda fila: {})
+    en_lotes(get('VentaProductoDia'), detalles.values('d', 'producto'), lambda fila: {'producto_id': fila['producto']})
+    en_lotes(get('VentaArtistaDia'), detalles.values('d', 'producto__artista'), lambda fila: {'artista_id': fila['producto__artista']})
+    for faceta in ('genero', 'tipo'):
+        en_lotes(
+            get('VentaFacetaDia'),
+            detalles.values('d', f'producto__{faceta}_slug').annotate(nombre=Min(f'producto__{faceta}')),
+            lambda fila: {'faceta': faceta, 'valor': fila[f'producto__{faceta}_slug'], 'nombre': fila['nombre']},
+        )
+    # Los meses salen de sumar los días ya sembrados
+    for mensual, diaria, campo in (('VentaProductoMes', 'VentaProductoDia', 'producto_id'), ('VentaArtistaMes', 'VentaArtistaDia', 'artista_id')):
+        modelo = get(mensual)
+        filas = get(diaria).objects.annotate(m=TruncMonth('dia')).order_by().values('m', campo)
+        lote = []
+        for fila in filas.annotate(u=Sum('unidades'), i=Sum('ingresos'), p=Sum('pedidos')).iterator(chunk_size=2000):
+            lote.append(modelo(mes=fila['m'], unidades=fila['u'], ingresos=fila['i'], pedidos=fila['p'], **{campo: fila[campo]}))
+            if len(lote) >= 2000:
+                modelo.objects.bulk_create(lote)
+                lote = []
+        if lote:
+            modelo.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Axolotl', '0010_artista_inicial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(unique=True)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VentaFacetaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('faceta', models.CharField(choices=[('genero', 'Género'), ('tipo', 'Tipo')], max_length=10)),
+                ('valor', models.CharField(max_length=50)),
+                ('nombre', models.CharField(max_length=50)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dia', 'faceta', 'valor'), name='venta_faceta_dia_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaArtistaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('artista', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='app_Axolotl.artista')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dia', 'artista'), name='venta_artista_dia_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaProductoDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='app_Axolotl.producto')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dia', 'producto'), name='venta_producto_dia_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaArtistaMes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('artista', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_mensuales', to='app_Axolotl.artista')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('mes', 'artista'), name='venta_artista_mes_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaProductoMes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_mensuales', to='app_Axolotl.producto')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('mes', 'producto'), name='venta_producto_mes_uniq')],
+            },
+        ),
+        migrations.RunPython(sembrar_ventas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+import unicodedata
+
+from django.db import migrations
+
+
+def _inicial(nombre):
+    # Copia de models.inicial_de al momento de la migración
+    for caracter in unicodedata.normalize('NFKD', nombre or ''):
+        if unicodedata.combining(caracter) or not caracter.isalnum():
+            continue
+        caracter = caracter.upper()[0]
+        caracter = {'Æ': 'A', 'Ð': 'D', 'Đ': 'D', 'Ł': 'L', 'Ø': 'O', 'Œ': 'O', 'Þ': 'T'}.get(caracter, caracter)
+        return caracter if 'A' <= caracter <= 'Z' else '#'
+    return '#'
+
+
+def corregir_iniciales(apps, schema_editor):
+    # 0010 guardaba 'SS' para 'ß' y '#' para Ø/Æ/Œ...: sólo se reescriben las que cambian
+    Artista = apps.get_model('app_Axolotl', 'Artista')
+    lote = []
+    for artista in Artista.objects.only('id', 'nombre_artista', 'inicial').iterator(chunk_size=2000):
+        inicial = _inicial(artista.nombre_artista)
+        if artista.inicial != inicial:
+            artista.inicial = inicial
+            lote.append(artista)
+        if len(lote) >= 2000:
+            Artista.objects.bulk_update(lote, ['inicial'])
+            lote = []
+    if lote:
+        Artista.objects.bulk_update(lote, ['inicial'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Axolotl', '0011_ventas_diarias'),
+    ]
+
+    operations = [
+        migrations.RunPython(corregir_iniciales, migrations.RunPython.noop),
+    ]
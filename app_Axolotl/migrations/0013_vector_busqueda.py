@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:30
+
+import django.contrib.postgres.search
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+INDICES = (
+    ('Artista', 'artista_busqueda_gin'),
+    ('Producto', 'producto_busqueda_gin'),
+)
+
+
+def crear_indices(apps, schema_editor):
+    # Índices GIN de busqueda.py; sólo existen en PostgreSQL (en SQLite se usa FTS5, ver 0007)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Artista = apps.get_model('app_Axolotl', 'Artista')
+    Producto = apps.get_model('app_Axolotl', 'Producto')
+    # Copia de busqueda._vector_artista/_vector_producto al momento de la migración
+    Artista.objects.update(vector_busqueda=(
+        SearchVector('nombre_artista', weight='A', config='simple')
+        + SearchVector('descripcion', weight='D', config='simple')
+    ))
+    nombre_artista = Subquery(Artista.objects.filter(pk=OuterRef('artista_id')).values('nombre_artista')[:1])
+    Producto.objects.update(vector_busqueda=(
+        SearchVector('nombre_producto', weight='A', config='simple')
+        + SearchVector(nombre_artista, weight='B', config='simple')
+        + SearchVector('genero', weight='C', config='simple')
+        + SearchVector('descripcion', weight='D', config='simple')
+    ))
+    for modelo, nombre in INDICES:
+        schema_editor.add_index(apps.get_model('app_Axolotl', modelo), GinIndex(fields=['vector_busqueda'], name=nombre))
+
+
+def borrar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for modelo, nombre in INDICES:
+        schema_editor.remove_index(apps.get_model('app_Axolotl', modelo), GinIndex(fields=['vector_busqueda'], name=nombre))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_Axolotl', '0012_recalcular_iniciales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artista',
+            name='vector_busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='vector_busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
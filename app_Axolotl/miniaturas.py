@@ -0,0 +1,183 @@
+"""Derivados redimensionados de las imágenes subidas (productos, artistas, perfiles).
+
+Para cada imagen original se generan anchos fijos (`ANCHOS`) en WebP, AVIF
+(si Pillow lo soporta) y JPEG como respaldo. Los nombres de los derivados
+llevan el hash del contenido original (`derivados/<sha256>-<ancho>.<ext>`),
+así que regenerar es idempotente: si el archivo ya existe no se vuelve a
+escribir, y dos subidas con el mismo contenido comparten derivados.
+
+Qué derivados tiene cada original se guarda en un manifiesto JSON por nombre
+de archivo (`derivados/manifiestos/<sha1(nombre)>.json`) y en el caché
+`miniaturas` (uno por imagen, con MAX_ENTRIES a la medida del catálogo), para
+que las plantillas no lean la imagen en cada render. Se generan al guardar
+el modelo (`AXOLOTL_MINIATURAS_AL_SUBIR`) o, si faltan, la primera vez que
+una plantilla los pide. `manage.py generar_miniaturas` rellena el catálogo.
+
+Si un original no se puede procesar (no existe, está corrupto o es una bomba
+de descompresión) se guarda en el caché la marca FALLIDA por REINTENTO
+segundos, para no volver a leerlo ni decodificarlo en cada render; la
+borran una nueva subida y `generar_miniaturas`.
+"""
+import hashlib
+import io
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from .models import Artista, Producto, Usuario
+
+logger = logging.getLogger(__name__)
+
+ANCHOS = (160, 320, 640)
+CARPETA = 'derivados'
+VERSION = 1  # subir si cambian ANCHOS/calidad para invalidar manifiestos
+ALIAS = 'miniaturas'
+FALLIDA = 'fallida'  # en el caché, en lugar del manifiesto, si no se pudo generar
+REINTENTO = 60 * 60
+
+# (extensión, formato PIL, tipo MIME, opciones de guardado)
+FORMATOS = [
+    ('webp', 'WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+]
+if features.check('avif'):
+    FORMATOS.insert(0, ('avif', 'AVIF', 'image/avif', {'quality': 60}))
+
+# Campos de imagen de cada modelo
+CAMPOS = {
+    Producto: 'img',
+    Artista: 'foto',
+    Usuario: 'profile_image',
+}
+
+
+def _cache():
+    return caches[ALIAS]
+
+
+def _clave_cache(nombre):
+    return f'axolotl:miniaturas:{VERSION}:{hashlib.sha1(nombre.encode("utf-8")).hexdigest()}'
+
+
+def descartar_fallo(nombre):
+    """Borra la marca de generación fallida de `nombre` para que se vuelva a intentar."""
+    clave = _clave_cache(nombre)
+    if _cache().get(clave) == FALLIDA:
+        _cache().delete(clave)
+
+
+def _ruta_manifiesto(nombre):
+    return f'{CARPETA}/manifiestos/{hashlib.sha1(nombre.encode("utf-8")).hexdigest()}.json'
+
+
+def _preparar(imagen, formato_pil):
+    if formato_pil == 'JPEG' and imagen.mode not in ('RGB', 'L'):
+        # JPEG no tiene transparencia: se compone sobre blanco
+        fondo = Image.new('RGB', imagen.size, (255, 255, 255))
+        rgba = imagen.convert('RGBA')
+        fondo.paste(rgba, mask=rgba.getchannel('A'))
+        return fondo
+    if imagen.mode not in ('RGB', 'RGBA', 'L'):
+        return imagen.convert('RGBA')
+    return imagen
+
+
+def generar(nombre, storage=None):
+    """Genera (si faltan) los derivados del archivo `nombre` y devuelve su manifiesto.
+
+    El manifiesto es {'ancho': int, 'formatos': {ext: [[ancho, nombre], ...]}, 'mime': {ext: tipo}}.
+    Devuelve None si el original no existe o no es una imagen válida.
+    """
+    storage = storage or default_storage
+    try:
+        with storage.open(nombre, 'rb') as archivo:
+            contenido = archivo.read()
+        original = Image.open(io.BytesIO(contenido))
+        original = ImageOps.exif_transpose(original)
+        original.load()
+    except (FileNotFoundError, OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.warning('No se pudieron generar miniaturas de %s', nombre)
+        _cache().set(_clave_cache(nombre), FALLIDA, REINTENTO)
+        return None
+
+    digest = hashlib.sha256(contenido).hexdigest()[:20]
+    # Sin agrandar: anchos mayores que el original se omiten (queda al menos uno)
+    anchos = [a for a in ANCHOS if a < original.width] or [min(ANCHOS[0], original.width)]
+    manifiesto = {'version': VERSION, 'ancho': original.width, 'formatos': {}, 'mime': {}}
+    for ext, formato_pil, mime, opciones in FORMATOS:
+        manifiesto['mime'][ext] = mime
+        variantes = []
+        for ancho in anchos:
+            destino = f'{CARPETA}/{digest}-{ancho}.{ext}'
+            if not storage.exists(destino):
+                copia = original.copy()
+                copia.thumbnail((ancho, ancho * 4), Image.LANCZOS)
+                buffer = io.BytesIO()
+                _preparar(copia, formato_pil).save(buffer, formato_pil, **opciones)
+                storage.save(destino, ContentFile(buffer.getvalue()))
+            variantes.append([ancho, destino])
+        manifiesto['formatos'][ext] = variantes
+
+    ruta = _ruta_manifiesto(nombre)
+    if storage.exists(ruta):
+        storage.delete(ruta)
+    storage.save(ruta, ContentFile(json.dumps(manifiesto).encode('utf-8')))
+    _cache().set(_clave_cache(nombre), manifiesto, None)
+    return manifiesto
+
+
+def manifiesto(fieldfile, generar_si_falta=True):
+    """Manifiesto de derivados de un `FieldFile` (caché -> archivo -> generación)."""
+    if not fieldfile:
+        return None
+    nombre = fieldfile.name
+    clave = _clave_cache(nombre)
+    datos = _cache().get(clave)
+    if datos == FALLIDA:
+        return None
+    if datos is not None:
+        return datos
+    storage = fieldfile.storage
+    ruta = _ruta_manifiesto(nombre)
+    if storage.exists(ruta):
+        with storage.open(ruta, 'rb') as archivo:
+            datos = json.loads(archivo.read())
+        if datos.get('version') == VERSION:
+            _cache().set(clave, datos, None)
+            return datos
+    if generar_si_falta:
+        return generar(nombre, storage)
+    return None
+
+
+def srcset(fieldfile, ext):
+    datos = manifiesto(fieldfile)
+    if not datos or ext not in datos['formatos']:
+        return ''
+    storage = fieldfile.storage
+    return ', '.join(f'{storage.url(nombre)} {ancho}w' for ancho, nombre in datos['formatos'][ext])
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=Artista)
+@receiver(post_save, sender=Usuario)
+def _generar_al_subir(sender, instance, **kwargs):
+    if not getattr(settings, 'AXOLOTL_MINIATURAS_AL_SUBIR', True):
+        return
+    update_fields = kwargs.get('update_fields')
+    campo = CAMPOS[sender]
+    if update_fields is not None and campo not in update_fields:
+        return
+    fieldfile = getattr(instance, campo)
+    if not fieldfile:
+        return
+    descartar_fallo(fieldfile.name)
+    if _cache().get(_clave_cache(fieldfile.name)) is None:
+        generar(fieldfile.name, fieldfile.storage)
@@ -1,7 +1,34 @@
+import unicodedata
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils.text import slugify
+
+
+def normalizar_faceta(valor):
+    """Forma canónica de un género/tipo ('K-Pop' -> 'k-pop', 'Vinilo' -> 'vinilo')."""
+    return slugify(valor or '')
+
+
+OTRAS = '#'  # inicial de los nombres que no empiezan con una letra A-Z
+LETRAS = [chr(c) for c in range(ord('A'), ord('Z') + 1)] + [OTRAS]
+# Letras latinas que NFKD no descompone en una A-Z más una marca
+EQUIVALENTES = {'Æ': 'A', 'Ð': 'D', 'Đ': 'D', 'Ł': 'L', 'Ø': 'O', 'Œ': 'O', 'Þ': 'T'}
+
+
+def inicial_de(nombre):
+    """Letra del índice A-Z: sin acentos ni signos iniciales ('Ángela' -> 'A', '¡Mayday!' -> 'M', '311' -> '#')."""
+    for caracter in unicodedata.normalize('NFKD', nombre or ''):
+        if unicodedata.combining(caracter) or not caracter.isalnum():
+            continue
+        # upper() puede devolver más de una letra ('ß' -> 'SS'): cuenta la primera
+        caracter = caracter.upper()[0]
+        caracter = EQUIVALENTES.get(caracter, caracter)
+        return caracter if caracter in LETRAS else OTRAS
+    return OTRAS
 
 # ======================
 # MODELO USUARIO
@@ -16,24 +43,36 @@ class Usuario(models.Model):
     codigo_postal = models.IntegerField(blank=True, null=True)
     profile_image = models.ImageField(upload_to='profiles/', blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['nombre', 'id'], name='usuario_nombre_id_idx'),
+        ]
+
     def __str__(self):
         return self.user.username if self.user else self.nombre or self.email
 
 
 # Crear/actualizar perfil automáticamente al crear User
 @receiver(post_save, sender=User)
-def create_or_update_usuario(sender, instance, created, **kwargs):
-    if created:
-        Usuario.objects.create(user=instance, email=instance.email, nombre=instance.username)
-    else:
-        # Actualizar email/nombre si ya existe perfil
-        try:
-            perfil = instance.usuario
-            perfil.email = instance.email
-            perfil.nombre = instance.username
-            perfil.save()
-        except Usuario.DoesNotExist:
-            Usuario.objects.create(user=instance, email=instance.email, nombre=instance.username)
+def create_or_update_usuario(sender, instance, created, update_fields=None, **kwargs):
+    # login() guarda sólo last_login: si no cambió username/email no hay nada que sincronizar
+    if update_fields is not None and not {'username', 'email'} & set(update_fields):
+        return
+    perfil, creado = Usuario.objects.only('id', 'email', 'nombre').get_or_create(
+        user=instance, defaults={'email': instance.email, 'nombre': instance.username},
+    )
+    if creado:
+        return
+    # Actualizar email/nombre sólo si cambiaron
+    cambios = []
+    if perfil.email != instance.email:
+        perfil.email = instance.email
+        cambios.append('email')
+    if perfil.nombre != instance.username:
+        perfil.nombre = instance.username
+        cambios.append('nombre')
+    if cambios:
+        perfil.save(update_fields=cambios)
 
 
 # ======================
@@ -43,6 +82,24 @@ class Artista(models.Model):
     nombre_artista = models.CharField(max_length=100)
     descripcion = models.TextField()
     foto = models.ImageField(upload_to='artistas_fotos/', blank=True, null=True) # Nuevo campo
+    # Letra del índice A-Z de artistas_frontend; se calcula al guardar (ver inicial_de)
+    inicial = models.CharField(max_length=1, editable=False, default=OTRAS)
+    # Documento de búsqueda en PostgreSQL (índice GIN de la migración 0013); lo mantiene busqueda.py
+    vector_busqueda = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['nombre_artista', 'id'], name='artista_nombre_id_idx'),
+            # Una letra del índice ya ordenada, y el conteo por letra, sin leer la tabla
+            models.Index(fields=['inicial', 'nombre_artista', 'id'], name='artista_inicial_nombre_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.inicial = inicial_de(self.nombre_artista)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nombre_artista' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'inicial'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.nombre_artista
@@ -59,11 +116,36 @@ class Producto(models.Model):
     nombre_producto = models.CharField(max_length=100)
     genero = models.CharField(max_length=50)
     tipo = models.CharField(max_length=50)
+    # Versiones normalizadas de genero/tipo; los índices compuestos de Meta las cubren
+    genero_slug = models.SlugField(max_length=50, editable=False, default='', db_index=False)
+    tipo_slug = models.SlugField(max_length=50, editable=False, default='', db_index=False)
     descripcion = models.TextField()
     stock = models.PositiveIntegerField()
     precio = models.DecimalField(max_digits=8, decimal_places=2)
     novedad = models.BooleanField(default=False)
     img = models.ImageField(upload_to='productos_img/', blank=True, null=True) # Nuevo campo
+    # Documento de búsqueda en PostgreSQL (índice GIN de la migración 0013); lo mantiene busqueda.py
+    vector_busqueda = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['stock'], name='producto_stock_idx'),  # poco stock en el panel
+            # Coinciden con los filtros y ordenamientos de genero/tipo/novedades
+            models.Index(fields=['genero_slug', 'nombre_producto'], name='producto_genero_nombre_idx'),
+            models.Index(fields=['tipo_slug', 'nombre_producto'], name='producto_tipo_nombre_idx'),
+            models.Index(fields=['novedad', '-id'], name='producto_novedad_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.genero_slug = normalizar_faceta(self.genero)
+        self.tipo_slug = normalizar_faceta(self.tipo)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            extra = {'genero': 'genero_slug', 'tipo': 'tipo_slug'}
+            kwargs['update_fields'] = set(update_fields) | {
+                extra[f] for f in update_fields if f in extra
+            }
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.nombre_producto} - ${self.precio}"
@@ -81,6 +163,12 @@ class Pedido(models.Model):
     total = models.DecimalField(max_digits=10, decimal_places=2)
     fecha = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Orden de ver_pedidos / paginación por cursor
+            models.Index(fields=['-fecha', '-id'], name='pedido_fecha_id_idx'),
+        ]
+
     def __str__(self):
         return f"Pedido #{self.id} - {self.usuario.nombre}"
 
@@ -104,6 +192,12 @@ class DetallePedido(models.Model):
     fecha = models.DateTimeField(auto_now_add=True)
     total = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Orden de ver_detalles_pedidos / paginación por cursor
+            models.Index(fields=['-fecha', '-id'], name='detalle_fecha_id_idx'),
+        ]
+
     def __str__(self):
         return f"Detalle #{self.id} - {self.producto.nombre_producto} ({self.cantidad_producto})"
 
@@ -114,6 +208,9 @@ class DetallePedido(models.Model):
 class Cart(models.Model):
     usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, related_name='cart')
     updated = models.DateTimeField(auto_now=True)
+    # Contadores desnormalizados (ver carrito.py); se mantienen con updates F()
+    num_items = models.PositiveIntegerField(default=0)
+    total_cantidad = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"Carrito - {self.usuario.nombre or self.usuario.email}"
@@ -125,8 +222,174 @@ class CartItem(models.Model):
     cantidad = models.PositiveIntegerField(default=1)
     added = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # Un item por producto: permite fusionar carritos con un upsert
+            models.UniqueConstraint(fields=['cart', 'producto'], name='cartitem_cart_producto_uniq'),
+        ]
+
     def subtotal(self):
         return self.cantidad * self.producto.precio
 
     def __str__(self):
-        return f"{self.cantidad} x {self.producto.nombre_producto}"
\ No newline at end of file
+        return f"{self.cantidad} x {self.producto.nombre_producto}"
+
+
+class Reserva(models.Model):
+    # Unidades apartadas por un carrito hasta `expira` (ver reservas.py)
+    # Sin índice propio: los cubren la restricción única y el índice de Meta
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservas', db_index=False)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='reservas', db_index=False)
+    cantidad = models.PositiveIntegerField()
+    expira = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'producto'], name='reserva_cart_producto_uniq'),
+        ]
+        indexes = [
+            # Unidades apartadas de un producto: SUM(cantidad) WHERE expira > ahora sale sólo del índice
+            models.Index(fields=['producto', 'expira', 'cantidad'], name='reserva_producto_expira_idx'),
+            # Barrido de reservas vencidas
+            models.Index(fields=['expira'], name='reserva_expira_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.cantidad} x {self.producto_id} hasta {self.expira:%H:%M}"
+
+# ======================
+# ESTADÍSTICAS DEL PANEL
+# ======================
+# Se mantienen incrementalmente desde estadisticas.py; el comando
+# `recalcular_estadisticas` las reconstruye desde las tablas fuente.
+class Estadistica(models.Model):
+    clave = models.CharField(max_length=50, unique=True)
+    valor = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.clave} = {self.valor}"
+
+
+class EstadisticaHora(models.Model):
+    hora = models.DateTimeField(unique=True)  # inicio de la hora (UTC)
+    pedidos = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.hora:%Y-%m-%d %H}h: {self.pedidos} pedidos"
+
+
+class EstadisticaArtista(models.Model):
+    artista = models.OneToOneField(Artista, on_delete=models.CASCADE, primary_key=True, related_name='estadistica')
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-unidades'], name='estadistica_artista_unid_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.artista_id}: {self.unidades} unidades"
+
+
+# ======================
+# VENTAS POR DÍA
+# ======================
+# Se mantienen incrementalmente desde ventas.py; el comando `recalcular_ventas`
+# las reconstruye. El día es la fecha local de DetallePedido.fecha y `pedidos`
+# cuenta pedidos distintos. Las tablas por mes suman las de día (un pedido es
+# de un solo día) para que los rangos largos lean meses enteros.
+class VentaDia(models.Model):
+    dia = models.DateField(unique=True)
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pedidos = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.dia}: {self.pedidos} pedidos"
+
+
+class VentaProductoDia(models.Model):
+    dia = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='ventas_diarias')
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pedidos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'producto'], name='venta_producto_dia_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} producto {self.producto_id}: {self.unidades} unidades"
+
+
+class VentaArtistaDia(models.Model):
+    dia = models.DateField()
+    artista = models.ForeignKey(Artista, on_delete=models.CASCADE, related_name='ventas_diarias')
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pedidos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'artista'], name='venta_artista_dia_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} artista {self.artista_id}: {self.unidades} unidades"
+
+
+class VentaProductoMes(models.Model):
+    mes = models.DateField()  # primer día del mes
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='ventas_mensuales')
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pedidos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'producto'], name='venta_producto_mes_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%Y-%m} producto {self.producto_id}: {self.unidades} unidades"
+
+
+class VentaArtistaMes(models.Model):
+    mes = models.DateField()  # primer día del mes
+    artista = models.ForeignKey(Artista, on_delete=models.CASCADE, related_name='ventas_mensuales')
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pedidos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'artista'], name='venta_artista_mes_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%Y-%m} artista {self.artista_id}: {self.unidades} unidades"
+
+
+class VentaFacetaDia(models.Model):
+    FACETAS = [('genero', 'Género'), ('tipo', 'Tipo')]
+
+    dia = models.DateField()
+    faceta = models.CharField(max_length=10, choices=FACETAS)
+    valor = models.CharField(max_length=50)  # slug (normalizar_faceta)
+    nombre = models.CharField(max_length=50)  # como se muestra
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pedidos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'faceta', 'valor'], name='venta_faceta_dia_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.faceta}={self.valor}: {self.unidades} unidades"
+
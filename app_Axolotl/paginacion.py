@@ -0,0 +1,151 @@
+"""Paginación por cursor (keyset) para las listas del panel de administración.
+
+En lugar de OFFSET, cada página se pide con los valores de orden de la última
+fila vista (`?despues=<cursor>`) o de la primera (`?antes=<cursor>`), así que
+el costo de una página no depende de qué tan profundo esté en la lista: la
+base de datos salta directo al punto del índice.
+
+El orden siempre termina en la clave primaria para que el cursor sea único.
+Un cursor que no corresponde al orden (alterado a mano, de otra lista) se
+ignora y se sirve la primera página.
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+POR_PAGINA = 50
+
+
+@dataclass
+class PaginaKeyset:
+    items: list
+    siguiente: str = ''
+    anterior: str = ''
+    busqueda: str = ''
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def tiene_siguiente(self):
+        return bool(self.siguiente)
+
+    @property
+    def tiene_anterior(self):
+        return bool(self.anterior)
+
+
+def _codificar(valores):
+    datos = json.dumps(valores, default=str, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+
+def _decodificar(cursor):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        return None
+
+
+def _normalizar_orden(queryset, orden):
+    orden = list(orden)
+    pk = queryset.model._meta.pk.name
+    nombres = [campo.lstrip('-') for campo in orden]
+    if pk not in nombres and 'pk' not in nombres:
+        orden.append('-' + pk if orden and orden[0].startswith('-') else pk)
+    return orden
+
+
+def _campo(queryset, nombre):
+    modelo = queryset.model
+    for parte in nombre.split('__'):
+        campo = modelo._meta.get_field(parte)
+        modelo = campo.related_model or modelo
+    return campo
+
+
+def _filtro_despues(queryset, orden, valores):
+    """Construye `(a, b, c) > (va, vb, vc)` respetando la dirección de cada campo."""
+    condicion = Q()
+    iguales = {}
+    for campo, valor in zip(orden, valores):
+        nombre = campo.lstrip('-')
+        valor = _campo(queryset, nombre).to_python(valor)
+        if valor is None:
+            raise ValueError(f'cursor sin valor para {nombre}')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        condicion |= Q(**iguales, **{f'{nombre}__{operador}': valor})
+        iguales[nombre] = valor
+    return condicion
+
+
+def _filtro_cursor(request, parametro, queryset, orden):
+    """Filtro del cursor `?<parametro>=` para `orden`, o None si falta o no es válido."""
+    valores = _decodificar(request.GET.get(parametro, ''))
+    if not isinstance(valores, list) or len(valores) != len(orden):
+        return None
+    try:
+        return _filtro_despues(queryset, orden, valores)
+    except (ValidationError, TypeError, ValueError):
+        return None
+
+
+def _invertir(orden):
+    return [campo[1:] if campo.startswith('-') else '-' + campo for campo in orden]
+
+
+def paginar(request, queryset, orden, busqueda_en=(), por_pagina=POR_PAGINA):
+    """Devuelve una `PaginaKeyset` de `queryset` ordenado por `orden`.
+
+    `busqueda_en` es una lista de lookups (p.ej. 'nombre_producto__icontains')
+    que se combinan con OR usando el parámetro `?q=`.
+    """
+    orden = _normalizar_orden(queryset, orden)
+    nombres = [campo.lstrip('-') for campo in orden]
+
+    busqueda = (request.GET.get('q') or '').strip()
+    if busqueda and busqueda_en:
+        filtro = Q()
+        for lookup in busqueda_en:
+            filtro |= Q(**{lookup: busqueda})
+        queryset = queryset.filter(filtro)
+
+    despues = _filtro_cursor(request, 'despues', queryset, orden)
+    antes = _filtro_cursor(request, 'antes', queryset, _invertir(orden))
+    hacia_atras = antes is not None and despues is None
+
+    if hacia_atras:
+        orden_consulta = _invertir(orden)
+        queryset = queryset.filter(antes)
+    else:
+        orden_consulta = orden
+        if despues is not None:
+            queryset = queryset.filter(despues)
+
+    filas = list(queryset.order_by(*orden_consulta)[:por_pagina + 1])
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if hacia_atras:
+        filas.reverse()
+
+    def cursor(fila):
+        return _codificar([_valor(fila, nombre) for nombre in nombres])
+
+    pagina = PaginaKeyset(items=filas, busqueda=busqueda)
+    if filas:
+        if hacia_atras:
+            pagina.anterior = cursor(filas[0]) if hay_mas else ''
+            pagina.siguiente = cursor(filas[-1])
+        else:
+            pagina.siguiente = cursor(filas[-1]) if hay_mas else ''
+            pagina.anterior = cursor(filas[0]) if despues is not None else ''
+    return pagina
+
+
+def _valor(fila, nombre):
+    valor = fila
+    for parte in nombre.split('__'):
+        valor = getattr(valor, parte)
+    return valor
@@ -0,0 +1,291 @@
+"""Escenarios de la prueba de rendimiento (`manage.py medir_rendimiento`).
+
+Cada escenario es una URL por nombre con el rol que la visita. Los parámetros
+van rotando sobre los datos de `datos_sinteticos` (artistas, géneros, tipos,
+productos), así que no se mide sólo la misma fila caliente.
+
+Hay dos formas de correrlos:
+
+- `correr_cliente`: peticiones secuenciales con el `Client` de pruebas, sin
+  red. Da la latencia de la vista y cuántas consultas hace por petición
+  (se cuentan en una petición aparte, para que capturarlas no infle los
+  tiempos).
+- `correr_http`: `concurrencia` hilos contra un servidor HTTP real (el que
+  levanta el comando o uno externo) durante `segundos` por escenario. Da el
+  throughput bajo carga.
+
+Las vistas del catálogo se piden con sesión de cliente: para anónimos
+responde el caché de páginas y se mediría el caché, no la vista.
+
+`comparar` contrasta un resultado con la referencia guardada en JSON:
+cualquier consulta de más es regresión (el número es determinista); la
+latencia (mediana) y el throughput se comparan con una tolerancia relativa.
+"""
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from . import datos_sinteticos
+from .models import Artista, Producto
+
+REFERENCIA = Path(__file__).with_name('rendimiento_referencia.json')
+TOLERANCIA = 0.5
+# Diferencias de latencia menores a esto son ruido aunque superen la tolerancia
+MARGEN_MS = 5.0
+
+
+@dataclass
+class Objetivos:
+    """Valores sobre los que rotan los parámetros de los escenarios."""
+    artistas: list
+    generos: list
+    tipos: list
+    productos: list
+
+    @classmethod
+    def desde_base(cls):
+        prefijo = datos_sinteticos.PREFIJO
+        productos = Producto.objects.filter(nombre_producto__startswith=prefijo)
+        return cls(
+            artistas=list(Artista.objects.filter(nombre_artista__startswith=prefijo).order_by('id').values_list('nombre_artista', flat=True)),
+            generos=sorted(set(productos.values_list('genero', flat=True))),
+            tipos=sorted(set(productos.values_list('tipo', flat=True))),
+            productos=list(productos.order_by('id').values_list('id', flat=True)[:1000]),
+        )
+
+
+@dataclass
+class Escenario:
+    nombre: str  # nombre de la URL
+    rol: str  # 'cliente' o 'staff'
+    metodo: str = 'get'
+
+    def peticion(self, objetivos, i):
+        """(path, datos) de la i-ésima petición."""
+        if self.nombre == 'comprar_frontend':
+            return reverse(self.nombre), {'artista': _rotar(objetivos.artistas, i)}
+        if self.nombre == 'genero_frontend':
+            return reverse(self.nombre), {'genero': _rotar(objetivos.generos, i)}
+        if self.nombre == 'tipo_frontend':
+            return reverse(self.nombre), {'tipo': _rotar(objetivos.tipos, i)}
+        if self.nombre == 'add_to_cart':
+            return reverse(self.nombre, args=[_rotar(objetivos.productos, i)]), {'next': reverse('ver_carrito')}
+        return reverse(self.nombre), {}
+
+
+ESCENARIOS = [
+    Escenario('comprar_frontend', 'cliente'),
+    Escenario('genero_frontend', 'cliente'),
+    Escenario('tipo_frontend', 'cliente'),
+    Escenario('ver_carrito', 'cliente'),
+    Escenario('add_to_cart', 'cliente', 'post'),
+    Escenario('ver_detalles_pedidos', 'staff'),
+]
+
+
+def _rotar(valores, i):
+    return valores[i % len(valores)]
+
+
+def _error(status):
+    return status >= 400
+
+
+def _resumen(latencias, duracion, errores, consultas=None):
+    ordenadas = sorted(latencias)
+
+    def percentil(p):
+        return round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))] * 1000, 2) if ordenadas else 0
+
+    resultado = {
+        'peticiones': len(latencias),
+        'errores': errores,
+        'rps': round(len(latencias) / duracion, 1) if duracion else 0,
+        'media_ms': round(statistics.fmean(latencias) * 1000, 2) if latencias else 0,
+        'p50_ms': percentil(50),
+        'p90_ms': percentil(90),
+        'p99_ms': percentil(99),
+    }
+    if consultas is not None:
+        resultado['consultas'] = consultas
+    return resultado
+
+
+# ----------------------
+# Base temporal
+# ----------------------
+@contextmanager
+def base_temporal():
+    """Crea las bases de prueba (SQLite en un archivo temporal) y las destruye al salir."""
+    carpeta = tempfile.mkdtemp(prefix='axolotl-rendimiento-')
+    for alias in connections:
+        ajustes = connections[alias].settings_dict
+        if ajustes['ENGINE'].endswith('sqlite3') and not ajustes['TEST'].get('MIRROR'):
+            # En archivo y no en memoria: así la ven también los hilos del servidor HTTP
+            ajustes['TEST']['NAME'] = str(Path(carpeta) / f'{alias}.sqlite3')
+    viejas = setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+    try:
+        yield
+    finally:
+        teardown_databases(viejas, verbosity=0)
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+# ----------------------
+# Sesiones
+# ----------------------
+def clientes_de_prueba(cliente=0):
+    """{rol: Client con sesión iniciada} para los usuarios sintéticos."""
+    clientes = {}
+    for rol, username in (('cliente', datos_sinteticos.usuario_cliente(cliente)), ('staff', datos_sinteticos.usuario_staff())):
+        clientes[rol] = Client()
+        clientes[rol].force_login(User.objects.get(username=username))
+    return clientes
+
+
+def cookies_de(clientes):
+    """{rol: (cabecera Cookie, token CSRF)} con la sesión de cada Client y un token propio."""
+    cookies = {}
+    for rol, cliente in clientes.items():
+        token = get_random_string(32)
+        cookies[rol] = (
+            f'{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}; '
+            f'{settings.CSRF_COOKIE_NAME}={token}',
+            token,
+        )
+    return cookies
+
+
+# ----------------------
+# Client de pruebas
+# ----------------------
+def correr_cliente(escenarios, objetivos, clientes, iteraciones=50):
+    """{escenario: resumen} con peticiones secuenciales por el Client de pruebas."""
+    resultados = {}
+    for escenario in escenarios:
+        cliente = clientes[escenario.rol]
+        enviar = getattr(cliente, escenario.metodo)
+        # Una petición para calentar y otra para contar consultas
+        enviar(*escenario.peticion(objetivos, 0))
+        with CaptureQueriesContext(connection) as capturadas:
+            enviar(*escenario.peticion(objetivos, 1))
+        # Antes de la próxima petición: request_started vacía el registro de consultas
+        consultas = len(capturadas.captured_queries)
+        latencias, errores = [], 0
+        inicio = time.perf_counter()
+        for i in range(iteraciones):
+            path, datos = escenario.peticion(objetivos, i + 2)
+            t0 = time.perf_counter()
+            respuesta = enviar(path, datos)
+            latencias.append(time.perf_counter() - t0)
+            errores += _error(respuesta.status_code)
+        resultados[escenario.nombre] = _resumen(latencias, time.perf_counter() - inicio, errores, consultas)
+    return resultados
+
+
+# ----------------------
+# HTTP concurrente
+# ----------------------
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _pedir(abridor, base, escenario, objetivos, i, cookie):
+    path, datos = escenario.peticion(objetivos, i)
+    cuerpo = None
+    cabeceras = {'Cookie': cookie[0]}
+    if escenario.metodo == 'post':
+        cuerpo = urlencode(datos).encode()
+        cabeceras['X-CSRFToken'] = cookie[1]
+    elif datos:
+        path = f'{path}?{urlencode(datos)}'
+    try:
+        with abridor.open(urllib.request.Request(base + path, data=cuerpo, headers=cabeceras), timeout=30) as respuesta:
+            respuesta.read()
+            return respuesta.status
+    except urllib.error.HTTPError as error:
+        # Las redirecciones (add_to_cart) llegan como HTTPError al no seguirlas
+        return error.code
+
+
+def correr_http(base, escenarios, objetivos, cookies, concurrencia=8, segundos=3.0):
+    """{escenario: resumen} con `concurrencia` hilos contra `base` (http://host:puerto)."""
+    resultados = {}
+    for escenario in escenarios:
+        barrera = threading.Barrier(concurrencia)
+        por_hilo = [None] * concurrencia
+
+        def trabajador(indice):
+            abridor = urllib.request.build_opener(_SinRedirecciones)
+            latencias, errores = [], 0
+            barrera.wait()
+            fin = time.perf_counter() + segundos
+            i = indice
+            while time.perf_counter() < fin:
+                t0 = time.perf_counter()
+                try:
+                    status = _pedir(abridor, base, escenario, objetivos, i, cookies[escenario.rol])
+                except OSError:
+                    status = 599
+                latencias.append(time.perf_counter() - t0)
+                errores += _error(status)
+                i += concurrencia
+            por_hilo[indice] = (latencias, errores)
+
+        hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(concurrencia)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+        resultados[escenario.nombre] = _resumen(
+            [l for latencias, _ in por_hilo for l in latencias], duracion, sum(e for _, e in por_hilo),
+        )
+    return resultados
+
+
+# ----------------------
+# Comparación con la referencia
+# ----------------------
+def comparar(actual, referencia, tolerancia=TOLERANCIA):
+    """Lista de regresiones ('modo/escenario: ...') de `actual` respecto a `referencia`.
+
+    Ambos son {'cliente': {escenario: resumen}, 'http': {...}}; los escenarios
+    que no están en la referencia no se comparan.
+    """
+    regresiones = []
+    for modo, escenarios in actual.items():
+        for nombre, medido in escenarios.items():
+            base = referencia.get(modo, {}).get(nombre)
+            if not base:
+                continue
+            etiqueta = f'{modo}/{nombre}'
+            if 'consultas' in base and medido.get('consultas', 0) > base['consultas']:
+                regresiones.append(f"{etiqueta}: {medido['consultas']} consultas (referencia {base['consultas']})")
+            if medido['errores'] > base['errores']:
+                regresiones.append(f"{etiqueta}: {medido['errores']} errores (referencia {base['errores']})")
+            # La mediana: con pocas decenas de muestras el p90 depende de una o dos peticiones
+            limite = base['p50_ms'] * (1 + tolerancia)
+            if medido['p50_ms'] > limite and medido['p50_ms'] - base['p50_ms'] > MARGEN_MS:
+                regresiones.append(f"{etiqueta}: p50 {medido['p50_ms']} ms (referencia {base['p50_ms']} ms)")
+            if modo == 'http' and medido['rps'] < base['rps'] * (1 - tolerancia):
+                regresiones.append(f"{etiqueta}: {medido['rps']} peticiones/s (referencia {base['rps']})")
+    return regresiones
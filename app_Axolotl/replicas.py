@@ -0,0 +1,128 @@
+"""Lecturas del catálogo y del panel desde réplicas de la base de datos.
+
+Las vistas de sólo lectura se marcan con `@lectura_replica`; mientras corren,
+`RouterReplicas` manda las lecturas a un alias de `AXOLOTL_REPLICAS`. Todo
+lo demás (escrituras, transacciones, carrito, perfil, formularios del panel)
+va al primario ('default').
+
+Primario pegajoso: después de una petición que escribe (POST, PUT, PATCH o
+DELETE), `PrimarioPegajosoMiddleware` guarda en la sesión un plazo de
+`AXOLOTL_PRIMARIO_PEGAJOSO` segundos durante el cual esa sesión lee del
+primario, para que el usuario vea sus propios cambios aunque la réplica vaya
+atrasada.
+
+En local se prueba con dos archivos SQLite (`AXOLOTL_SQLITE_REPLICA`) y
+`manage.py sincronizar_replica` para copiar el primario a la réplica.
+"""
+import contextvars
+import functools
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SESION_PRIMARIO_HASTA = 'primario_hasta'
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+_usar_replica = contextvars.ContextVar('axolotl_usar_replica', default=False)
+
+
+def replicas():
+    return list(getattr(settings, 'AXOLOTL_REPLICAS', []))
+
+
+def primario_pegajoso(request):
+    """True si la sesión escribió hace menos de AXOLOTL_PRIMARIO_PEGAJOSO segundos."""
+    sesion = getattr(request, 'session', None)
+    if sesion is None:
+        return False
+    return sesion.get(SESION_PRIMARIO_HASTA, 0) > time.time()
+
+
+async def aprimario_pegajoso(request):
+    sesion = getattr(request, 'session', None)
+    if sesion is None:
+        return False
+    return (await sesion.aget(SESION_PRIMARIO_HASTA, 0)) > time.time()
+
+
+def lectura_replica(vista):
+    """Marca una vista de sólo lectura: sus consultas de lectura van a una réplica."""
+    if iscoroutinefunction(vista):
+        @functools.wraps(vista)
+        async def envoltura_async(request, *args, **kwargs):
+            if request.method not in METODOS_SEGUROS or not replicas() or await aprimario_pegajoso(request):
+                return await vista(request, *args, **kwargs)
+            # El ORM async copia el contexto al hilo donde corre la consulta
+            token = _usar_replica.set(True)
+            try:
+                return await vista(request, *args, **kwargs)
+            finally:
+                _usar_replica.reset(token)
+        return envoltura_async
+
+    @functools.wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if request.method not in METODOS_SEGUROS or not replicas() or primario_pegajoso(request):
+            return vista(request, *args, **kwargs)
+        token = _usar_replica.set(True)
+        try:
+            return vista(request, *args, **kwargs)
+        finally:
+            _usar_replica.reset(token)
+    return envoltura
+
+
+class RouterReplicas:
+    def db_for_read(self, model, **hints):
+        if not _usar_replica.get():
+            return DEFAULT_DB_ALIAS
+        # Dentro de una transacción se lee lo que la transacción ve
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        disponibles = replicas()
+        return random.choice(disponibles) if disponibles else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplicas tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación (o sincronizar_replica)
+        return db not in replicas()
+
+
+class PrimarioPegajosoMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def _debe_marcar(self, request):
+        return request.method not in METODOS_SEGUROS and getattr(request, 'session', None) is not None and replicas()
+
+    def _hasta(self):
+        return time.time() + getattr(settings, 'AXOLOTL_PRIMARIO_PEGAJOSO', 5)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        respuesta = self.get_response(request)
+        if self._debe_marcar(request):
+            request.session[SESION_PRIMARIO_HASTA] = self._hasta()
+        return respuesta
+
+    async def __acall__(self, request):
+        respuesta = await self.get_response(request)
+        if self._debe_marcar(request):
+            await request.session.aset(SESION_PRIMARIO_HASTA, self._hasta())
+        return respuesta
@@ -0,0 +1,116 @@
+"""Reserva de stock para los productos que están en un carrito (opcional).
+
+Con `AXOLOTL_RESERVAS` activo, agregar al carrito aparta las unidades durante
+`AXOLOTL_RESERVA_MINUTOS`: mientras la reserva esté vigente nadie más puede
+llevarse esas unidades, y cada cambio en el carrito la renueva. El stock del
+producto no se toca hasta el checkout; lo disponible es
+
+    stock - SUM(cantidad) de las reservas de otros carritos con expira > ahora
+
+que se resuelve con el índice (producto, expira, cantidad) sin leer la tabla.
+
+Las reservas vencidas ya no cuentan, así que liberarlas es sólo limpieza:
+`manage.py liberar_reservas` las borra por lotes (una vez o en bucle con
+`--cada`).
+
+Concurrencia: `reservar` bloquea la fila del producto (`select_for_update`)
+antes de sumar las reservas, así que las reservas del mismo producto se
+serializan. En SQLite el bloqueo lo da la transacción IMMEDIATE del perfil de
+base de datos.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Producto, Reserva
+
+LOTE = 1000
+
+
+class SinExistencias(Exception):
+    def __init__(self, producto, disponibles):
+        self.producto = producto
+        self.disponibles = disponibles
+        super().__init__(f'Sólo quedan {disponibles} unidades disponibles de "{producto.nombre_producto}".')
+
+
+def activas():
+    return getattr(settings, 'AXOLOTL_RESERVAS', False)
+
+
+def duracion():
+    return timedelta(minutes=getattr(settings, 'AXOLOTL_RESERVA_MINUTOS', 15))
+
+
+def reservado_por_otros(producto_ids, cart_id, ahora=None):
+    """{producto_id: unidades con reserva vigente de otros carritos}."""
+    ahora = ahora or timezone.now()
+    filas = (
+        Reserva.objects.filter(producto_id__in=producto_ids, expira__gt=ahora).exclude(cart_id=cart_id)
+        .order_by().values('producto_id').annotate(n=Sum('cantidad')).values_list('producto_id', 'n')
+    )
+    return dict(filas)
+
+
+def disponibles(producto_ids):
+    """{producto_id: stock - reservas vigentes} en una consulta."""
+    reservado = (
+        Reserva.objects.filter(producto=OuterRef('pk'), expira__gt=timezone.now())
+        .order_by().values('producto').annotate(n=Sum('cantidad')).values('n')
+    )
+    return dict(
+        Producto.objects.filter(pk__in=producto_ids)
+        .annotate(libres=F('stock') - Coalesce(Subquery(reservado), Value(0)))
+        .values_list('pk', 'libres')
+    )
+
+
+def para_carrito(items, cart_id=None):
+    """Anota en cada item del carrito `disponibles`: lo que ese carrito puede llevarse.
+
+    Es el stock menos las reservas vigentes de otros carritos (una consulta,
+    sólo con reservas activas); los items traen el producto con su stock.
+    """
+    items = list(items)
+    otros = reservado_por_otros([item.producto.id for item in items], cart_id) if activas() and items else {}
+    for item in items:
+        item.disponibles = max(item.producto.stock - otros.get(item.producto.id, 0), 0)
+    return items
+
+
+def reservar(cart, producto, cantidad):
+    """Deja reservadas `cantidad` unidades (total del carrito, no un incremento).
+
+    Debe llamarse dentro de la transacción que modifica el `CartItem`; lanza
+    `SinExistencias` sin escribir nada si no alcanzan.
+    """
+    ahora = timezone.now()
+    # Serializa las reservas del mismo producto
+    stock = Producto.objects.select_for_update().values_list('stock', flat=True).get(pk=producto.pk)
+    libres = stock - reservado_por_otros([producto.pk], cart.pk, ahora).get(producto.pk, 0)
+    if cantidad > libres:
+        raise SinExistencias(producto, max(libres, 0))
+    expira = ahora + duracion()
+    if not Reserva.objects.filter(cart=cart, producto=producto).update(cantidad=cantidad, expira=expira):
+        Reserva.objects.create(cart=cart, producto=producto, cantidad=cantidad, expira=expira)
+
+
+def liberar(cart, producto_id=None):
+    reservas = Reserva.objects.filter(cart=cart)
+    if producto_id is not None:
+        reservas = reservas.filter(producto_id=producto_id)
+    reservas.delete()
+
+
+def liberar_vencidas(lote=LOTE):
+    """Borra las reservas vencidas en lotes de `lote` filas; devuelve cuántas borró."""
+    total = 0
+    while True:
+        ids = list(Reserva.objects.filter(expira__lte=timezone.now()).values_list('pk', flat=True)[:lote])
+        if not ids:
+            return total
+        # Lotes cortos: cada DELETE retiene el bloqueo de escritura poco tiempo
+        total += Reserva.objects.filter(pk__in=ids).delete()[0]
@@ -1,17 +1,26 @@
 from django import template
 from django.core.exceptions import ObjectDoesNotExist
 
+from .. import carrito_anonimo
+from ..carrito import SESION_CUENTA
+
 register = template.Library()
 
 @register.simple_tag(takes_context=True)
 def get_cart_count(context, user):
+    request = context.get('request')
+    if not user.is_authenticated:
+        # Visitante: productos distintos en la cookie del carrito
+        return carrito_anonimo.cuenta(request) if request is not None else 0
+    # El contador vive en la sesión (lo actualizan las vistas del carrito),
+    # así que el badge no cuesta consultas extra en cada página.
+    session = getattr(request, 'session', None)
+    if session is not None and SESION_CUENTA in session:
+        return session[SESION_CUENTA]
     try:
-        if not user.is_authenticated:
-            return 0
-        perfil = user.usuario
-        cart = getattr(perfil, 'cart', None)
-        if cart is None:
-            return 0
-        return cart.items.count()
-    except Exception:
-        return 0
+        count = user.usuario.cart.num_items
+    except ObjectDoesNotExist:
+        count = 0
+    if session is not None:
+        session[SESION_CUENTA] = count
+    return count
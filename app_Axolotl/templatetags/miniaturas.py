@@ -0,0 +1,44 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from .. import miniaturas
+
+register = template.Library()
+
+TAMANOS_DEFECTO = '(max-width: 600px) 50vw, 240px'
+
+
+@register.simple_tag
+def srcset(fieldfile, ext='jpg'):
+    """Atributo srcset de los derivados de una imagen en el formato indicado."""
+    return miniaturas.srcset(fieldfile, ext)
+
+
+@register.simple_tag
+def imagen_responsiva(fieldfile, alt='', sizes=TAMANOS_DEFECTO, clase='', estilo=''):
+    """<picture> con fuentes AVIF/WebP y un <img> JPEG de respaldo.
+
+    Si la imagen no se puede procesar se usa el archivo original tal cual.
+    """
+    if not fieldfile:
+        return ''
+    datos = miniaturas.manifiesto(fieldfile)
+    if not datos:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}" loading="lazy">', fieldfile.url, alt, clase, estilo,
+        )
+    storage = fieldfile.storage
+    fuentes = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (datos['mime'][ext], miniaturas.srcset(fieldfile, ext), sizes)
+            for ext in datos['formatos'] if ext != 'jpg'
+        ),
+    )
+    jpegs = datos['formatos']['jpg']
+    # src de respaldo: la variante intermedia
+    respaldo = storage.url(jpegs[len(jpegs) // 2][1])
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" style="{}" loading="lazy" decoding="async"></picture>',
+        fuentes, respaldo, miniaturas.srcset(fieldfile, 'jpg'), sizes, alt, clase, estilo,
+    )
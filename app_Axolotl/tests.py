@@ -1,3 +1,1612 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.template import Context, Template
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.http import Http404, HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import (
+    acciones, auditoria_consultas, busqueda, cache_catalogo, carrito, carrito_anonimo, checkout, datos_sinteticos,
+    estadisticas, estaticos, exportaciones, importacion, instrumentacion, miniaturas, paginacion, rendimiento, replicas,
+    reservas, ventas, views,
+)
+from .carrito import SESION_CUENTA
+from .models import (
+    Artista, Cart, CartItem, DetallePedido, EstadisticaArtista, EstadisticaHora, Pedido, Producto, Reserva, Usuario,
+    VentaArtistaDia,
+    VentaArtistaMes, VentaDia, VentaFacetaDia, VentaProductoMes, inicial_de,
+)
+
+
+def crear_staff():
+    return User.objects.create_user(username='staff', email='staff@example.com', password='x', is_staff=True)
+
+
+def crear_artista(nombre='Sabrina', descripcion=''):
+    return Artista.objects.create(nombre_artista=nombre, descripcion=descripcion)
+
+
+def crear_producto(artista, **kwargs):
+    datos = {
+        'nombre_producto': 'Album',
+        'genero': 'Pop',
+        'tipo': 'Vinilo',
+        'descripcion': '',
+        'stock': 10,
+        'precio': Decimal('100.00'),
+    }
+    datos.update(kwargs)
+    return Producto.objects.create(artista=artista, **datos)
+
+
+class FacetasTests(TestCase):
+    def setUp(self):
+        caches['catalogo'].clear()
+        self.artista = crear_artista()
+
+    def test_save_normaliza_genero_y_tipo(self):
+        producto = crear_producto(self.artista, genero=' K-Pop ', tipo='CD')
+        self.assertEqual(producto.genero_slug, 'k-pop')
+        self.assertEqual(producto.tipo_slug, 'cd')
+
+        producto.tipo = 'Casete'
+        producto.save(update_fields=['tipo'])
+        producto.refresh_from_db()
+        self.assertEqual(producto.tipo_slug, 'casete')
+
+    def test_genero_filtra_sin_importar_mayusculas(self):
+        crear_producto(self.artista, nombre_producto='Espresso', genero='Pop')
+        crear_producto(self.artista, nombre_producto='Otro', genero='Rock')
+        response = self.client.get(reverse('genero_frontend'), {'genero': 'POP'})
+        self.assertEqual([p.nombre_producto for p in response.context['vinilos']], ['Espresso'])
+
+
+class CatalogoConsultasTests(TestCase):
+    """Las páginas del catálogo lanzan un número fijo de consultas."""
+
+    def setUp(self):
+        caches['catalogo'].clear()
+
+    def poblar(self, n):
+        for i in range(n):
+            artista = crear_artista(f'Artista {i}')
+            for tipo in ('Vinilo', 'CD', 'Casete'):
+                crear_producto(artista, nombre_producto=f'{tipo} {i}', tipo=tipo, novedad=True)
+
+    def test_comprar_no_depende_del_numero_de_productos(self):
+        self.poblar(5)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('comprar_frontend'), {'artista': 'Artista 0'})
+        self.assertEqual(len(response.context['vinilos']), 1)
+        self.assertEqual(len(response.context['cds']), 1)
+        self.assertEqual(len(response.context['cassettes']), 1)
+
+    def test_genero_y_tipo_una_consulta(self):
+        self.poblar(5)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('genero_frontend'), {'genero': 'pop'})
+        self.assertEqual(len(response.context['cds']), 5)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tipo_frontend'), {'tipo': 'cd'})
+        self.assertEqual(len(response.context['productos_por_artista']), 5)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('novedades_frontend'))
+
+
+class CachePaginasTests(TestCase):
+    def setUp(self):
+        caches['catalogo'].clear()
+        cache_catalogo.reiniciar_estadisticas()
+        self.sabrina = crear_artista()
+        self.doja = crear_artista('Doja')
+        crear_producto(self.sabrina, nombre_producto='Espresso')
+        crear_producto(self.doja, nombre_producto='Vegas', genero='Rock')
+
+    def get_comprar(self, nombre):
+        return self.client.get(reverse('comprar_frontend'), {'artista': nombre})
+
+    def test_segunda_visita_sale_del_cache_sin_consultas(self):
+        self.get_comprar('Sabrina')
+        with self.assertNumQueries(0):
+            response = self.get_comprar('Sabrina')
+        self.assertContains(response, 'Espresso')
+        self.assertNotContains(response, '__axolotl_csrf__')
+        stats = cache_catalogo.estadisticas()
+        self.assertEqual(stats[('hit', 'comprar_frontend')], 1)
+        self.assertEqual(stats[('miss', 'comprar_frontend')], 1)
+
+    def test_editar_un_artista_solo_invalida_sus_paginas(self):
+        self.get_comprar('Sabrina')
+        self.get_comprar('Doja')
+        crear_producto(self.sabrina, nombre_producto='Short n Sweet')
+
+        response = self.get_comprar('Sabrina')
+        self.assertContains(response, 'Short n Sweet')
+        with self.assertNumQueries(0):
+            self.get_comprar('Doja')
+
+    def test_producto_invalida_su_genero(self):
+        self.client.get(reverse('genero_frontend'), {'genero': 'rock'})
+        producto = Producto.objects.get(nombre_producto='Espresso')
+        producto.genero = 'Rock'
+        producto.save()
+        response = self.client.get(reverse('genero_frontend'), {'genero': 'rock'})
+        self.assertContains(response, 'Espresso')
+
+
+class CarritoContadorTests(TestCase):
+    def setUp(self):
+        caches['catalogo'].clear()
+        self.user = User.objects.create_user(username='cliente', email='cliente@example.com', password='clave-segura-123')
+        self.client.force_login(self.user)
+        artista = crear_artista()
+        self.p1 = crear_producto(artista, nombre_producto='Espresso')
+        self.p2 = crear_producto(artista, nombre_producto='Taste')
+
+    def cart(self):
+        return Cart.objects.get(usuario__user=self.user)
+
+    def test_operaciones_mantienen_contadores(self):
+        self.client.post(reverse('add_to_cart', args=[self.p1.id]), {'cantidad': 2})
+        self.client.post(reverse('add_to_cart', args=[self.p1.id]), {'cantidad': 1})
+        self.client.post(reverse('add_to_cart', args=[self.p2.id]), {'cantidad': 1})
+        cart = self.cart()
+        self.assertEqual((cart.num_items, cart.total_cantidad), (2, 4))
+        self.assertEqual(self.client.session[SESION_CUENTA], 2)
+
+        item = cart.items.get(producto=self.p1)
+        self.client.post(reverse('update_cart_item', args=[item.id]), {'cantidad': 5})
+        cart.refresh_from_db()
+        self.assertEqual((cart.num_items, cart.total_cantidad), (2, 6))
+
+        self.client.post(reverse('remove_cart_item', args=[item.id]))
+        cart.refresh_from_db()
+        self.assertEqual((cart.num_items, cart.total_cantidad), (1, 1))
+        self.assertEqual(self.client.session[SESION_CUENTA], 1)
+
+    def test_badge_sin_consultas(self):
+        self.client.post(reverse('add_to_cart', args=[self.p1.id]))
+        request = RequestFactory().get('/')
+        request.user = self.user
+        request.session = self.client.session
+        list(request.session.keys())  # en una petición real ya la cargó AuthenticationMiddleware
+        plantilla = Template('{% load cart_tags %}{% get_cart_count request.user as n %}{{ n }}')
+        with self.assertNumQueries(0):
+            html = plantilla.render(Context({'request': request}))
+        self.assertEqual(html, '1')
+
+    def test_comando_reconcilia_desfase(self):
+        self.client.post(reverse('add_to_cart', args=[self.p1.id]), {'cantidad': 3})
+        Cart.objects.update(num_items=7, total_cantidad=0)
+        out = StringIO()
+        call_command('reconciliar_carritos', stdout=out)
+        self.assertIn('1', out.getvalue())
+        cart = self.cart()
+        self.assertEqual((cart.num_items, cart.total_cantidad), (1, 3))
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', email='cliente@example.com', password='clave-segura-123')
+        self.client.force_login(self.user)
+        artista = crear_artista()
+        self.productos = [crear_producto(artista, nombre_producto=f'Album {i}', stock=5) for i in range(4)]
+        self.cart = Cart.objects.create(usuario=self.user.usuario)
+
+    def consultas_checkout(self, productos):
+        for producto in productos:
+            carrito.agregar_producto(self.cart, producto, 2)
+        with CaptureQueriesContext(connection) as ctx:
+            pedido = checkout.crear_pedido(self.cart)
+        return pedido, len(ctx.captured_queries)
+
+    def test_numero_de_consultas_no_depende_de_los_items(self):
+        self.consultas_checkout(self.productos[3:])  # crea las filas de estadísticas de la hora
+        _, con_uno = self.consultas_checkout(self.productos[:1])
+        _, con_cuatro = self.consultas_checkout(self.productos)
+        self.assertEqual(con_uno, con_cuatro)
+
+    def test_crea_pedido_descuenta_stock_y_vacia_carrito(self):
+        pedido, _ = self.consultas_checkout(self.productos)
+        self.assertEqual(pedido.cantidad_producto, 8)
+        self.assertEqual(pedido.total, Decimal('800.00'))
+        self.assertEqual(pedido.detalles.count(), 4)
+        self.assertEqual(set(Producto.objects.values_list('stock', flat=True)), {3})
+        self.cart.refresh_from_db()
+        self.assertEqual((self.cart.num_items, self.cart.items.count()), (0, 0))
+
+    def test_sin_stock_no_modifica_nada(self):
+        carrito.agregar_producto(self.cart, self.productos[0], 1)
+        carrito.agregar_producto(self.cart, self.productos[1], 6)
+        response = self.client.post(reverse('checkout_carrito'))
+        self.assertRedirects(response, reverse('ver_carrito'))
+        self.assertFalse(Pedido.objects.exists())
+        self.assertEqual(set(Producto.objects.values_list('stock', flat=True)), {5})
+        self.assertEqual(self.cart.items.count(), 2)
+
+
+class CheckoutConcurrenteTests(TransactionTestCase):
+    """Muchas compras simultáneas del mismo producto nunca dejan stock negativo."""
+
+    def test_compras_concurrentes_no_sobrevenden(self):
+        artista = crear_artista()
+        producto = crear_producto(artista, nombre_producto='Edición limitada', stock=5)
+        carts = []
+        for i in range(12):
+            user = User.objects.create_user(username=f'c{i}', email=f'c{i}@example.com', password='x')
+            cart = Cart.objects.create(usuario=user.usuario)
+            carrito.agregar_producto(cart, producto, 1)
+            carts.append(cart)
+
+        barrera = threading.Barrier(len(carts))
+        resultados = []
+
+        def comprar(cart):
+            try:
+                barrera.wait()
+                for _ in range(50):
+                    try:
+                        checkout.crear_pedido(cart)
+                        resultados.append('ok')
+                        return
+                    except OperationalError:
+                        # SQLite serializa escritores: se reintenta si la BD estaba bloqueada
+                        time.sleep(0.01)
+                resultados.append('bloqueado')
+            except checkout.StockInsuficiente:
+                resultados.append('sin_stock')
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=comprar, args=(cart,)) for cart in carts]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        producto.refresh_from_db()
+        vendidos = resultados.count('ok')
+        self.assertGreaterEqual(producto.stock, 0)
+        self.assertEqual(producto.stock, 5 - vendidos)
+        self.assertEqual(Pedido.objects.count(), vendidos)
+        self.assertLessEqual(vendidos, 5)
+
+
+class PaginacionKeysetTests(TestCase):
+    def setUp(self):
+        self.staff = crear_staff()
+        artista = crear_artista()
+        self.productos = [crear_producto(artista, nombre_producto=f'Album {i:03d}') for i in range(120)]
+        self.factory = RequestFactory()
+
+    def paginas(self, queryset, orden, por_pagina=50, **params):
+        vistos = []
+        pagina = paginacion.paginar(self.factory.get('/', params), queryset, orden, por_pagina=por_pagina)
+        vistos.append(pagina)
+        while pagina.tiene_siguiente:
+            pagina = paginacion.paginar(
+                self.factory.get('/', dict(params, despues=pagina.siguiente)), queryset, orden, por_pagina=por_pagina,
+            )
+            vistos.append(pagina)
+        return vistos
+
+    def test_recorre_todo_sin_repetir(self):
+        paginas = self.paginas(Producto.objects.all(), ['-id'])
+        ids = [p.id for pagina in paginas for p in pagina.items]
+        self.assertEqual([len(p.items) for p in paginas], [50, 50, 20])
+        self.assertEqual(ids, sorted((p.id for p in self.productos), reverse=True))
+
+    def test_empates_en_el_orden_se_desempatan_por_id(self):
+        Producto.objects.update(nombre_producto='Mismo nombre')
+        paginas = self.paginas(Producto.objects.all(), ['nombre_producto'], por_pagina=7)
+        ids = [p.id for pagina in paginas for p in pagina.items]
+        self.assertEqual(ids, sorted(p.id for p in self.productos))
+
+    def test_pagina_anterior(self):
+        primera, segunda, _ = self.paginas(Producto.objects.all(), ['-id'])
+        anterior = paginacion.paginar(self.factory.get('/', {'antes': segunda.anterior}), Producto.objects.all(), ['-id'])
+        self.assertEqual([p.id for p in anterior.items], [p.id for p in primera.items])
+        self.assertFalse(anterior.tiene_anterior)
+
+    def test_cursor_invalido_es_la_primera_pagina(self):
+        primera = [p.id for p in paginacion.paginar(self.factory.get('/'), Producto.objects.all(), ['-id']).items]
+        for valores in ({'a': 1}, 5, [None], ['abc'], [1, 2], [[1]]):
+            cursor = paginacion._codificar(valores)
+            for parametro in ('despues', 'antes'):
+                pagina = paginacion.paginar(self.factory.get('/', {parametro: cursor}), Producto.objects.all(), ['-id'])
+                self.assertEqual([p.id for p in pagina.items], primera, (valores, parametro))
+        for valores in (['abc'], [None], {'a': 1}):
+            cursor = paginacion._codificar(valores)
+            self.assertEqual(self.client.get(reverse('api_productos'), {'despues': cursor}).status_code, 200)
+
+    def test_vista_con_busqueda(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('ver_productos'), {'q': 'Album 11'})
+        self.assertEqual(
+            sorted(p.nombre_producto for p in response.context['productos']),
+            [f'Album {i}' for i in range(110, 120)],
+        )
+        self.assertFalse(response.context['pagina'].tiene_siguiente)
+
+
+class EstadisticasTests(TestCase):
+    def setUp(self):
+        self.staff = crear_staff()
+        self.cliente = User.objects.create_user(username='cliente', email='cliente@example.com', password='x')
+        self.artista = crear_artista()
+        self.producto = crear_producto(self.artista, stock=3)
+
+    def test_contadores_siguen_altas_y_bajas(self):
+        otro = crear_producto(self.artista, nombre_producto='Otro')
+        resumen = estadisticas.resumen()
+        self.assertEqual(
+            (resumen['clientes_count'], resumen['artistas_count'], resumen['productos_count']),
+            (2, 1, 2),
+        )
+        otro.delete()
+        self.assertEqual(estadisticas.resumen()['productos_count'], 1)
+
+    def test_checkout_actualiza_ventas_y_coincide_con_recalcular(self):
+        cart = Cart.objects.create(usuario=self.cliente.usuario)
+        carrito.agregar_producto(cart, self.producto, 2)
+        checkout.crear_pedido(cart)
+        resumen = estadisticas.resumen()
+        self.assertEqual(resumen['pedidos_count'], 1)
+        self.assertEqual(resumen['pedidos_hoy'], 1)
+        self.assertEqual(resumen['ingresos_hoy'], Decimal('200.00'))
+        self.assertEqual([(e.artista_id, e.unidades) for e in resumen['top_artistas']], [(self.artista.id, 2)])
+        self.assertEqual([p.id for p in resumen['stock_bajo']], [self.producto.id])
+
+        estadisticas.recalcular()
+        recalculado = estadisticas.resumen()
+        for clave in ('clientes_count', 'artistas_count', 'productos_count', 'pedidos_count', 'pedidos_hoy', 'ingresos_hoy'):
+            self.assertEqual(recalculado[clave], resumen[clave], clave)
+
+    def test_editar_detalle_mueve_las_ventas_del_artista(self):
+        olivia = crear_artista('Olivia')
+        guts = crear_producto(olivia, nombre_producto='Guts')
+        pedido = Pedido.objects.create(usuario=self.cliente.usuario, cantidad_producto=2, total=Decimal('200'))
+        detalle = DetallePedido.objects.create(
+            pedido=pedido, usuario=self.cliente.usuario, producto=self.producto, cantidad_producto=2,
+            precio=Decimal('100'), total=Decimal('200'),
+        )
+        detalle.cantidad_producto, detalle.total, detalle.producto = 5, 500.0, guts
+        detalle.save()
+        ventas = dict(EstadisticaArtista.objects.values_list('artista_id', 'unidades'))
+        self.assertEqual(ventas, {self.artista.id: 0, olivia.id: 5})
+
+        detalle.delete()
+        self.assertEqual(set(EstadisticaArtista.objects.values_list('unidades', 'ingresos')), {(0, Decimal('0'))})
+
+    def test_dashboard_consultas_constantes(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('inicio_axolotlmusic'))
+        for i in range(20):
+            crear_producto(self.artista, nombre_producto=f'Extra {i}')
+        with CaptureQueriesContext(connection) as antes:
+            self.client.get(reverse('inicio_axolotlmusic'))
+        Pedido.objects.create(usuario=self.cliente.usuario, cantidad_producto=1, total=Decimal('10'))
+        with CaptureQueriesContext(connection) as despues:
+            response = self.client.get(reverse('inicio_axolotlmusic'))
+        self.assertEqual(len(antes.captured_queries), len(despues.captured_queries))
+        self.assertEqual(response.context['productos_count'], 21)
+
+
+def imagen_png(ancho=900, alto=900, color=(255, 102, 204, 255)):
+    buffer = BytesIO()
+    Image.new('RGBA', (ancho, alto), color).save(buffer, 'PNG')
+    return SimpleUploadedFile('portada.png', buffer.getvalue(), content_type='image/png')
+
+
+class MiniaturasTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media)
+        self.override.enable()
+        caches['miniaturas'].clear()
+        self.artista = crear_artista()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def derivados(self):
+        carpeta = os.path.join(self.media, miniaturas.CARPETA)
+        return sorted(f for f in os.listdir(carpeta) if os.path.isfile(os.path.join(carpeta, f)))
+
+    def test_genera_derivados_con_hash_al_subir_y_es_idempotente(self):
+        producto = crear_producto(self.artista, img=imagen_png())
+        archivos = self.derivados()
+        self.assertEqual(len(archivos), len(miniaturas.ANCHOS) * len(miniaturas.FORMATOS))
+        self.assertTrue(all(f.split('-')[0] == archivos[0].split('-')[0] for f in archivos))
+
+        caches['miniaturas'].clear()
+        miniaturas.generar(producto.img.name)
+        crear_producto(self.artista, nombre_producto='Mismo arte', img=imagen_png())
+        self.assertEqual(self.derivados(), archivos)
+
+    def test_no_agranda_imagenes_pequenas(self):
+        producto = crear_producto(self.artista, img=imagen_png(200, 200))
+        datos = miniaturas.manifiesto(producto.img)
+        self.assertEqual([a for a, _ in datos['formatos']['jpg']], [160])
+
+    def test_etiqueta_genera_picture_con_respaldo_jpeg(self):
+        producto = crear_producto(self.artista, img=imagen_png())
+        html = Template('{% load miniaturas %}{% imagen_responsiva p.img alt="Arte" %}').render(Context({'p': producto}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('-320.jpg 320w', html)
+        self.assertIn('alt="Arte"', html)
+
+    def test_bomba_de_descompresion_no_rompe_el_guardado(self):
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            with self.assertLogs('app_Axolotl.miniaturas', 'WARNING') as logs:
+                producto = crear_producto(self.artista, img=imagen_png())
+                # El fallo queda en el caché: ni el manifiesto ni el render vuelven a decodificar
+                self.assertIsNone(miniaturas.manifiesto(producto.img))
+                html = Template('{% load miniaturas %}{% imagen_responsiva p.img %}').render(Context({'p': producto}))
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn(producto.img.url, html)
+
+        # Volver a subir la imagen descarta la marca y genera
+        producto.save()
+        self.assertIsNotNone(miniaturas.manifiesto(producto.img))
+
+
+class BusquedaTests(TestCase):
+    def setUp(self):
+        self.artista = crear_artista('Sabrina Carpenter')
+        self.otro = crear_artista('Radiohead', descripcion='Banda británica')
+        crear_producto(self.artista, nombre_producto='Short n Sweet', genero='Pop')
+        crear_producto(self.otro, nombre_producto='OK Computer', genero='Rock alternativo')
+
+    def nombres(self, consulta, **kwargs):
+        return [r['nombre'] for r in busqueda.buscar(consulta, **kwargs)]
+
+    def test_prefijo_y_orden_por_nombre(self):
+        self.assertEqual(self.nombres('comp'), ['OK Computer'])
+        self.assertEqual(self.nombres('radio', tipo='artista'), ['Radiohead'])
+        # El artista coincide por nombre y su producto por la columna artista
+        self.assertEqual(self.nombres('sabrina'), ['Sabrina Carpenter', 'Short n Sweet'])
+
+    def test_tolera_errores_y_acentos(self):
+        self.assertEqual(self.nombres('radiohaed', tipo='artista'), ['Radiohead'])
+        self.assertEqual(self.nombres('britanica'), ['Radiohead'])
+
+    def test_correccion_solo_lee_terminos_de_largo_compatible(self):
+        crear_producto(self.otro, nombre_producto='Rr ' + 'r' * 40)
+        with mock.patch.object(busqueda.difflib, 'get_close_matches', wraps=busqueda.difflib.get_close_matches) as cerca:
+            self.assertEqual(self.nombres('radiohaed', tipo='artista'), ['Radiohead'])
+        vocabulario = cerca.call_args.args[1]
+        self.assertIn('radiohead', vocabulario)
+        self.assertNotIn('rr', vocabulario)
+        self.assertNotIn('r' * 40, vocabulario)
+
+    def test_indice_sigue_cambios_y_borrados(self):
+        self.otro.nombre_artista = 'Thom Yorke'
+        self.otro.save()
+        self.assertIn('OK Computer', self.nombres('thom'))
+        self.assertEqual(self.nombres('radiohead'), [])
+        Producto.objects.get(nombre_producto='OK Computer').delete()
+        self.assertEqual(self.nombres('computer'), [])
+        self.assertEqual(busqueda.reindexar(), 3)
+
+    def test_vista_json(self):
+        respuesta = self.client.get(reverse('buscar_frontend'), {'q': 'swee', 'formato': 'json'})
+        datos = respuesta.json()
+        self.assertEqual(datos['resultados'][0]['nombre'], 'Short n Sweet')
+        self.assertIn(reverse('comprar_frontend'), datos['resultados'][0]['url'])
+        html = self.client.get(reverse('buscar_frontend'), {'q': 'swee'})
+        self.assertContains(html, 'Short n Sweet')
+
+
+class EstaticosTests(TestCase):
+    def setUp(self):
+        self.raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.raiz, ignore_errors=True)
+        self.factory = RequestFactory()
+
+    def escribir(self, nombre, contenido):
+        ruta = os.path.join(self.raiz, nombre)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, 'wb') as f:
+            f.write(contenido)
+
+    def pedir(self, ruta, **cabeceras):
+        return estaticos.servir(self.factory.get('/static/' + ruta, headers=cabeceras), ruta, self.raiz)
+
+    def test_collectstatic_genera_nombres_con_hash_y_gzip(self):
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'app_Axolotl.estaticos.AlmacenEstaticos'},
+        }
+        with override_settings(STATIC_ROOT=self.raiz, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        archivos = os.listdir(self.raiz)
+        css = [f for f in archivos if f.startswith('style.') and f.endswith('.css')]
+        self.assertIn('staticfiles.json', archivos)
+        self.assertEqual(len(css), 2)  # style.css y style.<hash>.css
+        hasheado = next(f for f in css if f != 'style.css')
+        self.assertIn(hasheado + '.gz', archivos)
+        self.assertNotIn('style.css.gz', archivos)
+
+    def test_cache_control_segun_hash_y_304(self):
+        self.escribir('style.0123456789ab.css', b'body{}' * 100)
+        self.escribir('productos/portada.png', b'png')
+        respuesta = self.pedir('style.0123456789ab.css')
+        self.assertEqual(respuesta['Cache-Control'], estaticos.CACHE_INMUTABLE)
+        self.assertEqual(respuesta['Content-Type'], 'text/css')
+        self.assertEqual(self.pedir('productos/portada.png')['Cache-Control'], estaticos.CACHE_REVALIDAR)
+
+        repetida = self.pedir('style.0123456789ab.css', **{'If-None-Match': respuesta['ETag']})
+        self.assertEqual(repetida.status_code, 304)
+
+    def test_variante_precomprimida_y_rangos(self):
+        self.escribir('app.0123456789ab.js', b'0123456789')
+        self.escribir('app.0123456789ab.js.gz', b'gz')
+        comprimida = self.pedir('app.0123456789ab.js', **{'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(comprimida['Content-Encoding'], 'gzip')
+        self.assertEqual(comprimida['Vary'], 'Accept-Encoding')
+        self.assertEqual(b''.join(comprimida.streaming_content), b'gz')
+
+        parcial = self.pedir('app.0123456789ab.js', Range='bytes=2-4')
+        self.assertEqual(parcial.status_code, 206)
+        self.assertEqual(parcial.content, b'234')
+        self.assertEqual(parcial['Content-Range'], 'bytes 2-4/10')
+        self.assertEqual(self.pedir('app.0123456789ab.js', Range='bytes=-3').content, b'789')
+        self.assertEqual(self.pedir('app.0123456789ab.js', Range='bytes=20-').status_code, 416)
+
+    def test_no_sale_de_la_raiz(self):
+        with self.assertRaises(Http404):
+            self.pedir('../etc/passwd')
+
+
+class BaseDatosTests(TransactionTestCase):
+    def test_pragmas_sqlite_en_cada_conexion(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('sólo SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            # WAL es persistente en el archivo: sólo con AXOLOTL_SQLITE_WAL=1
+            cursor.execute('PRAGMA journal_mode')
+            self.assertNotEqual(cursor.fetchone()[0], 'wal')
+
+    def test_prueba_carga_limpia_sus_datos(self):
+        salida = StringIO()
+        call_command('prueba_carga', usuarios=1, segundos=0.2, productos=2, stdout=salida)
+        self.assertIn('Escrituras:', salida.getvalue())
+        self.assertIn('bloqueos: 0', salida.getvalue())
+        self.assertFalse(Artista.objects.filter(nombre_artista__startswith='carga-').exists())
+
+
+@override_settings(AXOLOTL_REPLICAS=['replica1'])
+class ReplicasTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = replicas.RouterReplicas()
+        self.vista = replicas.lectura_replica(lambda request: self.router.db_for_read(Producto))
+
+    def pedir(self, metodo='get', sesion=None):
+        request = getattr(self.factory, metodo)('/')
+        request.session = sesion if sesion is not None else {}
+        return request
+
+    def test_vistas_marcadas_leen_de_la_replica(self):
+        self.assertEqual(self.vista(self.pedir()), 'replica1')
+        self.assertEqual(self.router.db_for_read(Producto), 'default')
+        self.assertEqual(self.router.db_for_write(Producto), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'app_Axolotl'))
+
+    def test_sesion_que_escribe_queda_en_el_primario(self):
+        sesion = {}
+        middleware = replicas.PrimarioPegajosoMiddleware(lambda request: None)
+        middleware(self.pedir('post', sesion))
+        self.assertIn(replicas.SESION_PRIMARIO_HASTA, sesion)
+        self.assertEqual(self.vista(self.pedir(sesion=sesion)), 'default')
+
+        sesion[replicas.SESION_PRIMARIO_HASTA] = time.time() - 1
+        self.assertEqual(self.vista(self.pedir(sesion=sesion)), 'replica1')
+
+    @override_settings(AXOLOTL_REPLICAS=[])
+    def test_sin_replicas_todo_va_al_primario(self):
+        self.assertEqual(self.vista(self.pedir()), 'default')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SincronizacionPerfilTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', email='ana@axolotl.test', password='clave-segura')
+
+    def test_login_no_toca_el_perfil(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(reverse('login_frontend'), {'username': 'ana', 'password': 'clave-segura'})
+        sql = [q['sql'] for q in consultas.captured_queries]
+        self.assertTrue(any('last_login' in q for q in sql))
+        self.assertFalse(any('app_Axolotl_usuario' in q for q in sql))
+
+    def test_sincroniza_solo_cuando_cambia(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.user.first_name = 'Ana'
+            self.user.save()
+        self.assertFalse(any(q['sql'].startswith('UPDATE "app_Axolotl_usuario"') for q in consultas.captured_queries))
+
+        self.user.email = 'ana.nueva@axolotl.test'
+        self.user.save()
+        self.assertEqual(Usuario.objects.get(user=self.user).email, 'ana.nueva@axolotl.test')
+
+    def test_crea_perfil_faltante(self):
+        Usuario.objects.filter(user=self.user).delete()
+        self.user.save()
+        self.assertTrue(Usuario.objects.filter(user=self.user, nombre='ana').exists())
+
+
+class VistasAsyncTests(TestCase):
+    def setUp(self):
+        caches['catalogo'].clear()
+        self.artista = crear_artista()
+        crear_producto(self.artista, nombre_producto='Short n Sweet', novedad=True)
+        self.user = User.objects.create_user(username='ana', email='ana@axolotl.test', password='x')
+        carrito.agregar_producto(Cart.objects.create(usuario=self.user.usuario), Producto.objects.get(), 2)
+
+    async def test_paginas_async_para_anonimos_usan_el_cache(self):
+        cliente = AsyncClient()
+        cache_catalogo.reiniciar_estadisticas()
+        vistas = {
+            'index_frontend': '/index/',
+            'comprar_frontend': '/comprar/?artista=Sabrina',
+            'genero_frontend': '/genero/?genero=Pop',
+            'tipo_frontend': '/tipo/?tipo=Vinilo',
+        }
+        for vista, url in vistas.items():
+            self.assertContains(await cliente.get(url), 'Short n Sweet')
+            self.assertContains(await cliente.get(url), 'Short n Sweet')
+            self.assertEqual(cache_catalogo.estadisticas()[('hit', vista)], 1)
+        self.assertEqual((await cliente.get('/comprar/?artista=Nadie')).status_code, 404)
+
+    async def test_badge_del_carrito_sin_consultas_sincronas(self):
+        cliente = AsyncClient()
+        await cliente.aforce_login(self.user)
+        respuesta = await cliente.get('/index/')
+        self.assertContains(respuesta, 'Short n Sweet')
+        self.assertEqual(respuesta.asgi_request.session[SESION_CUENTA], 1)
+
+    async def test_render_fuera_del_event_loop(self):
+        hilos = []
+        original = views.render
+
+        def render(*args, **kwargs):
+            hilos.append(threading.current_thread())
+            return original(*args, **kwargs)
+
+        with mock.patch.object(views, 'render', render):
+            self.assertContains(await AsyncClient().get('/index/'), 'Short n Sweet')
+        self.assertEqual(len(hilos), 1)
+        self.assertIsNot(hilos[0], threading.current_thread())
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.artista = crear_artista('Sabrina', descripcion='Pop')
+        otro = crear_artista('Radiohead')
+        self.vinilo = crear_producto(self.artista, nombre_producto='Short n Sweet', novedad=True)
+        crear_producto(self.artista, nombre_producto='Emails', tipo='CD')
+        crear_producto(otro, nombre_producto='OK Computer', genero='Rock')
+
+    def test_filtros_campos_y_cursor(self):
+        datos = self.client.get('/api/productos/', {'artista': self.artista.id, 'campos': 'id,nombre', 'limite': 1}).json()
+        self.assertEqual(datos['resultados'], [{'id': self.vinilo.id, 'nombre': 'Short n Sweet'}])
+        siguiente = self.client.get(datos['siguiente']).json()
+        self.assertEqual([p['nombre'] for p in siguiente['resultados']], ['Emails'])
+        self.assertIsNone(siguiente['siguiente'])
+
+        self.assertEqual(len(self.client.get('/api/productos/', {'tipo': 'cd'}).json()['resultados']), 1)
+        self.assertEqual(len(self.client.get('/api/productos/', {'novedad': 'true'}).json()['resultados']), 1)
+        rock = self.client.get('/api/productos/', {'genero': 'rock', 'campos': 'artista_nombre'}).json()
+        self.assertEqual(rock['resultados'], [{'artista_nombre': 'Radiohead'}])
+        self.assertEqual(self.client.get('/api/productos/', {'campos': 'clave'}).status_code, 400)
+        self.assertEqual(self.client.get(f'/api/artistas/{self.artista.id}/').json()['nombre'], 'Sabrina')
+        self.assertEqual(self.client.get('/api/artistas/999/').status_code, 404)
+
+    def test_etag_304_y_cambio_de_version(self):
+        primera = self.client.get('/api/productos/')
+        self.assertTrue(primera['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', primera)
+        with self.assertNumQueries(1):
+            repetida = self.client.get('/api/productos/', HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+
+        # Un cambio del artista también cambia la representación de los productos
+        self.artista.nombre_artista = 'Sabrina C.'
+        self.artista.save()
+        self.assertEqual(self.client.get('/api/productos/', HTTP_IF_NONE_MATCH=primera['ETag']).status_code, 200)
+
+    def test_checkout_cambia_la_version_de_productos(self):
+        user = User.objects.create_user(username='ana', email='ana@axolotl.test', password='x')
+        cart = Cart.objects.create(usuario=user.usuario)
+        carrito.agregar_producto(cart, self.vinilo, 1)
+        self.client.force_login(user)
+
+        respuesta = self.client.get('/api/carrito/')
+        self.assertEqual(respuesta.json()['items'][0]['cantidad'], 1)
+        self.assertEqual(self.client.get('/api/carrito/', HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+
+        etag = self.client.get('/api/productos/')['ETag']
+        checkout.crear_pedido(cart)
+        self.assertEqual(self.client.get('/api/productos/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get('/api/carrito/', HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 200)
+
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/carrito/').status_code, 401)
+
+
+class ImportacionTests(TestCase):
+    def setUp(self):
+        self.artista = crear_artista()
+        self.producto = crear_producto(self.artista, stock=3)
+
+    def _importar(self, texto, *args):
+        salida = StringIO()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as archivo:
+            archivo.write(texto)
+        try:
+            call_command('importar_catalogo', archivo.name, *args, stdout=salida, stderr=salida)
+        finally:
+            os.remove(archivo.name)
+        return salida.getvalue()
+
+    def test_exportar_e_importar_no_duplica(self):
+        salida = StringIO()
+        call_command('exportar_catalogo', stdout=salida, stderr=StringIO())
+        exportado = salida.getvalue()
+        self.assertIn('Sabrina', exportado)
+
+        self._importar(exportado.replace(',3,', ',9,'))
+        self.assertEqual(Producto.objects.count(), 1)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 9)
+
+    def test_upsert_por_lotes_errores_y_efectos(self):
+        estadisticas.recalcular()
+        antes = estadisticas.versiones(['producto'])['producto']
+        texto = (
+            'artista,nombre_producto,genero,tipo,stock,precio,novedad\n'
+            f'Sabrina,{self.producto.nombre_producto},{self.producto.genero},{self.producto.tipo},7,150.00,1\n'
+            'Kali Uchis,Orquideas,Pop,Vinilo,4,399.90,0\n'
+            'Kali Uchis,Isolation,Pop,CD,x,199.90,0\n'
+            ',Sin artista,Pop,CD,1,10,0\n'
+        )
+        mensaje = self._importar(texto, '--lote', '1')
+        self.assertIn('fila 4', mensaje)
+        self.assertIn('fila 5', mensaje)
+
+        self.producto.refresh_from_db()
+        self.assertEqual((self.producto.stock, self.producto.precio, self.producto.novedad), (7, Decimal('150.00'), True))
+        nuevo = Producto.objects.get(nombre_producto='Orquideas')
+        self.assertEqual((nuevo.artista.nombre_artista, nuevo.tipo_slug), ('Kali Uchis', 'vinilo'))
+
+        resumen = estadisticas.resumen()
+        self.assertEqual((resumen['artistas_count'], resumen['productos_count']), (2, 2))
+        self.assertGreater(estadisticas.versiones(['producto'])['producto'], antes)
+        self.assertEqual([r['nombre'] for r in busqueda.buscar('orquideas')], ['Orquideas'])
+
+    def test_sin_crear_artistas_y_jsonl(self):
+        filas = [
+            (1, {'artista': 'Desconocido', 'nombre_producto': 'X', 'genero': 'Pop', 'tipo': 'CD', 'stock': 1, 'precio': '1'}),
+            (2, {'artista': 'Sabrina', 'nombre_producto': self.producto.nombre_producto, 'stock': 0}),
+        ]
+        resultado = importacion.importar_productos(iter(filas), crear_artistas=False)
+        self.assertEqual((resultado.creadas, resultado.actualizadas), (0, 1))
+        self.assertEqual(resultado.errores, [(1, 'artista desconocido: Desconocido')])
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 0)
+
+        lineas = list(importacion.leer_filas(StringIO('{"nombre_artista": "Nuevo"}\n{roto\n[1, 2]\n'), 'jsonl'))
+        self.assertEqual(lineas[0], (1, {'nombre_artista': 'Nuevo'}))
+        self.assertIsInstance(lineas[1][1], importacion.FilaInvalida)
+        self.assertIsInstance(lineas[2][1], importacion.FilaInvalida)
+
+    def test_precio_fuera_del_campo_no_se_importa(self):
+        mensaje = self._importar(
+            'artista,nombre_producto,genero,tipo,stock,precio\n'
+            'Sabrina,Enorme,Pop,CD,1,1e30\n'
+            'Sabrina,Nada,Pop,CD,1,NaN\n'
+            'Sabrina,Bien,Pop,CD,1,10.50\n'
+        )
+        self.assertIn('fila 2', mensaje)
+        self.assertIn('fila 3', mensaje)
+        self.assertEqual(
+            sorted(Producto.objects.values_list('nombre_producto', flat=True)), ['Album', 'Bien'],
+        )
+        self.assertEqual(self.client.get(reverse('api_productos')).status_code, 200)
+
+
+class AccionesMasivasTests(TestCase):
+    def setUp(self):
+        self.staff = crear_staff()
+        self.client.force_login(self.staff)
+        self.artista = crear_artista()
+        self.productos = [
+            crear_producto(self.artista, nombre_producto=f'Album {i}', stock=3, precio=Decimal('100.00'))
+            for i in range(5)
+        ]
+        self.ids = [p.id for p in self.productos]
+
+    def _aplicar(self, accion, valor='', ids=None, **extra):
+        datos = {'ids': ids or self.ids, 'accion': accion, 'valor': valor, **extra}
+        return self.client.post(reverse('acciones_productos'), datos)
+
+    def test_actualizaciones_en_una_sentencia(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self._aplicar('precio', '10')
+        self.assertEqual(sum(q['sql'].startswith(f'UPDATE "{Producto._meta.db_table}"') for q in consultas.captured_queries), 1)
+        self._aplicar('stock', '-5')
+        self._aplicar('novedad_si')
+        self._aplicar('genero', 'Indie Pop')
+        for producto in Producto.objects.filter(pk__in=self.ids):
+            self.assertEqual(
+                (producto.precio, producto.stock, producto.novedad, producto.genero_slug),
+                (Decimal('110.00'), 0, True, 'indie-pop'),
+            )
+        self.assertEqual([r['id'] for r in busqueda.buscar('indie', tipo='producto')], sorted(self.ids))
+
+    def test_actualizacion_invalida_la_cache_y_la_version(self):
+        cache_catalogo.invalidar_todo()
+        version = cache_catalogo.versiones(['novedades'])
+        api = estadisticas.versiones(['producto'])['producto']
+        self._aplicar('novedad_si')
+        self.assertNotEqual(cache_catalogo.versiones(['novedades']), version)
+        self.assertGreater(estadisticas.versiones(['producto'])['producto'], api)
+
+    def test_listas_tienen_formulario_de_acciones(self):
+        cliente = User.objects.create_user(username='ana', email='ana@axolotl.test', password='x')
+        cart = Cart.objects.create(usuario=cliente.usuario)
+        carrito.agregar_producto(cart, self.productos[0], 1)
+        checkout.crear_pedido(cart)
+        for lista in ('productos', 'pedidos', 'clientes'):
+            self.assertContains(self.client.get(reverse(f'ver_{lista}')), reverse(f'acciones_{lista}'))
+        self.assertContains(self.client.get(reverse('ver_productos')), 'name="ids"', count=5)
+
+    def test_valores_invalidos(self):
+        respuesta = self._aplicar('precio', 'mucho')
+        self.assertRedirects(respuesta, reverse('ver_productos'), fetch_redirect_response=False)
+        self.assertEqual(Producto.objects.get(pk=self.ids[0]).precio, Decimal('100.00'))
+        self._aplicar('precio', '100000')
+        self._aplicar('desconocida')
+        for valor in ('NaN', 'Infinity'):
+            respuesta = self._aplicar('precio', valor)
+            self.assertRedirects(respuesta, reverse('ver_productos'), fetch_redirect_response=False)
+        self.assertEqual(Producto.objects.get(pk=self.ids[0]).precio, Decimal('100.00'))
+
+        respuesta = self._aplicar('stock', str(10 ** 20))
+        self.assertRedirects(respuesta, reverse('ver_productos'), fetch_redirect_response=False)
+        with self.assertRaises(acciones.AccionInvalida):
+            acciones.ajustar_stock(Producto.objects.all(), -acciones.AJUSTE_STOCK_MAXIMO - 1)
+        self.assertEqual(Producto.objects.get(pk=self.ids[0]).stock, 3)
+
+    def test_borrar_muestra_costo_y_luego_borra(self):
+        cliente = User.objects.create_user(username='ana', email='ana@axolotl.test', password='x')
+        cart = Cart.objects.create(usuario=cliente.usuario)
+        carrito.agregar_producto(cart, self.productos[0], 1)
+        checkout.crear_pedido(cart)
+
+        confirmacion = self._aplicar('borrar', ids=self.ids[:2])
+        self.assertEqual(confirmacion.status_code, 200)
+        costos = dict(confirmacion.context['costos'])
+        self.assertEqual(costos['productos'], 2)
+        self.assertEqual(costos['detalle pedidos'], 1)
+        self.assertEqual(Producto.objects.count(), 5)
+
+        self._aplicar('borrar', ids=self.ids[:2], confirmar='1')
+        self.assertEqual(Producto.objects.count(), 3)
+        self.assertFalse(DetallePedido.objects.exists())
+        self.assertEqual(estadisticas.resumen()['productos_count'], 3)
+
+    def _resumenes(self):
+        return (
+            sorted(EstadisticaHora.objects.exclude(pedidos=0).values_list('hora', 'pedidos', 'ingresos')),
+            sorted(EstadisticaArtista.objects.exclude(unidades=0).values_list('artista_id', 'unidades', 'ingresos')),
+            {clave: valor for clave, valor in estadisticas.resumen().items() if clave.endswith('_count')},
+            sorted(VentaArtistaDia.objects.exclude(pedidos=0).values_list('artista_id', 'unidades', 'pedidos')),
+            sorted(VentaFacetaDia.objects.exclude(pedidos=0).values_list('faceta', 'valor', 'unidades', 'pedidos')),
+        )
+
+    def _sin_senales_coincide_con_recalcular(self):
+        antes = self._resumenes()
+        estadisticas.recalcular()
+        ventas.recalcular()
+        self.assertEqual(self._resumenes(), antes)
+
+    def test_borrar_sin_senales_en_consultas_fijas(self):
+        cliente = User.objects.create_user(username='ana', email='ana@axolotl.test', password='x')
+        cart = Cart.objects.create(usuario=cliente.usuario)
+        for producto in self.productos[:3]:
+            carrito.agregar_producto(cart, producto, 1)
+        checkout.crear_pedido(cart)
+        carrito.agregar_producto(cart, self.productos[0], 2)
+        carrito.agregar_producto(cart, self.productos[4], 1)
+        checkout.crear_pedido(cart)
+
+        def borrar(ids):
+            with CaptureQueriesContext(connection) as consultas:
+                self._aplicar('borrar', ids=ids, confirmar='1')
+            return len(consultas)
+
+        self.assertEqual(borrar(self.ids[:1]), borrar(self.ids[1:4]))
+        self.assertEqual([r['id'] for r in busqueda.buscar('album', tipo='producto')], self.ids[4:])
+        self._sin_senales_coincide_con_recalcular()
+
+        resultado = acciones.borrar(Usuario.objects.filter(pk=cliente.usuario.pk))
+        self.assertEqual(resultado.detalle, {'Cart': 1, 'Pedido': 2, 'DetallePedido': 1})
+        self.assertEqual(estadisticas.resumen()['pedidos_count'], 0)
+        self._sin_senales_coincide_con_recalcular()
+
+    def test_costo_de_clientes_cuenta_cada_fila_una_vez(self):
+        cliente = User.objects.create_user(username='ana', email='ana@axolotl.test', password='x')
+        cart = Cart.objects.create(usuario=cliente.usuario)
+        carrito.agregar_producto(cart, self.productos[0], 1)
+        carrito.agregar_producto(cart, self.productos[1], 1)
+        checkout.crear_pedido(cart)
+        costos = dict(acciones.costo_borrado(Usuario.objects.filter(pk=cliente.usuario.pk)))
+        # Los detalles cuelgan del pedido y del usuario: no se cuentan dos veces
+        self.assertEqual((costos['pedidos'], costos['detalle pedidos']), (1, 2))
+
+        self.client.post(reverse('acciones_clientes'), {'ids': [cliente.usuario.pk], 'accion': 'borrar', 'confirmar': '1'})
+        self.assertFalse(Pedido.objects.exists())
+        self.assertFalse(Usuario.objects.filter(pk=cliente.usuario.pk).exists())
+
+
+@override_settings(AXOLOTL_RESERVAS=True, AXOLOTL_RESERVA_MINUTOS=15)
+class ReservasTests(TestCase):
+    def setUp(self):
+        artista = crear_artista()
+        self.producto = crear_producto(artista, nombre_producto='Edición limitada', stock=3)
+        self.carts = []
+        for nombre in ('ana', 'beto'):
+            user = User.objects.create_user(username=nombre, email=f'{nombre}@axolotl.test', password='x')
+            self.carts.append(Cart.objects.create(usuario=user.usuario))
+
+    def test_reserva_aparta_y_libera(self):
+        ana, beto = self.carts
+        carrito.agregar_producto(ana, self.producto, 2)
+        self.assertEqual(reservas.disponibles([self.producto.id]), {self.producto.id: 1})
+        with self.assertRaises(reservas.SinExistencias):
+            carrito.agregar_producto(beto, self.producto, 2)
+        self.assertFalse(beto.items.exists())
+        carrito.agregar_producto(beto, self.producto, 1)
+
+        # Cambiar la cantidad reserva el nuevo total; quitar el item libera
+        item = ana.items.get()
+        carrito.cambiar_cantidad(item, 1)
+        self.assertEqual(reservas.disponibles([self.producto.id]), {self.producto.id: 1})
+        carrito.eliminar_item(item)
+        self.assertEqual(reservas.disponibles([self.producto.id]), {self.producto.id: 2})
+
+    def test_checkout_respeta_reservas_de_otros_y_vencidas(self):
+        ana, beto = self.carts
+        carrito.agregar_producto(ana, self.producto, 3)
+        # beto agregó antes de que se activaran las reservas: su item no tiene reserva
+        with override_settings(AXOLOTL_RESERVAS=False):
+            carrito.agregar_producto(beto, self.producto, 1)
+        with self.assertRaises(checkout.StockInsuficiente):
+            checkout.crear_pedido(beto)
+
+        Reserva.objects.update(expira=timezone.now() - timedelta(minutes=1))
+        checkout.crear_pedido(beto)
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, 2)
+        self.assertFalse(Reserva.objects.filter(cart=beto).exists())
+
+    def test_barrido_de_vencidas(self):
+        ana, beto = self.carts
+        carrito.agregar_producto(ana, self.producto, 1)
+        carrito.agregar_producto(beto, self.producto, 1)
+        Reserva.objects.filter(cart=ana).update(expira=timezone.now() - timedelta(seconds=1))
+        salida = StringIO()
+        call_command('liberar_reservas', '--lote', '1', stdout=salida)
+        self.assertIn('1 reservas', salida.getvalue())
+        self.assertEqual(list(Reserva.objects.values_list('cart_id', flat=True)), [beto.id])
+
+    def test_vista_avisa_sin_existencias(self):
+        ana, beto = self.carts
+        carrito.agregar_producto(ana, self.producto, 3)
+        self.client.force_login(beto.usuario.user)
+        respuesta = self.client.post(reverse('add_to_cart', args=[self.producto.id]), {'next': '/cart/'}, follow=True)
+        self.assertContains(respuesta, 'Sólo quedan 0 unidades')
+        self.assertFalse(beto.items.exists())
+
+    def test_carrito_muestra_lo_disponible(self):
+        ana, beto = self.carts
+        carrito.agregar_producto(ana, self.producto, 2)
+        # beto agregó antes de que se activaran las reservas: pide más de lo que queda
+        with override_settings(AXOLOTL_RESERVAS=False):
+            carrito.agregar_producto(beto, self.producto, 3)
+        self.client.force_login(beto.usuario.user)
+        respuesta = self.client.get(reverse('ver_carrito'))
+        self.assertEqual([i.disponibles for i in respuesta.context['items']], [1])
+        self.assertContains(respuesta, 'Sólo quedan 1 disponibles')
+        self.assertContains(respuesta, 'max="1"')
+
+        self.client.force_login(ana.usuario.user)
+        respuesta = self.client.get(reverse('ver_carrito'))
+        self.assertEqual([i.disponibles for i in respuesta.context['items']], [3])
+        self.assertNotContains(respuesta, 'Sólo quedan')
+
+
+@override_settings(AXOLOTL_RESERVAS=True)
+class ReservasConcurrentesTests(TransactionTestCase):
+    """Cientos de altas simultáneas del mismo producto nunca reservan más que el stock."""
+
+    def test_altas_concurrentes_no_reservan_de_mas(self):
+        artista = crear_artista()
+        producto = crear_producto(artista, nombre_producto='Vinilo limitado', stock=7)
+        carts = []
+        for i in range(200):
+            user = User.objects.create(username=f'c{i}', email=f'c{i}@example.com')
+            carts.append(Cart.objects.create(usuario=user.usuario))
+
+        barrera = threading.Barrier(len(carts))
+        resultados = []
+
+        def agregar(cart):
+            try:
+                barrera.wait()
+                for intento in range(1000):
+                    try:
+                        carrito.agregar_producto(cart, producto, 1)
+                        resultados.append('ok')
+                        return
+                    except OperationalError:
+                        # SQLite en memoria no espera al escritor: se reintenta
+                        time.sleep(0.002 * (intento % 10 + 1))
+                resultados.append('bloqueado')
+            except reservas.SinExistencias:
+                resultados.append('sin_stock')
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=agregar, args=(cart,)) for cart in carts]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(resultados.count('ok'), 7)
+        self.assertEqual(resultados.count('sin_stock'), 193)
+        self.assertEqual(Reserva.objects.aggregate(n=Sum('cantidad'))['n'], 7)
+        self.assertEqual(reservas.disponibles([producto.id]), {producto.id: 0})
+
+
+class CarritoAnonimoTests(TestCase):
+    def setUp(self):
+        self.artista = crear_artista()
+        self.vinilo = crear_producto(self.artista, nombre_producto='Vinilo')
+        self.cd = crear_producto(self.artista, nombre_producto='CD', tipo='CD', precio=Decimal('50.00'))
+
+    def _agregar(self, producto, cantidad=1):
+        return self.client.post(reverse('add_to_cart', args=[producto.id]), {'cantidad': cantidad, 'next': '/cart/'})
+
+    def test_visitante_agrega_sin_escribir_en_la_base(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self._agregar(self.vinilo, 2)
+            self._agregar(self.cd)
+        self.assertRedirects(respuesta, '/cart/', fetch_redirect_response=False)
+        escrituras = [q['sql'] for q in consultas.captured_queries if not q['sql'].startswith('SELECT')]
+        self.assertEqual(escrituras, [])
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+
+        pagina = self.client.get(reverse('ver_carrito'))
+        self.assertEqual([(i.producto.id, i.cantidad) for i in pagina.context['items']], [(self.vinilo.id, 2), (self.cd.id, 1)])
+        self.assertEqual(pagina.context['total'], Decimal('250.00'))
+        self.assertContains(pagina, 'Carrito (2)')
+
+        self.client.post(reverse('remove_cart_anonimo', args=[self.cd.id]))
+        self.client.post(reverse('update_cart_anonimo', args=[self.vinilo.id]), {'cantidad': 4})
+        self.assertEqual([i.cantidad for i in self.client.get(reverse('ver_carrito')).context['items']], [4])
+
+    def test_cookie_alterada_se_ignora_y_no_usa_cache(self):
+        self.client.cookies[carrito_anonimo.COOKIE] = f'{self.vinilo.id}:5'
+        self.assertEqual(list(self.client.get(reverse('ver_carrito')).context['items']), [])
+        cache_catalogo.reiniciar_estadisticas()
+        self.client.get(reverse('artistas_frontend'))
+        self.assertEqual(cache_catalogo.estadisticas(), {('bypass', 'artistas_frontend'): 1})
+
+    def test_login_fusiona_con_un_upsert(self):
+        user = User.objects.create_user(username='ana', email='ana@axolotl.test', password='clave-segura')
+        cart = Cart.objects.create(usuario=user.usuario)
+        carrito.agregar_producto(cart, self.vinilo, 1)
+        self._agregar(self.vinilo, 2)
+        self._agregar(self.cd)
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(reverse('login_frontend'), {'username': 'ana', 'password': 'clave-segura'})
+        inserts = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith(f'INSERT INTO "{CartItem._meta.db_table}"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn('ON CONFLICT', inserts[0])
+        self.assertEqual(respuesta.cookies[carrito_anonimo.COOKIE].value, '')
+
+        self.assertEqual(dict(cart.items.values_list('producto_id', 'cantidad')), {self.vinilo.id: 3, self.cd.id: 1})
+        cart.refresh_from_db()
+        self.assertEqual((cart.num_items, cart.total_cantidad), (2, 4))
+        self.assertEqual(self.client.session[carrito.SESION_CUENTA], 2)
+
+    def test_registro_se_queda_con_el_carrito(self):
+        self._agregar(self.cd, 2)
+        self.client.post(reverse('register'), {
+            'username': 'beto', 'email': 'beto@axolotl.test', 'password': 'x', 'account_type': 'client',
+        })
+        cart = Cart.objects.get(usuario__user__username='beto')
+        self.assertEqual(list(cart.items.values_list('producto_id', 'cantidad')), [(self.cd.id, 2)])
+
+
+class InstrumentacionTests(TestCase):
+    def setUp(self):
+        caches['catalogo'].clear()
+        instrumentacion.reiniciar()
+        self.artista = crear_artista()
+        for i in range(3):
+            crear_producto(self.artista, nombre_producto=f'Album {i}')
+        self.staff = crear_staff()
+
+    def test_mide_consultas_y_plantillas_por_nombre_de_url(self):
+        self.client.force_login(self.staff)
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('ver_productos'))
+        serie = instrumentacion.reporte()['ver_productos']
+        self.assertEqual(serie['peticiones'], 1)
+        self.assertEqual(serie['consultas']['p50'], len(consultas.captured_queries))
+        self.assertGreater(serie['plantillas_ms']['p50'], 0)
+        self.assertGreaterEqual(serie['latencia_ms']['p50'], serie['bd_ms']['p50'])
+        self.assertIsNone(serie['consulta_repetida'])
+
+    def test_detecta_consultas_repetidas(self):
+        def vista(request):
+            for producto in Producto.objects.all():
+                for _ in range(2):
+                    Artista.objects.get(pk=producto.artista_id)
+            return HttpResponse('ok')
+
+        middleware = instrumentacion.InstrumentacionMiddleware(vista)
+        with self.assertLogs('app_Axolotl.instrumentacion', 'WARNING'):
+            middleware(RequestFactory().get('/'))
+        serie = instrumentacion.reporte()[instrumentacion.SIN_RUTA]
+        self.assertEqual(serie['consultas']['p99'], 7)
+        self.assertEqual(serie['consulta_repetida']['veces'], 6)
+        self.assertIn(Artista._meta.db_table, serie['consulta_repetida']['sql'])
+
+    def test_no_mide_fuera_de_una_peticion(self):
+        Producto.objects.count()
+        self.assertEqual(instrumentacion.reporte(), {})
+
+    @override_settings(AXOLOTL_INSTRUMENTACION=False)
+    def test_se_puede_apagar(self):
+        self.client.get(reverse('artistas_frontend'))
+        self.assertEqual(instrumentacion.reporte(), {})
+
+    async def test_vistas_async(self):
+        respuesta = await AsyncClient().get('/index/')
+        self.assertEqual(respuesta.status_code, 200)
+        serie = instrumentacion.reporte()['index_frontend']
+        self.assertGreater(serie['consultas']['p50'], 0)
+        self.assertGreater(serie['plantillas_ms']['p50'], 0)
+
+    def test_endpoint_json_y_prometheus_solo_staff(self):
+        url = reverse('metricas_rendimiento')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        self.client.get(reverse('artistas_frontend'))
+        datos = self.client.get(url).json()
+        self.assertEqual(datos['vistas']['artistas_frontend']['peticiones'], 1)
+
+        texto = self.client.get(url, {'formato': 'prometheus'}).content.decode()
+        self.assertIn('# TYPE axolotl_peticion_segundos summary', texto)
+        self.assertIn('axolotl_peticion_consultas_count{vista="artistas_frontend"} 1', texto)
+        self.assertIn('axolotl_peticion_segundos{vista="metricas_rendimiento",quantile="0.99"}', texto)
+
+
+class RendimientoTests(TestCase):
+    def setUp(self):
+        caches['catalogo'].clear()
+        self.resumen = datos_sinteticos.generar(artistas=3, productos=30, clientes=4, pedidos=2, items=2)
+
+    def test_generar_datos_coherentes(self):
+        self.assertEqual(
+            (self.resumen.artistas, self.resumen.productos, self.resumen.clientes, self.resumen.items, self.resumen.pedidos),
+            (3, 30, 4, 8, 8),
+        )
+        self.assertFalse(Producto.objects.filter(genero_slug='').exists())
+        self.assertEqual(carrito.reconciliar_contadores(), 0)
+        self.assertEqual(Cart.objects.get(usuario__user__username=datos_sinteticos.usuario_cliente(0)).num_items, 2)
+        self.assertEqual(DetallePedido.objects.count(), self.resumen.detalles)
+        self.assertEqual(estadisticas.resumen()['pedidos_count'], 8)
+
+        datos_sinteticos.limpiar()
+        self.assertFalse(Producto.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+    def test_escenarios_con_el_client(self):
+        objetivos = rendimiento.Objetivos.desde_base()
+        resultado = rendimiento.correr_cliente(rendimiento.ESCENARIOS, objetivos, rendimiento.clientes_de_prueba(), 2)
+        self.assertEqual(set(resultado), {e.nombre for e in rendimiento.ESCENARIOS})
+        for nombre, medido in resultado.items():
+            self.assertEqual(medido['errores'], 0, nombre)
+            self.assertEqual(medido['peticiones'], 2)
+            self.assertGreater(medido['consultas'], 0, nombre)
+
+    def test_comparar_con_la_referencia(self):
+        base = {'peticiones': 50, 'errores': 0, 'rps': 100, 'p50_ms': 10, 'p90_ms': 12, 'consultas': 4}
+        referencia = {'cliente': {'ver_carrito': base}, 'http': {'ver_carrito': base}}
+        igual = {'cliente': {'ver_carrito': dict(base, p50_ms=13)}, 'http': {'ver_carrito': dict(base, rps=80)}}
+        self.assertEqual(rendimiento.comparar(igual, referencia), [])
+
+        peor = {
+            'cliente': {'ver_carrito': dict(base, consultas=5), 'nuevo': base},
+            'http': {'ver_carrito': dict(base, p50_ms=30, rps=40, errores=1)},
+        }
+        regresiones = rendimiento.comparar(peor, referencia)
+        self.assertEqual(len(regresiones), 4)
+        self.assertIn('cliente/ver_carrito: 5 consultas (referencia 4)', regresiones)
+
+
+class AuditoriaConsultasTests(TestCase):
+    def test_ninguna_ruta_hace_mas_consultas_con_mas_datos(self):
+        vistas = auditoria_consultas.auditar()
+        self.assertEqual(set(vistas), {nombre for nombre, _ in auditoria_consultas.rutas()})
+        self.assertFalse([v.nombre for v in vistas.values() if v.crece], auditoria_consultas.reporte(vistas))
+        self.assertFalse([v.nombre for v in vistas.values() if v.status['grande'] >= 400 and v.status['grande'] != 405])
+
+    def test_registra_sql_normalizado_y_origen_en_plantilla(self):
+        artista = crear_artista()
+        crear_producto(artista)
+        cart = Cart.objects.create(usuario=Usuario.objects.create(email='ana@axolotl.test'))
+        carrito.agregar_producto(cart, Producto.objects.get(), 1)
+        plantilla = Template('{% for item in items %}{{ item.producto.artista.nombre_artista }}{% endfor %}')
+        registro = auditoria_consultas._Registro()
+        with connection.execute_wrapper(registro):
+            plantilla.render(Context({'items': CartItem.objects.filter(pk__in=[1, 2, 3])}))
+        sqls = [sql for sql, _ in registro.consultas]
+        self.assertIn('IN (...)', sqls[0])
+        _, (marcos, origen) = registro.consultas[-1]
+        self.assertEqual(origen, '<unknown source>:1')
+        self.assertTrue(marcos[0].startswith('app_Axolotl/tests.py:'))
+
+
+class IndiceArtistasTests(TestCase):
+    def setUp(self):
+        caches['catalogo'].clear()
+        for nombre in ['Beyoncé', 'bad bunny', 'Ángela Aguilar', 'Øystein', '¡Mayday!', '311', 'Blur']:
+            crear_artista(nombre)
+
+    def test_inicial_con_plegado_unicode(self):
+        casos = {
+            'Ángela': 'A', 'björk': 'B', 'Ñengo': 'N', '¡Mayday!': 'M', '  the 1975': 'T',
+            '311': '#', 'Øystein': 'O', 'Æther': 'A', 'ßtraße': 'S', 'Łona': 'L', '東京事変': '#', '': '#',
+        }
+        self.assertEqual({nombre: inicial_de(nombre) for nombre in casos}, casos)
+
+    def test_se_mantiene_al_guardar_y_al_importar(self):
+        artista = Artista.objects.get(nombre_artista='Blur')
+        artista.nombre_artista = 'Él'
+        artista.save(update_fields=['nombre_artista'])
+        artista.refresh_from_db()
+        self.assertEqual(artista.inicial, 'E')
+
+        importacion.importar_artistas(iter([(1, {'nombre_artista': 'Île'})]))
+        importacion.importar_productos(iter([(1, {
+            'artista': '¿Quién?', 'nombre_producto': 'Uno', 'genero': 'Pop', 'tipo': 'CD', 'stock': '1', 'precio': '10',
+        })]))
+        self.assertEqual(
+            dict(Artista.objects.filter(nombre_artista__in=['Île', '¿Quién?']).values_list('nombre_artista', 'inicial')),
+            {'Île': 'I', '¿Quién?': 'Q'},
+        )
+
+    def test_una_letra_por_respuesta(self):
+        with self.assertNumQueries(2):
+            respuesta = self.client.get(reverse('artistas_frontend'), {'letra': 'b'})
+        self.assertEqual(respuesta.context['letra'], 'B')
+        self.assertEqual([a.nombre_artista for a in respuesta.context['artistas']], ['Beyoncé', 'Blur', 'bad bunny'])
+        self.assertNotContains(respuesta, 'Mayday')
+        self.assertEqual(dict(respuesta.context['letras'])['#'], 1)
+
+        respuesta = self.client.get(reverse('artistas_frontend'), {'letra': '#'})
+        self.assertEqual([a.nombre_artista for a in respuesta.context['artistas']], ['311'])
+        respuesta = self.client.get(reverse('artistas_frontend'), {'letra': 'o'})
+        self.assertEqual([a.nombre_artista for a in respuesta.context['artistas']], ['Øystein'])
+
+    def test_sin_letra_muestra_la_primera_con_artistas(self):
+        for letra in ('', 'zz'):
+            respuesta = self.client.get(reverse('artistas_frontend'), {'letra': letra})
+            self.assertEqual(respuesta.context['letra'], 'A')
+            self.assertContains(respuesta, 'Ángela Aguilar')
+            self.assertContains(respuesta, '?letra=%23')
+
+
+class ExportacionesTests(TestCase):
+    HOJA = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+    def setUp(self):
+        self.staff = crear_staff()
+        self.client.force_login(self.staff)
+        cliente = User.objects.create_user(username='cliente', email='cliente@example.com', password='x').usuario
+        self.sabrina = crear_artista()
+        otra = crear_artista('Olivia')
+        self.espresso = crear_producto(self.sabrina, nombre_producto='Espresso, "single"', precio=Decimal('99.50'))
+        guts = crear_producto(otra, nombre_producto='Guts', precio=Decimal('10.00'))
+        self.pedidos = []
+        for dia, productos in ((1, [self.espresso, guts]), (2, [guts]), (3, [self.espresso])):
+            pedido = Pedido.objects.create(usuario=cliente, cantidad_producto=len(productos), total=Decimal('1'))
+            for producto in productos:
+                DetallePedido.objects.create(
+                    pedido=pedido, usuario=cliente, producto=producto, cantidad_producto=1, precio=producto.precio,
+                    total=producto.precio,
+                )
+            fecha = timezone.make_aware(datetime(2026, 3, dia, 23, 30))
+            Pedido.objects.filter(pk=pedido.pk).update(fecha=fecha)
+            DetallePedido.objects.filter(pedido=pedido).update(fecha=fecha)
+            self.pedidos.append(pedido)
+
+    def _leer(self, respuesta):
+        return b''.join(respuesta.streaming_content)
+
+    def _filas_xlsx(self, contenido):
+        with zipfile.ZipFile(BytesIO(contenido)) as archivo:
+            hoja = ElementTree.fromstring(archivo.read('xl/worksheets/sheet1.xml'))
+        return [
+            [(c.get('s'), c.findtext(f'{self.HOJA}v') or c.findtext(f'{self.HOJA}is/{self.HOJA}t')) for c in fila]
+            for fila in hoja.iter(f'{self.HOJA}row')
+        ]
+
+    def test_csv_de_detalles_con_filtros(self):
+        respuesta = self.client.get(reverse('exportar_detalles_pedidos'), {'desde': '2026-03-01', 'hasta': '2026-03-02'})
+        self.assertTrue(respuesta.streaming)
+        self.assertIn('desde-20260301_hasta-20260302.csv', respuesta['Content-Disposition'])
+        lineas = self._leer(respuesta).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lineas), 4)
+        self.assertTrue(lineas[0].startswith('id,pedido,fecha,cliente'))
+        self.assertIn('2026-03-01 23:30:00,cliente,cliente@example.com', lineas[1])
+        self.assertIn('"Espresso, ""single""",Sabrina,Pop,Vinilo,1,99.50,99.50', lineas[1])
+
+        lineas = self._leer(self.client.get(reverse('exportar_detalles_pedidos'), {'artista': self.sabrina.id})).splitlines()
+        self.assertEqual(len(lineas), 3)
+
+    def test_pedidos_por_artista_sin_repetir(self):
+        respuesta = self.client.get(reverse('exportar_pedidos'), {'artista': self.sabrina.id})
+        lineas = self._leer(respuesta).decode('utf-8-sig').splitlines()
+        self.assertEqual([l.split(',')[0] for l in lineas[1:]], [str(self.pedidos[0].id), str(self.pedidos[2].id)])
+
+    def test_xlsx_con_fechas_y_corte_al_limite(self):
+        respuesta = self.client.get(reverse('exportar_detalles_pedidos'), {'formato': 'xlsx'})
+        self.assertEqual(respuesta['Content-Type'], exportaciones.TIPOS['xlsx'])
+        filas = self._filas_xlsx(self._leer(respuesta))
+        self.assertEqual(len(filas), 5)
+        self.assertEqual(filas[0][:2], [('2', 'id'), ('2', 'pedido')])
+        estilo, serie = filas[1][2]
+        self.assertEqual(estilo, '1')
+        self.assertAlmostEqual(float(serie), 46082 + 23.5 / 24)  # 2026-03-01 23:30 en Excel
+        self.assertIn((None, 'Espresso, "single"'), filas[1])
+
+        with mock.patch.object(exportaciones, 'MAX_FILAS_XLSX', 3):
+            filas = self._filas_xlsx(b''.join(exportaciones.bloques('detalles', {}, 'xlsx')))
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[-1], [(None, exportaciones.AVISO_TRUNCADO)])
+
+    def test_lee_por_bloques(self):
+        with mock.patch.object(exportaciones, 'LOTE', 1):
+            bloques = list(exportaciones.bloques('pedidos', {}, 'csv', bom=False))
+        self.assertEqual(len(bloques), 4)  # encabezado y una fila por bloque
+
+    async def test_bajo_asgi_transmite_de_a_un_bloque(self):
+        await self.async_client.aforce_login(self.staff)
+        with mock.patch.object(exportaciones, 'LOTE', 1):
+            respuesta = await self.async_client.get(reverse('exportar_pedidos'))
+            self.assertTrue(respuesta.is_async)
+            bloques = [bloque async for bloque in respuesta.streaming_content]
+        self.assertEqual(len(bloques), 4)
+        self.assertEqual(len(b''.join(bloques).decode('utf-8-sig').splitlines()), 4)
+
+    def test_texto_con_formula_se_neutraliza(self):
+        Usuario.objects.filter(email='cliente@example.com').update(nombre='=HYPERLINK("http://x")', email='@cliente')
+        lineas = self._leer(self.client.get(reverse('exportar_pedidos'))).decode('utf-8-sig').splitlines()
+        self.assertIn('"\'=HYPERLINK(""http://x"")",\'@cliente', lineas[1])
+        filas = self._filas_xlsx(self._leer(self.client.get(reverse('exportar_pedidos'), {'formato': 'xlsx'})))
+        self.assertIn((None, '\'@cliente'), filas[1])
+
+    def test_filtros_invalidos_y_solo_staff(self):
+        respuesta = self.client.get(reverse('exportar_pedidos'), {'desde': '2026-03-05', 'hasta': '2026-03-01'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(self.client.get(reverse('exportar_pedidos'), {'desde': 'ayer'}).status_code, 400)
+
+        self.client.force_login(User.objects.get(username='cliente'))
+        self.assertEqual(self.client.get(reverse('exportar_pedidos')).status_code, 302)
+
+    def test_comando(self):
+        salida = StringIO()
+        call_command('exportar_pedidos', '--hasta', '2026-03-01', stdout=salida, stderr=StringIO())
+        self.assertEqual(len(salida.getvalue().splitlines()), 2)
+
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = os.path.join(carpeta, 'detalles.xlsx')
+            call_command('exportar_pedidos', ruta, '--modelo', 'detalles', '--producto', str(self.espresso.id), stderr=StringIO())
+            with open(ruta, 'rb') as archivo:
+                self.assertEqual(len(self._filas_xlsx(archivo.read())), 3)
+        with self.assertRaises(CommandError):
+            call_command('exportar_pedidos', '--formato', 'xlsx', stderr=StringIO())
+
+
+class VentasTests(TestCase):
+    def setUp(self):
+        self.staff = crear_staff()
+        self.cliente = User.objects.create_user(username='cliente', email='cliente@example.com', password='x').usuario
+        self.sabrina = crear_artista()
+        olivia = crear_artista('Olivia')
+        self.espresso = crear_producto(self.sabrina, nombre_producto='Espresso', stock=50)
+        self.taste = crear_producto(self.sabrina, nombre_producto='Taste', tipo='CD', precio=Decimal('50.00'), stock=50)
+        self.guts = crear_producto(olivia, nombre_producto='Guts', genero='Rock', precio=Decimal('10.00'), stock=50)
+
+    def _comprar(self, *lineas):
+        cart = Cart.objects.get_or_create(usuario=self.cliente)[0]
+        for producto, cantidad in lineas:
+            carrito.agregar_producto(cart, producto, cantidad)
+        return checkout.crear_pedido(cart)
+
+    def _mover(self, pedido, anio, mes, dia):
+        # Sin señales, como una carga masiva; después hay que recalcular
+        fecha = timezone.make_aware(datetime(anio, mes, dia, 12))
+        Pedido.objects.filter(pk=pedido.pk).update(fecha=fecha)
+        DetallePedido.objects.filter(pedido=pedido).update(fecha=fecha)
+
+    def _foto(self):
+        """Filas con ventas de todas las tablas (las bajas incrementales dejan filas en cero)."""
+        return {
+            modelo.__name__: sorted(modelo.objects.exclude(unidades=0, pedidos=0).values_list(
+                *[campo.attname for campo in modelo._meta.concrete_fields if campo.name != 'id']
+            ))
+            for modelo in (*ventas.MODELOS_DIA, VentaProductoMes, VentaArtistaMes)
+        }
+
+    def test_checkout_suma_pedidos_distintos_por_clave(self):
+        self._comprar((self.espresso, 2), (self.taste, 1), (self.guts, 3))
+        self._comprar((self.espresso, 1))
+        hoy = timezone.localdate()
+        dia = VentaDia.objects.get(dia=hoy)
+        self.assertEqual((dia.unidades, dia.ingresos, dia.pedidos), (7, Decimal('380.00'), 2))
+        artista = VentaArtistaDia.objects.get(dia=hoy, artista=self.sabrina)
+        self.assertEqual((artista.unidades, artista.ingresos, artista.pedidos), (4, Decimal('350.00'), 2))
+        self.assertEqual(VentaArtistaMes.objects.get(mes=hoy.replace(day=1), artista=self.sabrina).pedidos, 2)
+        self.assertEqual(
+            dict(VentaFacetaDia.objects.filter(faceta='genero').values_list('valor', 'pedidos')),
+            {'pop': 2, 'rock': 1},
+        )
+
+        foto = self._foto()
+        ventas.recalcular()
+        self.assertEqual(self._foto(), foto)
+
+    def test_ediciones_y_bajas_coinciden_con_recalcular(self):
+        pedido = self._comprar((self.espresso, 2), (self.taste, 1))
+        detalle = self._comprar((self.guts, 1)).detalles.get()
+        detalle.cantidad_producto, detalle.total = 4, Decimal('40.00')
+        detalle.save()
+        pedido.detalles.get(producto=self.taste).delete()
+        foto = self._foto()
+        ventas.recalcular()
+        self.assertEqual(self._foto(), foto)
+        self.assertEqual(VentaDia.objects.get().unidades, 6)
+
+        pedido.delete()
+        foto = self._foto()
+        ventas.recalcular()
+        self.assertEqual(self._foto(), foto)
+        self.assertEqual(VentaDia.objects.get().pedidos, 1)
+
+    def test_borrado_masivo_descuenta_una_vez(self):
+        def borrar(cantidad):
+            ids = [self._comprar((self.espresso, 1), (self.guts, 2)).pk for _ in range(cantidad)]
+            with CaptureQueriesContext(connection) as consultas:
+                acciones.borrar(Pedido.objects.filter(pk__in=ids))
+            return [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('UPDATE') and '_venta' in q['sql']]
+
+        self._comprar((self.taste, 1))
+        pocos, muchos = borrar(2), borrar(6)
+        self.assertTrue(pocos)
+        self.assertEqual(len(pocos), len(muchos))
+        foto = self._foto()
+        ventas.recalcular()
+        self.assertEqual(self._foto(), foto)
+        self.assertEqual((VentaDia.objects.get().pedidos, VentaDia.objects.get().unidades), (1, 1))
+        self.assertEqual(ventas._borrandose(), set())
+
+    def test_borrar_artista_con_varios_productos_en_un_pedido(self):
+        self._comprar((self.espresso, 1), (self.taste, 2), (self.guts, 1))
+        self._comprar((self.espresso, 1), (self.taste, 1))
+        self.sabrina.delete()
+        foto = self._foto()
+        ventas.recalcular()
+        self.assertEqual(self._foto(), foto)
+        self.assertEqual((VentaDia.objects.get().pedidos, VentaDia.objects.get().unidades), (1, 1))
+        self.assertEqual(ventas._detalles_borrandose(), set())
+
+    def test_borrado_masivo_de_productos_de_un_mismo_pedido(self):
+        self._comprar((self.espresso, 1), (self.taste, 2), (self.guts, 1))
+        self._comprar((self.espresso, 1), (self.taste, 1))
+        acciones.borrar(Producto.objects.filter(pk__in=[self.espresso.pk, self.taste.pk]))
+        foto = self._foto()
+        ventas.recalcular()
+        self.assertEqual(self._foto(), foto)
+        self.assertEqual(VentaArtistaDia.objects.exclude(pedidos=0).get().artista_id, self.guts.artista_id)
+
+    def test_reporte_combina_dias_sueltos_y_meses(self):
+        for fecha, lineas in (
+            ((2026, 1, 20), [(self.guts, 10)]),
+            ((2026, 2, 3), [(self.espresso, 1), (self.taste, 1)]),
+            ((2026, 2, 28), [(self.espresso, 2)]),
+            ((2026, 3, 1), [(self.guts, 1)]),
+        ):
+            self._mover(self._comprar(*lineas), *fecha)
+        self.assertEqual(ventas.recalcular(), 4)
+        self.assertEqual(VentaProductoMes.objects.get(mes=datetime(2026, 2, 1).date(), producto=self.espresso).pedidos, 2)
+
+        reporte = ventas.reporte(datetime(2026, 1, 15).date(), datetime(2026, 3, 1).date(), 'unidades')
+        self.assertEqual(len(reporte['serie']), 46)
+        self.assertEqual((reporte['totales']['unidades'], reporte['totales']['pedidos']), (15, 4))
+        self.assertEqual(
+            [(p['nombre'], p['unidades'], p['pedidos']) for p in reporte['productos']],
+            [('Guts', 11, 2), ('Espresso', 3, 2), ('Taste', 1, 1)],
+        )
+        self.assertEqual([(a['nombre'], a['porcentaje']) for a in reporte['artistas']], [('Olivia', 100), ('Sabrina', 36)])
+
+        solo_febrero = ventas.reporte(datetime(2026, 2, 1).date(), datetime(2026, 2, 28).date(), 'ingresos', top=1)
+        self.assertEqual([(p['nombre'], p['ingresos']) for p in solo_febrero['productos']], [('Espresso', Decimal('300.00'))])
+        self.assertEqual([t['nombre'] for t in solo_febrero['tipos']], ['Vinilo', 'CD'])
+
+    def test_vista_solo_staff_y_consultas_constantes(self):
+        self._comprar((self.espresso, 1))
+        url = reverse('reporte_ventas')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.context['totales']['pedidos'], 1)
+        self.assertEqual(len(respuesta.context['serie']), 30)
+        self._mover(Pedido.objects.get(), 2026, 3, 10)
+        ventas.recalcular()
+        with CaptureQueriesContext(connection) as dias:
+            self.client.get(url, {'desde': '2026-03-05', 'hasta': '2026-03-20'})
+        with CaptureQueriesContext(connection) as dias_y_meses:
+            self.client.get(url, {'desde': '2025-01-10', 'hasta': '2026-12-20', 'orden': 'pedidos'})
+        # Sólo una consulta más por ranking (productos y artistas) para la parte por meses
+        self.assertEqual(len(dias.captured_queries) + 2, len(dias_y_meses.captured_queries))
+
+        respuesta = self.client.get(url, {'desde': '2026-03-05', 'hasta': '2026-03-01'})
+        self.assertTrue(respuesta.context['form'].errors)
+        self.assertNotIn('totales', respuesta.context)
+
+    def test_comando(self):
+        self._mover(self._comprar((self.espresso, 1)), 2026, 3, 1)
+        VentaDia.objects.all().delete()
+        salida = StringIO()
+        call_command('recalcular_ventas', '--desde', '2026-03-01', '--hasta', '2026-03-01', stdout=salida)
+        self.assertIn('1 días con ventas', salida.getvalue())
+        self.assertEqual(VentaDia.objects.get().dia, datetime(2026, 3, 1).date())
+        with self.assertRaises(CommandError):
+            call_command('recalcular_ventas', '--desde', '2026-03-05', '--hasta', '2026-03-01')
@@ -1,17 +1,21 @@
 from django.urls import path
-from . import views
+from . import api, views
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     # URLs del panel de administración
     path('admin_panel/', views.inicio_axolotlmusic, name='inicio_axolotlmusic'), # Home del panel
+    path('admin_panel/metricas/cache/', views.metricas_cache, name='metricas_cache'),
+    path('admin_panel/metricas/rendimiento/', views.metricas_rendimiento, name='metricas_rendimiento'),
+    path('admin_panel/reportes/ventas/', views.reporte_ventas, name='reporte_ventas'),
     
     # CRUD Productos (ya existentes)
     path('admin_panel/productos/agregar/', views.agregar_productos, name='agregar_productos'),
     path('admin_panel/productos/ver/', views.ver_productos, name='ver_productos'),
     path('admin_panel/productos/actualizar/<int:producto_id>/', views.actualizar_productos, name='actualizar_productos'),
     path('admin_panel/productos/borrar/<int:producto_id>/', views.borrar_productos, name='borrar_productos'),
+    path('admin_panel/productos/acciones/', views.acciones_productos, name='acciones_productos'),
 
     # CRUD Artistas
     path('admin_panel/artistas/agregar/', views.agregar_artistas, name='agregar_artistas'),
@@ -23,6 +27,7 @@ urlpatterns = [
     path('admin_panel/clientes/ver/', views.ver_clientes, name='ver_clientes'),
     path('admin_panel/clientes/actualizar/<int:cliente_id>/', views.actualizar_cliente, name='actualizar_cliente'),
     path('admin_panel/clientes/borrar/<int:cliente_id>/', views.borrar_cliente, name='borrar_cliente'),
+    path('admin_panel/clientes/acciones/', views.acciones_clientes, name='acciones_clientes'),
     
     # CRUD Empleados
     path('admin_panel/empleados/ver/', views.ver_empleados, name='ver_empleados'),
@@ -35,12 +40,15 @@ urlpatterns = [
     path('admin_panel/pedidos/agregar/', views.agregar_pedido, name='agregar_pedido'),
     path('admin_panel/pedidos/actualizar/<int:pedido_id>/', views.actualizar_pedido, name='actualizar_pedido'),
     path('admin_panel/pedidos/borrar/<int:pedido_id>/', views.borrar_pedido, name='borrar_pedido'),
+    path('admin_panel/pedidos/acciones/', views.acciones_pedidos, name='acciones_pedidos'),
+    path('admin_panel/pedidos/exportar/', views.exportar_pedidos, name='exportar_pedidos'),
     
     # CRUD Detalles Pedidos
     path('admin_panel/detalles_pedidos/ver/', views.ver_detalles_pedidos, name='ver_detalles_pedidos'),
     path('admin_panel/detalles_pedidos/agregar/', views.agregar_detalle_pedido, name='agregar_detalle_pedido'),
     path('admin_panel/detalles_pedidos/actualizar/<int:detalle_id>/', views.actualizar_detalle_pedido, name='actualizar_detalle_pedido'),
     path('admin_panel/detalles_pedidos/borrar/<int:detalle_id>/', views.borrar_detalle_pedido, name='borrar_detalle_pedido'),
+    path('admin_panel/detalles_pedidos/exportar/', views.exportar_detalles_pedidos, name='exportar_detalles_pedidos'),
     
     # URLs del Frontend de AxolotlMusic
     path('', views.login_frontend, name='root_login'), # Root -> login
@@ -54,14 +62,26 @@ urlpatterns = [
     path('genero/', views.genero_frontend, name='genero_frontend'),
     path('tipo/', views.tipo_frontend, name='tipo_frontend'),
     path('novedades/', views.novedades_frontend, name='novedades_frontend'),
+    path('buscar/', views.buscar_frontend, name='buscar_frontend'),
     path('finalizar/', views.finalizar_frontend, name='finalizar_frontend'),
     path('cart/add/<int:producto_id>/', views.add_to_cart, name='add_to_cart'),
     path('cart/', views.ver_carrito, name='ver_carrito'),
     path('cart/update/<int:item_id>/', views.update_cart_item, name='update_cart_item'),
     path('cart/remove/<int:item_id>/', views.remove_cart_item, name='remove_cart_item'),
+    path('cart/anonimo/update/<int:producto_id>/', views.update_cart_anonimo, name='update_cart_anonimo'),
+    path('cart/anonimo/remove/<int:producto_id>/', views.remove_cart_anonimo, name='remove_cart_anonimo'),
+    path('cart/checkout/', views.checkout_carrito, name='checkout_carrito'),
     path('perfil/', views.perfil_usuario, name='perfil_usuario'),
     path('perfil/editar/', views.editar_perfil, name='editar_perfil'),
 
+
+    # API JSON de sólo lectura (ver api.py)
+    path('api/artistas/', api.artistas, name='api_artistas'),
+    path('api/artistas/<int:artista_id>/', api.artista, name='api_artista'),
+    path('api/productos/', api.productos, name='api_productos'),
+    path('api/productos/<int:producto_id>/', api.producto, name='api_producto'),
+    path('api/carrito/', api.carrito, name='api_carrito'),
+
     # TODO: Añadir URLs para CRUD de Usuario, Pedido, DetallePedido
 ]
 
@@ -0,0 +1,469 @@
+"""Ventas por día: totales, por producto, por artista y por género/tipo.
+
+El reporte del panel (`reporte`) lee sólo estas tablas, sin agrupar
+`DetallePedido`: un año son 365 filas de `VentaDia`. Los rankings de
+productos y artistas toman los meses enteros del rango de `VentaProductoMes`
+y `VentaArtistaMes` y sólo los días sueltos de los bordes de las tablas por
+día, así un año no suma cientos de miles de filas por producto y día.
+
+Cada línea de pedido suma sus unidades e ingresos al día de su `fecha` (y a
+su mes en las tablas mensuales). `pedidos` cuenta pedidos distintos: una
+línea sólo le suma el pedido a una clave (el producto, el artista, el
+género...) si ninguna otra línea del mismo pedido se lo había sumado ya
+(`previas`). Un pedido cae en un solo día, así que sumar los días de un mes
+no lo cuenta dos veces.
+
+`registrar` escribe con un número fijo de consultas por tabla sin importar
+cuántas líneas traiga: un INSERT que ignora los conflictos crea en cero las
+filas que falten y un UPDATE con CASE suma con F(), atómico aunque dos
+compras toquen la misma fila. Lo llaman `checkout` después del bulk_create
+de los detalles y las señales de `DetallePedido` (altas, ediciones y bajas
+desde el panel). Al borrar un pedido sus líneas se descuentan juntas en el
+pre_delete del pedido; al borrar un producto (o su artista), en el pre_delete
+del producto, porque la cascada borra todas las líneas antes del primer
+post_delete. Los borrados masivos, que no disparan señales, llaman antes a
+`descontar` con las líneas que se van (de a PEDIDOS_POR_LOTE pedidos).
+
+Las ventas quedan con el artista, el género y el tipo que tenía el producto
+al venderse. `manage.py recalcular_ventas` las reconstruye desde
+`DetallePedido` con los datos actuales (y los meses desde los días): sirve para cargar el histórico y
+después de escrituras masivas que no disparan señales.
+"""
+import datetime
+import threading
+from collections import defaultdict
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Sum, When
+from django.db.models.functions import TruncDate, TruncMonth
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    Artista, DetallePedido, Pedido, Producto, VentaArtistaDia, VentaArtistaMes, VentaDia, VentaFacetaDia,
+    VentaProductoDia, VentaProductoMes, normalizar_faceta,
+)
+
+CAMPOS = ('unidades', 'ingresos', 'pedidos')
+ORDENES = ('ingresos', 'unidades', 'pedidos')
+TOP = 10
+DIAS_POR_LOTE = 31
+LOTE = 1000
+# Pedidos por llamada a `registrar` en `descontar`: acota el tamaño del CASE y del OR
+PEDIDOS_POR_LOTE = 100
+MODELOS_DIA = (VentaDia, VentaProductoDia, VentaArtistaDia, VentaFacetaDia)
+# (tabla por mes, tabla por día que suma, campo de la clave)
+MENSUALES = (
+    (VentaProductoMes, VentaProductoDia, 'producto_id'),
+    (VentaArtistaMes, VentaArtistaDia, 'artista_id'),
+)
+
+# Columnas de DetallePedido para armar una Linea, en su orden
+_COLUMNAS = (
+    'pedido_id', 'fecha', 'producto_id', 'producto__artista_id', 'producto__genero', 'producto__tipo',
+    'cantidad_producto', 'total',
+)
+# Pedidos y líneas que se están borrando en este hilo: ya se descontaron
+_local = threading.local()
+
+
+class Linea(NamedTuple):
+    pedido_id: int
+    dia: datetime.date
+    producto_id: int
+    artista_id: int
+    genero: str
+    tipo: str
+    unidades: int
+    ingresos: Decimal
+
+
+def _decimal(valor):
+    # Las vistas del panel guardan totales como float
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+
+
+def _inicio_del_dia(dia):
+    return timezone.make_aware(datetime.datetime.combine(dia, datetime.time.min))
+
+
+def _mes(dia):
+    return dia.replace(day=1)
+
+
+def _mes_siguiente(dia):
+    return (dia.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def _borrandose():
+    if not hasattr(_local, 'pedidos'):
+        _local.pedidos = set()
+    return _local.pedidos
+
+
+def _detalles_borrandose():
+    if not hasattr(_local, 'detalles'):
+        _local.detalles = set()
+    return _local.detalles
+
+
+def linea(detalle, producto):
+    """Linea de un DetallePedido recién creado; `producto` con artista_id, genero y tipo cargados."""
+    return Linea(
+        detalle.pedido_id, timezone.localdate(detalle.fecha), producto.id, producto.artista_id,
+        producto.genero, producto.tipo, detalle.cantidad_producto, _decimal(detalle.total),
+    )
+
+
+def lineas(detalles):
+    """Lineas de un QuerySet de DetallePedido, en una consulta."""
+    return [
+        Linea(pedido_id, timezone.localdate(fecha), producto_id, artista_id, genero, tipo, unidades, _decimal(total))
+        for pedido_id, fecha, producto_id, artista_id, genero, tipo, unidades, total in detalles.values_list(*_COLUMNAS)
+    ]
+
+
+# ----------------------
+# Escritura incremental
+# ----------------------
+def _claves(venta):
+    """[(modelo, clave, nombre)] a los que suma una línea; la clave es una tupla de (campo, valor)."""
+    return [
+        (VentaDia, (('dia', venta.dia),), None),
+        (VentaProductoDia, (('dia', venta.dia), ('producto_id', venta.producto_id)), None),
+        (VentaArtistaDia, (('dia', venta.dia), ('artista_id', venta.artista_id)), None),
+        (VentaProductoMes, (('mes', _mes(venta.dia)), ('producto_id', venta.producto_id)), None),
+        (VentaArtistaMes, (('mes', _mes(venta.dia)), ('artista_id', venta.artista_id)), None),
+        (VentaFacetaDia, (('dia', venta.dia), ('faceta', 'genero'), ('valor', normalizar_faceta(venta.genero))), venta.genero),
+        (VentaFacetaDia, (('dia', venta.dia), ('faceta', 'tipo'), ('valor', normalizar_faceta(venta.tipo))), venta.tipo),
+    ]
+
+
+def registrar(nuevas, signo=1, previas=()):
+    """Suma (signo=1) o resta (signo=-1) las líneas `nuevas` a las tablas de ventas.
+
+    `previas` son otras líneas de los mismos pedidos que ya están sumadas y
+    lo siguen estando: a una clave que ya tiene el pedido no se le vuelve a
+    contar (ni a descontar) el pedido. Pensado para las líneas de unos pocos
+    pedidos; para rangos grandes, `recalcular`.
+    """
+    contados = {(modelo, clave, l.pedido_id) for l in previas for modelo, clave, _ in _claves(l)}
+    por_modelo = defaultdict(dict)  # modelo -> {clave: [unidades, ingresos, {pedidos}, nombre]}
+    for l in nuevas:
+        for modelo, clave, nombre in _claves(l):
+            acumulado = por_modelo[modelo].setdefault(clave, [0, Decimal('0'), set(), nombre])
+            acumulado[0] += l.unidades
+            acumulado[1] += l.ingresos
+            if (modelo, clave, l.pedido_id) not in contados:
+                acumulado[2].add(l.pedido_id)
+    for modelo, filas in por_modelo.items():
+        _aplicar(modelo, filas, signo)
+
+
+def _aplicar(modelo, filas, signo):
+    if signo > 0:
+        # Crea en cero las filas que falten; si otro proceso la crea antes, el conflicto se ignora
+        modelo.objects.bulk_create([
+            modelo(**dict(clave), **({'nombre': nombre} if nombre else {}))
+            for clave, (_, _, _, nombre) in filas.items()
+        ], ignore_conflicts=True)
+    condiciones = [(Q(**dict(clave)), (unidades, ingresos, len(pedidos))) for clave, (unidades, ingresos, pedidos, _) in filas.items()]
+    filtro = Q()
+    for condicion, _ in condiciones:
+        filtro |= condicion
+    modelo.objects.filter(filtro).update(**{
+        campo: Case(
+            *[When(condicion, then=F(campo) + signo * deltas[i]) for condicion, deltas in condiciones if deltas[i]],
+            default=F(campo), output_field=modelo._meta.get_field(campo),
+        )
+        for i, campo in enumerate(CAMPOS)
+    })
+
+
+def descontar(detalles):
+    """Descuenta las líneas de un QuerySet de DetallePedido que se va a borrar sin señales.
+
+    Las demás líneas de sus pedidos, que quedan, cuentan como previas. Debe
+    llamarse dentro de la transacción del borrado, antes de borrar.
+    """
+    ids = detalles.values('pk')
+    pedido_ids = sorted(set(detalles.order_by().values_list('pedido_id', flat=True)))
+    for i in range(0, len(pedido_ids), PEDIDOS_POR_LOTE):
+        lote = DetallePedido.objects.filter(pedido_id__in=pedido_ids[i:i + PEDIDOS_POR_LOTE])
+        registrar(lineas(lote.filter(pk__in=ids)), -1, lineas(lote.exclude(pk__in=ids)))
+
+
+# ----------------------
+# Reconstrucción
+# ----------------------
+def _en_tandas(modelo, objetos):
+    """bulk_create de a LOTE sin juntar todas las filas en memoria; devuelve cuántas creó."""
+    tanda, total = [], 0
+    for objeto in objetos:
+        tanda.append(objeto)
+        if len(tanda) == LOTE:
+            modelo.objects.bulk_create(tanda)
+            total += len(tanda)
+            tanda = []
+    if tanda:
+        modelo.objects.bulk_create(tanda)
+        total += len(tanda)
+    return total
+
+
+def _entre(campo, desde, hasta):
+    filtro = {}
+    if desde:
+        filtro[f'{campo}__gte'] = desde
+    if hasta:
+        filtro[f'{campo}__lte'] = hasta
+    return filtro
+
+
+def _borrar(desde, hasta, meses=False):
+    for modelo in MODELOS_DIA:
+        modelo.objects.filter(**_entre('dia', desde, hasta)).delete()
+    if meses:
+        for modelo, _, _ in MENSUALES:
+            modelo.objects.filter(**_entre('mes', desde and _mes(desde), hasta)).delete()
+
+
+def _reconstruir(inicio, fin):
+    detalles = (
+        DetallePedido.objects
+        .filter(fecha__gte=_inicio_del_dia(inicio), fecha__lt=_inicio_del_dia(fin + datetime.timedelta(days=1)))
+        .annotate(d=TruncDate('fecha')).order_by()
+    )
+    sumas = {'u': Sum('cantidad_producto'), 'i': Sum('total'), 'p': Count('pedido', distinct=True)}
+    _borrar(inicio, fin)
+    dias = _en_tandas(VentaDia, (
+        VentaDia(dia=f['d'], unidades=f['u'], ingresos=f['i'], pedidos=f['p'])
+        for f in detalles.values('d').annotate(**sumas).iterator()
+    ))
+    _en_tandas(VentaProductoDia, (
+        VentaProductoDia(dia=f['d'], producto_id=f['producto'], unidades=f['u'], ingresos=f['i'], pedidos=f['p'])
+        for f in detalles.values('d', 'producto').annotate(**sumas).iterator()
+    ))
+    _en_tandas(VentaArtistaDia, (
+        VentaArtistaDia(dia=f['d'], artista_id=f['producto__artista'], unidades=f['u'], ingresos=f['i'], pedidos=f['p'])
+        for f in detalles.values('d', 'producto__artista').annotate(**sumas).iterator()
+    ))
+    for faceta, _ in VentaFacetaDia.FACETAS:
+        _en_tandas(VentaFacetaDia, (
+            VentaFacetaDia(
+                dia=f['d'], faceta=faceta, valor=f[f'producto__{faceta}_slug'], nombre=f['nombre'],
+                unidades=f['u'], ingresos=f['i'], pedidos=f['p'],
+            )
+            for f in detalles.values('d', f'producto__{faceta}_slug').annotate(nombre=Min(f'producto__{faceta}'), **sumas).iterator()
+        ))
+    return dias
+
+
+def _reconstruir_meses(desde, hasta):
+    """Rehace los meses que tocan [desde, hasta] sumando las tablas por día."""
+    primero, ultimo = _mes(desde), _mes(hasta)
+    for modelo, modelo_dia, campo in MENSUALES:
+        modelo.objects.filter(mes__gte=primero, mes__lte=ultimo).delete()
+        _en_tandas(modelo, (
+            modelo(mes=f['m'], **{campo: f[campo]}, unidades=f['u'], ingresos=f['i'], pedidos=f['p'])
+            for f in modelo_dia.objects.filter(dia__gte=primero, dia__lt=_mes_siguiente(ultimo))
+            .annotate(m=TruncMonth('dia')).order_by()
+            .values('m', campo).annotate(u=Sum('unidades'), i=Sum('ingresos'), p=Sum('pedidos')).iterator()
+        ))
+
+
+def recalcular(desde=None, hasta=None):
+    """Reconstruye las ventas de los días [desde, hasta] (por defecto todos) desde DetallePedido.
+
+    Va de a DIAS_POR_LOTE días, cada tanda en su transacción, y al final
+    rehace los meses que tocan el rango; devuelve cuántos días con ventas
+    quedaron.
+    """
+    if desde is None or hasta is None:
+        rango = DetallePedido.objects.aggregate(primero=Min('fecha'), ultimo=Max('fecha'))
+        # También lo que haya fuera de los detalles que quedan (ventas de pedidos borrados)
+        with transaction.atomic():
+            _borrar(desde, hasta, meses=True)
+        if rango['primero'] is None:
+            return 0
+        desde = desde or timezone.localdate(rango['primero'])
+        hasta = hasta or timezone.localdate(rango['ultimo'])
+    dias = 0
+    inicio = desde
+    while inicio <= hasta:
+        fin = min(hasta, inicio + datetime.timedelta(days=DIAS_POR_LOTE - 1))
+        with transaction.atomic():
+            dias += _reconstruir(inicio, fin)
+        inicio = fin + datetime.timedelta(days=1)
+    with transaction.atomic():
+        _reconstruir_meses(desde, hasta)
+    return dias
+
+
+# ----------------------
+# Lectura para el reporte
+# ----------------------
+def _con_barras(filas, orden):
+    """Agrega 'porcentaje' (respecto del máximo de `orden`) para dibujar las barras."""
+    maximo = max((fila[orden] for fila in filas), default=0)
+    for fila in filas:
+        fila['porcentaje'] = round(fila[orden] * 100 / maximo) if maximo else 0
+    return filas
+
+
+def _tramos(desde, hasta):
+    """([(inicio, fin)] de días sueltos, (primer mes, último mes) completos o None) que cubren [desde, hasta]."""
+    primero = desde if desde.day == 1 else _mes_siguiente(desde)
+    # El último mes completo: el de `hasta` si termina ese día, si no el anterior
+    termina_el_mes = hasta == _mes_siguiente(hasta) - datetime.timedelta(days=1)
+    ultimo = _mes(hasta) if termina_el_mes else _mes(_mes(hasta) - datetime.timedelta(days=1))
+    if primero > ultimo:
+        return [(desde, hasta)], None
+    dias = []
+    if desde < primero:
+        dias.append((desde, primero - datetime.timedelta(days=1)))
+    if _mes_siguiente(ultimo) <= hasta:
+        dias.append((_mes_siguiente(ultimo), hasta))
+    return dias, (primero, ultimo)
+
+
+def _ranking(mensual, tramos, orden, top):
+    """Los `top` productos o artistas del rango: meses enteros de la tabla por mes y el resto por día."""
+    modelo_mes, modelo_dia, campo = mensual
+    dias, meses = tramos
+    consultas = []
+    if dias:
+        filtro = Q()
+        for inicio, fin in dias:
+            filtro |= Q(dia__gte=inicio, dia__lte=fin)
+        consultas.append(modelo_dia.objects.filter(filtro))
+    if meses:
+        consultas.append(modelo_mes.objects.filter(mes__gte=meses[0], mes__lte=meses[1]))
+    sumas = {campo_suma: Sum(campo_suma) for campo_suma in CAMPOS}
+    if len(consultas) == 1:
+        return list(consultas[0].values(campo).annotate(**sumas).order_by(f'-{orden}', campo)[:top])
+    # Días sueltos y meses: se suman por clave aquí (una fila por producto o artista vendido en cada parte)
+    totales = {}
+    for consulta in consultas:
+        for fila in consulta.values(campo).annotate(**sumas).order_by():
+            acumulado = totales.setdefault(fila[campo], dict.fromkeys(CAMPOS, 0) | {campo: fila[campo]})
+            for campo_suma in CAMPOS:
+                acumulado[campo_suma] += fila[campo_suma]
+    return sorted(totales.values(), key=lambda fila: (-fila[orden], fila[campo]))[:top]
+
+
+def reporte(desde, hasta, orden='ingresos', top=TOP):
+    """Totales, serie diaria y rankings de [desde, hasta] ordenados por `orden`, leyendo sólo las tablas de ventas."""
+    rango = {'dia__gte': desde, 'dia__lte': hasta}
+    por_dia = {fila['dia']: fila for fila in VentaDia.objects.filter(**rango).values('dia', *CAMPOS)}
+    serie = []
+    dia = desde
+    while dia <= hasta:
+        serie.append(por_dia.get(dia) or {'dia': dia, 'unidades': 0, 'ingresos': Decimal('0'), 'pedidos': 0})
+        dia += datetime.timedelta(days=1)
+    totales = {campo: sum(fila[campo] for fila in serie) for campo in CAMPOS}
+    totales['ticket_promedio'] = totales['ingresos'] / totales['pedidos'] if totales['pedidos'] else Decimal('0')
+
+    tramos = _tramos(desde, hasta)
+    productos = _ranking(MENSUALES[0], tramos, orden, top)
+    nombres = {
+        id_: (nombre, artista) for id_, nombre, artista in
+        Producto.objects.filter(id__in=[p['producto_id'] for p in productos]).values_list('id', 'nombre_producto', 'artista__nombre_artista')
+    }
+    for fila in productos:
+        fila['nombre'], fila['artista'] = nombres.get(fila['producto_id'], ('', ''))
+
+    artistas = _ranking(MENSUALES[1], tramos, orden, top)
+    nombres = dict(Artista.objects.filter(id__in=[a['artista_id'] for a in artistas]).values_list('id', 'nombre_artista'))
+    for fila in artistas:
+        fila['nombre'] = nombres.get(fila['artista_id'], '')
+
+    facetas = defaultdict(list)
+    for fila in (
+        VentaFacetaDia.objects.filter(**rango).values('faceta', 'valor')
+        .annotate(nombre=Min('nombre'), unidades=Sum('unidades'), ingresos=Sum('ingresos'), pedidos=Sum('pedidos'))
+        .order_by('faceta', f'-{orden}', 'valor')
+    ):
+        facetas[fila['faceta']].append(fila)
+
+    return {
+        'desde': desde,
+        'hasta': hasta,
+        'orden': orden,
+        'totales': totales,
+        'serie': _con_barras(serie, orden),
+        'productos': _con_barras(productos, orden),
+        'artistas': _con_barras(artistas, orden),
+        'generos': _con_barras(facetas['genero'], orden),
+        'tipos': _con_barras(facetas['tipo'], orden),
+    }
+
+
+# ----------------------
+# Señales
+# ----------------------
+@receiver(pre_save, sender=DetallePedido)
+def _detalle_pre_save(sender, instance, **kwargs):
+    instance._lineas_previas = lineas(DetallePedido.objects.filter(pk=instance.pk)) if instance.pk else []
+
+
+@receiver(post_save, sender=DetallePedido)
+def _detalle_guardado(sender, instance, created, **kwargs):
+    antes = getattr(instance, '_lineas_previas', [])
+    ahora = lineas(DetallePedido.objects.filter(pk=instance.pk))
+    if antes == ahora:
+        return
+    pedidos = {l.pedido_id for l in antes + ahora}
+    otras = lineas(DetallePedido.objects.filter(pedido_id__in=pedidos).exclude(pk=instance.pk))
+    if antes:
+        registrar(antes, -1, otras)
+    registrar(ahora, 1, otras)
+
+
+@receiver(post_delete, sender=DetallePedido)
+def _detalle_borrado(sender, instance, **kwargs):
+    if instance.pk in _detalles_borrandose():
+        _detalles_borrandose().discard(instance.pk)
+        return
+    if instance.pedido_id in _borrandose():
+        return
+    producto = Producto.objects.filter(pk=instance.producto_id).only('id', 'artista_id', 'genero', 'tipo').first()
+    if producto is None:
+        # Se borró junto con el producto: sus filas por producto ya no existen
+        return
+    registrar([linea(instance, producto)], -1, lineas(DetallePedido.objects.filter(pedido_id=instance.pedido_id)))
+
+
+@receiver(pre_delete, sender=Pedido)
+def _pedido_pre_delete(sender, instance, **kwargs):
+    if instance.pk in _borrandose():
+        return
+    # Con todas las líneas juntas el pedido se descuenta una sola vez por clave
+    registrar(lineas(DetallePedido.objects.filter(pedido_id=instance.pk)), -1)
+    _borrandose().add(instance.pk)
+
+
+@receiver(post_delete, sender=Pedido)
+def _pedido_borrado(sender, instance, **kwargs):
+    _borrandose().discard(instance.pk)
+
+
+@receiver(pre_delete, sender=Producto)
+def _producto_pre_delete(sender, instance, **kwargs):
+    # Las líneas de otros productos que se borran en la misma cascada ya se descontaron
+    # en su pre_delete y no cuentan como previas
+    borrandose = _detalles_borrandose()
+    detalles = DetallePedido.objects.filter(producto_id=instance.pk).exclude(pedido_id__in=_borrandose())
+    ids = list(detalles.values_list('pk', flat=True))
+    if not ids:
+        return
+    propias = lineas(DetallePedido.objects.filter(pk__in=ids))
+    otras = lineas(
+        DetallePedido.objects.filter(pedido_id__in={l.pedido_id for l in propias})
+        .exclude(producto_id=instance.pk).exclude(pk__in=borrandose)
+    )
+    registrar(propias, -1, otras)
+    borrandose.update(ids)
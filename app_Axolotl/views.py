@@ -1,11 +1,25 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
 from django.db import OperationalError
-from .models import Producto, Artista, Usuario, Pedido, DetallePedido, Cart, CartItem
-from .forms import ArtistaForm, ProductoForm, UsuarioForm
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
+from .models import LETRAS, Producto, Artista, Usuario, Pedido, DetallePedido, Cart, CartItem, normalizar_faceta
+from .forms import ArtistaForm, FiltroExportacionForm, ProductoForm, ReporteVentasForm, UsuarioForm
+from . import (
+    acciones, busqueda, carrito, carrito_anonimo, catalogo, checkout, estadisticas, exportaciones, instrumentacion,
+    paginacion, reservas, ventas,
+)
+from .replicas import lectura_replica
+from .cache_catalogo import (
+    pagina_cacheada, etiquetas_artistas, etiquetas_inicio, etiquetas_comprar,
+    etiquetas_genero, etiquetas_tipo, etiquetas_novedades, metricas_prometheus,
+)
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.forms import UserCreationForm
 
@@ -43,10 +57,13 @@ def register_view(request):
             user.groups.add(group)
         else:
             # Si es cliente, crear el perfil Usuario (se crea automáticamente por señal)
-            pass
+            # y pasarle lo que tenía en el carrito como visitante
+            carrito_anonimo.fusionar(request, user)
         
         messages.success(request, 'Cuenta creada correctamente. Por favor inicia sesión.')
-        return redirect('login_frontend')
+        respuesta = redirect('login_frontend')
+        carrito_anonimo.borrar(respuesta)
+        return respuesta
 
     return render(request, 'register.html')
 
@@ -58,10 +75,15 @@ def login_frontend(request):
         user = authenticate(request, username=username, password=password)
         if user is not None:
             login(request, user)
+            # El carrito de visitante (cookie) pasa al carrito persistente
+            cart = carrito_anonimo.fusionar(request, user)
+            if cart is not None:
+                carrito.guardar_en_sesion(request, cart)
             # Si es staff, enviarlo al panel de administración
-            if user.is_staff:
-                return redirect('inicio_axolotlmusic')
-            return redirect('index_frontend')
+            respuesta = redirect('inicio_axolotlmusic' if user.is_staff else 'index_frontend')
+            if carrito_anonimo.COOKIE in request.COOKIES:
+                carrito_anonimo.borrar(respuesta)
+            return respuesta
         else:
             messages.error(request, 'Usuario o contraseña incorrectos.')
             return redirect('login_frontend')
@@ -115,21 +137,46 @@ def _safe_all_usuarios():
 @user_passes_test(is_staff_user)
 def inicio_axolotlmusic(request):
     try:
-        clientes_count = Usuario.objects.count()
+        context = estadisticas.resumen()
     except OperationalError:
-        clientes_count = User.objects.filter(is_staff=False).count()
-    artistas_count = Artista.objects.count()
-    productos_count = Producto.objects.count()
-    pedidos_count = Pedido.objects.count()
-    context = {
-        'clientes_count': clientes_count,
-        'artistas_count': artistas_count,
-        'productos_count': productos_count,
-        'pedidos_count': pedidos_count,
-    }
+        # Migraciones de estadísticas pendientes: conteo directo como antes
+        context = {
+            'clientes_count': User.objects.filter(is_staff=False).count(),
+            'artistas_count': Artista.objects.count(),
+            'productos_count': Producto.objects.count(),
+            'pedidos_count': Pedido.objects.count(),
+        }
     return render(request, 'admin_panel/dashboard.html', context)
 
 
+@login_required
+@user_passes_test(is_staff_user)
+def reporte_ventas(request):
+    """Ventas de un rango por día, producto, artista, género y tipo; lee sólo las tablas de ventas.py."""
+    form = ReporteVentasForm(request.GET)
+    contexto = {'form': form}
+    if form.is_valid():
+        datos = form.cleaned_data
+        contexto.update(ventas.reporte(datos['desde'], datos['hasta'], datos['orden']))
+    return render(request, 'admin_panel/reporte_ventas.html', contexto)
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def metricas_cache(request):
+    """Contadores hit/miss del caché de páginas en formato Prometheus."""
+    return HttpResponse(metricas_prometheus(), content_type='text/plain; version=0.0.4')
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def metricas_rendimiento(request):
+    """Percentiles por vista; JSON o, con ?formato=prometheus, texto de Prometheus."""
+    if request.GET.get('formato') == 'prometheus':
+        return HttpResponse(instrumentacion.metricas_prometheus(), content_type='text/plain; version=0.0.4')
+    return JsonResponse({'muestras': instrumentacion.MUESTRAS, 'vistas': instrumentacion.reporte()})
+
+
 # ----------------------
 # CRUD Productos (Admin)
 # ----------------------
@@ -149,9 +196,17 @@ def agregar_productos(request):
 
 @login_required
 @user_passes_test(is_staff_user)
+@lectura_replica
 def ver_productos(request):
-    productos = Producto.objects.select_related('artista').all().order_by('-id')
-    return render(request, 'admin_panel/productos_ver.html', {'productos': productos})
+    pagina = paginacion.paginar(
+        request,
+        Producto.objects.select_related('artista'),
+        ['-id'],
+        busqueda_en=['nombre_producto__icontains', 'artista__nombre_artista__icontains'],
+    )
+    return render(request, 'admin_panel/productos_ver.html', {
+        'productos': pagina.items, 'pagina': pagina, 'acciones_masivas': acciones.opciones('productos'),
+    })
 
 
 @login_required
@@ -199,17 +254,29 @@ def agregar_artistas(request):
 
 @login_required
 @user_passes_test(is_staff_user)
+@lectura_replica
 def ver_artistas(request):
-    artistas = Artista.objects.all().order_by('nombre_artista')
-    return render(request, 'artistas_admin/ver_artistas.html', {'artistas': artistas})
+    pagina = paginacion.paginar(
+        request, Artista.objects.all(), ['nombre_artista'], busqueda_en=['nombre_artista__icontains'],
+    )
+    return render(request, 'artistas_admin/ver_artistas.html', {'artistas': pagina.items, 'pagina': pagina})
 
 
 @login_required
 @user_passes_test(is_staff_user)
+@lectura_replica
 def ver_clientes(request):
     # Mostrar solo usuarios que NO son staff/administradores
     clientes = _safe_clientes_list()
-    return render(request, 'admin_panel/clientes_ver.html', {'clientes': clientes})
+    pagina = None
+    if not isinstance(clientes, list):
+        pagina = paginacion.paginar(
+            request, clientes, ['nombre'], busqueda_en=['nombre__icontains', 'email__icontains'],
+        )
+        clientes = pagina.items
+    return render(request, 'admin_panel/clientes_ver.html', {
+        'clientes': clientes, 'pagina': pagina, 'acciones_masivas': acciones.opciones('clientes'),
+    })
 
 
 @login_required
@@ -243,10 +310,13 @@ def borrar_cliente(request, cliente_id):
 # ----------------------
 @login_required
 @user_passes_test(is_staff_user)
+@lectura_replica
 def ver_empleados(request):
     empleados = User.objects.filter(groups__name='Empleados') | User.objects.filter(is_staff=True)
-    empleados = empleados.distinct().order_by('username')
-    return render(request, 'admin_panel/empleados_ver.html', {'empleados': empleados})
+    pagina = paginacion.paginar(
+        request, empleados.distinct(), ['username'], busqueda_en=['username__icontains', 'email__icontains'],
+    )
+    return render(request, 'admin_panel/empleados_ver.html', {'empleados': pagina.items, 'pagina': pagina})
 
 
 @login_required
@@ -326,87 +396,91 @@ def borrar_artistas(request, artista_id):
 # ----------------------
 # Vistas Frontend (cliente)
 # ----------------------
-def index_frontend(request):
+async def _arender(request, plantilla, contexto):
+    """render() para vistas async: resuelve antes el usuario y el badge del carrito
+    para que la plantilla no haga consultas síncronas.
+
+    El render corre en el pool de hilos (thread_sensitive=False): `imagen_responsiva`
+    puede leer el almacenamiento y codificar miniaturas y no debe frenar el event loop.
+    """
+    request.user = await request.auser()
+    await carrito.acuenta_en_sesion(request)
+    return await sync_to_async(render, thread_sensitive=False)(request, plantilla, contexto)
+
+
+@pagina_cacheada(etiquetas_inicio)
+@lectura_replica
+async def index_frontend(request):
     # Mostrar novedades y artistas como ejemplo
-    novedades = Producto.objects.filter(novedad=True).order_by('-id')[:8]
+    novedades = catalogo.productos_tarjeta(Producto.objects.filter(novedad=True)).order_by('-id')[:8]
     artistas = Artista.objects.all().order_by('nombre_artista')
-    return render(request, 'index_frontend.html', {'novedades': novedades, 'artistas': artistas})
+    contexto = {
+        'novedades': [p async for p in novedades],
+        'artistas': [a async for a in artistas],
+    }
+    return await _arender(request, 'index_frontend.html', contexto)
 
 
+@pagina_cacheada(etiquetas_artistas)
+@lectura_replica
 def artistas_frontend(request):
-    artistas_db = Artista.objects.all().order_by('nombre_artista')
-    artistas_por_letra = {}
-    for artista in artistas_db:
-        inicial = artista.nombre_artista[0].upper()
-        artistas_por_letra.setdefault(inicial, []).append(artista)
-
-    alfabeto = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-    artistas_final = {letra: artistas_por_letra.get(letra, []) for letra in alfabeto}
-    return render(request, 'artistas_frontend.html', {'artistas_por_letra': artistas_final})
+    """Índice A-Z de artistas; cada respuesta trae sólo la letra pedida (?letra=B)."""
+    letras = catalogo.conteo_por_inicial()
+    letra = request.GET.get('letra', '').upper()
+    if letra not in LETRAS:
+        # Sin letra (o inválida): la primera que tenga artistas
+        letra = next((l for l, cantidad in letras if cantidad), LETRAS[0])
+    return render(request, 'artistas_frontend.html', {
+        'letras': letras,
+        'letra': letra,
+        'artistas': catalogo.artistas_de_inicial(letra),
+    })
 
 
+@pagina_cacheada(etiquetas_artistas)
+@lectura_replica
 def lista_frontend(request):
     """Página simplificada de lista de artistas. Se actualizará automáticamente al agregar artistas en admin."""
     artistas = Artista.objects.all().order_by('nombre_artista')
     return render(request, 'lista.html', {'artistas': artistas})
 
 
-def comprar_frontend(request):
+@pagina_cacheada(etiquetas_comprar)
+@lectura_replica
+async def comprar_frontend(request):
     artista_nombre = request.GET.get('artista')
     if not artista_nombre:
         return redirect('artistas_frontend')
 
-    artista_obj = get_object_or_404(Artista, nombre_artista=artista_nombre)
-    productos = Producto.objects.filter(artista=artista_obj)
-    vinilos = productos.filter(tipo__iexact='vinilo')
-    cds = productos.filter(tipo__iexact='cd')
-    cassettes = productos.filter(tipo__iexact='casete')
+    artista_obj = await aget_object_or_404(Artista, nombre_artista=artista_nombre)
 
-    context = {
-        'artista': artista_obj,
-        'vinilos': vinilos,
-        'cds': cds,
-        'cassettes': cassettes,
-    }
-    return render(request, 'comprar.html', context)
+    context = {'artista': artista_obj}
+    context.update(await catalogo.aproductos_de_artista(artista_obj))
+    return await _arender(request, 'comprar.html', context)
 
 
-def genero_frontend(request):
+@pagina_cacheada(etiquetas_genero)
+@lectura_replica
+async def genero_frontend(request):
     genero_param = request.GET.get('genero')
     if not genero_param:
-        productos = Producto.objects.all().order_by('nombre_producto')
         genero_nombre = "Todos los Géneros"
     else:
-        productos = Producto.objects.filter(genero__iexact=genero_param).order_by('nombre_producto')
         genero_nombre = genero_param
 
-    vinilos = productos.filter(tipo__iexact='vinilo')
-    cds = productos.filter(tipo__iexact='cd')
-    cassettes = productos.filter(tipo__iexact='casete')
-
-    context = {
-        'genero_nombre': genero_nombre,
-        'vinilos': vinilos,
-        'cds': cds,
-        'cassettes': cassettes,
-    }
-    return render(request, 'genero.html', context)
+    context = {'genero_nombre': genero_nombre}
+    context.update(await catalogo.aproductos_de_genero(normalizar_faceta(genero_param)))
+    return await _arender(request, 'genero.html', context)
 
 
-def tipo_frontend(request):
+@pagina_cacheada(etiquetas_tipo)
+@lectura_replica
+async def tipo_frontend(request):
     """Página para filtrar productos por tipo (Vinilo, CD, Casete)."""
     tipo_param = request.GET.get('tipo', 'Vinilo')
     
-    # Filtrar por tipo
-    productos = Producto.objects.filter(tipo__iexact=tipo_param).order_by('nombre_producto')
-    
-    # Agrupar por artista
-    productos_por_artista = {}
-    for producto in productos:
-        artista_nombre = producto.artista.nombre_artista
-        if artista_nombre not in productos_por_artista:
-            productos_por_artista[artista_nombre] = []
-        productos_por_artista[artista_nombre].append(producto)
+    # Filtrar por tipo y agrupar por artista en una sola consulta
+    productos, productos_por_artista = await catalogo.aproductos_de_tipo(normalizar_faceta(tipo_param))
     
     tipo_nombre = tipo_param.capitalize()
     
@@ -416,14 +490,32 @@ def tipo_frontend(request):
         'productos_por_artista': productos_por_artista,
         'todos_productos': productos,
     }
-    return render(request, 'tipo.html', context)
+    return await _arender(request, 'tipo.html', context)
 
 
+@pagina_cacheada(etiquetas_novedades)
+@lectura_replica
 def novedades_frontend(request):
-    novedades = Producto.objects.filter(novedad=True).order_by('-id')[:4]
+    novedades = catalogo.productos_tarjeta(Producto.objects.filter(novedad=True)).order_by('-id')[:4]
     return render(request, 'novedades.html', {'novedades': novedades})
 
 
+@lectura_replica
+def buscar_frontend(request):
+    """Búsqueda de artistas y productos; con ?formato=json responde para el autocompletado."""
+    consulta = request.GET.get('q', '').strip()
+    tipo = request.GET.get('tipo') if request.GET.get('tipo') in ('artista', 'producto') else None
+    try:
+        limite = max(1, min(int(request.GET.get('limite', busqueda.LIMITE)), 50))
+    except ValueError:
+        limite = busqueda.LIMITE
+    resultados = busqueda.buscar(consulta, limite=limite, tipo=tipo)
+
+    if request.GET.get('formato') == 'json' or 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({'q': consulta, 'resultados': resultados})
+    return render(request, 'busqueda.html', {'consulta': consulta, 'resultados': resultados})
+
+
 def finalizar_frontend(request):
     artista_nombre = request.GET.get('artista')
     producto_nombre = request.GET.get('producto')
@@ -439,49 +531,61 @@ def finalizar_frontend(request):
 # ----------------------
 # CARRITO (cliente)
 # ----------------------
-@login_required
 def add_to_cart(request, producto_id):
-    producto = get_object_or_404(Producto, id=producto_id)
-    usuario = request.user.usuario
-    cart, _ = Cart.objects.get_or_create(usuario=usuario)
-
+    producto = get_object_or_404(Producto.objects.only('id', 'nombre_producto'), id=producto_id)
     # cantidad desde POST (si no viene, 1)
     cantidad = int(request.POST.get('cantidad', 1)) if request.method == 'POST' else 1
-
-    item, created = CartItem.objects.get_or_create(cart=cart, producto=producto)
-    if not created:
-        item.cantidad = item.cantidad + cantidad
-    else:
-        item.cantidad = cantidad
-    item.save()
-
-    messages.success(request, f'"{producto.nombre_producto}" agregado al carrito.')
     # redirigir a la página anterior o al index
     next_url = request.POST.get('next') or request.META.get('HTTP_REFERER') or '/index/'
+
+    if not request.user.is_authenticated:
+        # Visitante: el carrito vive en una cookie firmada, sin escribir en la base
+        items = carrito_anonimo.leer(request)
+        try:
+            carrito_anonimo.agregar(items, producto.id, cantidad)
+        except carrito_anonimo.CarritoLleno as e:
+            messages.error(request, str(e))
+            return redirect(next_url)
+        messages.success(request, f'"{producto.nombre_producto}" agregado al carrito.')
+        respuesta = redirect(next_url)
+        carrito_anonimo.guardar(respuesta, items)
+        return respuesta
+
+    cart, _ = Cart.objects.get_or_create(usuario=request.user.usuario)
+    try:
+        carrito.agregar_producto(cart, producto, cantidad)
+    except reservas.SinExistencias as e:
+        messages.error(request, str(e))
+    else:
+        carrito.guardar_en_sesion(request, cart)
+        messages.success(request, f'"{producto.nombre_producto}" agregado al carrito.')
     return redirect(next_url)
 
 
-@login_required
 def ver_carrito(request):
+    if not request.user.is_authenticated:
+        items = reservas.para_carrito(carrito_anonimo.para_mostrar(carrito_anonimo.leer(request)))
+        total = sum(item.subtotal() for item in items)
+        return render(request, 'cart.html', {'items': items, 'total': total, 'anonimo': True})
     usuario = request.user.usuario
     cart, _ = Cart.objects.get_or_create(usuario=usuario)
-    items = cart.items.select_related('producto').all()
+    items = reservas.para_carrito(cart.items.select_related('producto__artista'), cart.pk)
     total = sum(item.subtotal() for item in items)
+    carrito.guardar_en_sesion(request, cart)
     return render(request, 'cart.html', {'cart': cart, 'items': items, 'total': total})
 
 
 @login_required
 def update_cart_item(request, item_id):
-    item = get_object_or_404(CartItem, id=item_id, cart__usuario__user=request.user)
+    item = get_object_or_404(CartItem.objects.select_related('cart'), id=item_id, cart__usuario__user=request.user)
     if request.method == 'POST':
         try:
             cantidad = int(request.POST.get('cantidad', 1))
-            if cantidad <= 0:
-                item.delete()
-            else:
-                item.cantidad = cantidad
-                item.save()
+            carrito.cambiar_cantidad(item, cantidad)
+            carrito.guardar_en_sesion(request, item.cart)
             messages.success(request, 'Carrito actualizado.')
+        except reservas.SinExistencias as e:
+            messages.error(request, str(e))
         except Exception:
             messages.error(request, 'Error al actualizar la cantidad.')
     return redirect('ver_carrito')
@@ -489,13 +593,52 @@ def update_cart_item(request, item_id):
 
 @login_required
 def remove_cart_item(request, item_id):
-    item = get_object_or_404(CartItem, id=item_id, cart__usuario__user=request.user)
+    item = get_object_or_404(CartItem.objects.select_related('cart'), id=item_id, cart__usuario__user=request.user)
     if request.method == 'POST':
-        item.delete()
+        carrito.eliminar_item(item)
+        carrito.guardar_en_sesion(request, item.cart)
         messages.success(request, 'Producto eliminado del carrito.')
     return redirect('ver_carrito')
 
 
+def update_cart_anonimo(request, producto_id):
+    if request.method == 'POST':
+        try:
+            cantidad = int(request.POST.get('cantidad', 1))
+        except ValueError:
+            messages.error(request, 'Error al actualizar la cantidad.')
+            return redirect('ver_carrito')
+        respuesta = redirect('ver_carrito')
+        carrito_anonimo.guardar(respuesta, carrito_anonimo.cambiar(carrito_anonimo.leer(request), producto_id, cantidad))
+        messages.success(request, 'Carrito actualizado.')
+        return respuesta
+    return redirect('ver_carrito')
+
+
+def remove_cart_anonimo(request, producto_id):
+    if request.method == 'POST':
+        respuesta = redirect('ver_carrito')
+        carrito_anonimo.guardar(respuesta, carrito_anonimo.cambiar(carrito_anonimo.leer(request), producto_id, 0))
+        messages.success(request, 'Producto eliminado del carrito.')
+        return respuesta
+    return redirect('ver_carrito')
+
+
+@login_required
+def checkout_carrito(request):
+    if request.method != 'POST':
+        return redirect('ver_carrito')
+    cart = get_object_or_404(Cart, usuario__user=request.user)
+    try:
+        pedido = checkout.crear_pedido(cart)
+    except checkout.CheckoutError as e:
+        messages.error(request, str(e))
+        return redirect('ver_carrito')
+    carrito.guardar_en_sesion(request, cart)
+    messages.success(request, f'Pedido #{pedido.id} creado correctamente.')
+    return redirect('perfil_usuario')
+
+
 # ----------------------
 # PERFIL DE USUARIO
 # ----------------------
@@ -525,9 +668,31 @@ def editar_perfil(request):
 # ----------------------
 @login_required
 @user_passes_test(is_staff_user)
+@lectura_replica
 def ver_pedidos(request):
-    pedidos = Pedido.objects.select_related('usuario').all().order_by('-fecha')
-    return render(request, 'admin_panel/pedidos_ver.html', {'pedidos': pedidos})
+    pagina = paginacion.paginar(
+        request,
+        Pedido.objects.select_related('usuario'),
+        ['-fecha'],
+        busqueda_en=['usuario__nombre__icontains', 'usuario__email__icontains'],
+    )
+    return render(request, 'admin_panel/pedidos_ver.html', {
+        'pedidos': pagina.items, 'pagina': pagina, 'acciones_masivas': acciones.opciones('pedidos'),
+    })
+
+
+def _exportar(request, nombre):
+    form = FiltroExportacionForm(request.GET)
+    if not form.is_valid():
+        return HttpResponse(form.errors.as_text(), status=400, content_type='text/plain; charset=utf-8')
+    return exportaciones.respuesta(request, nombre, form.cleaned_data)
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def exportar_pedidos(request):
+    """CSV o XLSX (?formato=) de los pedidos, con filtros de fecha, artista y producto."""
+    return _exportar(request, 'pedidos')
 
 
 @login_required
@@ -585,9 +750,22 @@ def borrar_pedido(request, pedido_id):
 # ----------------------
 @login_required
 @user_passes_test(is_staff_user)
+@lectura_replica
 def ver_detalles_pedidos(request):
-    detalles = DetallePedido.objects.select_related('pedido', 'usuario', 'producto').all().order_by('-fecha')
-    return render(request, 'admin_panel/detalles_pedidos_ver.html', {'detalles': detalles})
+    pagina = paginacion.paginar(
+        request,
+        DetallePedido.objects.select_related('pedido', 'usuario', 'producto'),
+        ['-fecha'],
+        busqueda_en=['producto__nombre_producto__icontains', 'usuario__nombre__icontains'],
+    )
+    return render(request, 'admin_panel/detalles_pedidos_ver.html', {'detalles': pagina.items, 'pagina': pagina})
+
+
+@login_required
+@user_passes_test(is_staff_user)
+def exportar_detalles_pedidos(request):
+    """Como exportar_pedidos, una fila por detalle con producto y artista."""
+    return _exportar(request, 'detalles')
 
 
 @login_required
@@ -619,7 +797,7 @@ def agregar_detalle_pedido(request):
         except Exception as e:
             messages.error(request, f'Error al crear detalle: {str(e)}')
             
-    pedidos = Pedido.objects.all()
+    pedidos = Pedido.objects.select_related('usuario')  # la plantilla muestra el cliente de cada pedido
     usuarios = _safe_all_usuarios()
     productos = Producto.objects.all()
     return render(request, 'admin_panel/detalles_pedidos_agregar.html', {
@@ -660,4 +838,57 @@ def borrar_detalle_pedido(request, detalle_id):
         detalle.delete()
         messages.success(request, 'Detalle de pedido eliminado.')
         return redirect('ver_detalles_pedidos')
-    return render(request, 'admin_panel/detalles_pedidos_borrar.html', {'detalle': detalle})
\ No newline at end of file
+    return render(request, 'admin_panel/detalles_pedidos_borrar.html', {'detalle': detalle})
+
+
+# ----------------------
+# Acciones masivas (Admin)
+# ----------------------
+def _accion_masiva(request, lista, disponibles=None):
+    """Aplica la acción del formulario de una lista del panel a las filas marcadas."""
+    volver = request.POST.get('volver', '')
+    if not url_has_allowed_host_and_scheme(volver, allowed_hosts={request.get_host()}):
+        volver = reverse(f'ver_{lista}')
+    accion = request.POST.get('accion', '')
+    disponibles = disponibles or {}
+    try:
+        queryset = acciones.seleccion(acciones.MODELOS[lista], request.POST.getlist('ids'))
+        if accion == 'borrar':
+            if not request.POST.get('confirmar'):
+                # Primero se muestra cuánto se borra en cascada
+                return render(request, 'admin_panel/acciones_borrar.html', {
+                    'costos': acciones.costo_borrado(queryset),
+                    'ids': list(queryset.values_list('pk', flat=True)),
+                    'volver': volver,
+                })
+            resultado = acciones.borrar(queryset)
+        elif accion in disponibles:
+            resultado = disponibles[accion][1](queryset, request.POST.get('valor', ''))
+        else:
+            raise acciones.AccionInvalida('Elige una acción.')
+    except acciones.AccionInvalida as error:
+        messages.error(request, str(error))
+    else:
+        messages.success(request, resultado.mensaje)
+    return redirect(volver)
+
+
+@login_required
+@user_passes_test(is_staff_user)
+@require_POST
+def acciones_productos(request):
+    return _accion_masiva(request, 'productos', acciones.ACCIONES_PRODUCTOS)
+
+
+@login_required
+@user_passes_test(is_staff_user)
+@require_POST
+def acciones_pedidos(request):
+    return _accion_masiva(request, 'pedidos')
+
+
+@login_required
+@user_passes_test(is_staff_user)
+@require_POST
+def acciones_clientes(request):
+    return _accion_masiva(request, 'clientes')
@@ -5,6 +5,28 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Perfil ASGI de AxolotlMusic
+---------------------------
+Las páginas más visitadas del catálogo (index, comprar, género, tipo) son
+vistas async con el ORM asíncrono, así que bajo ASGI no ocupan un hilo
+mientras esperan a un cliente lento. Las demás vistas siguen siendo síncronas
+y Django las corre en su pool de hilos. Todo el middleware del proyecto
+soporta async, así que una petición async no cambia de hilo en el camino.
+
+    pip install "uvicorn[standard]"
+    uvicorn backend_AxolotlMusic.asgi:application --workers 4 --timeout-keep-alive 5
+
+    # o con daphne
+    pip install daphne
+    daphne -b 0.0.0.0 -p 8000 backend_AxolotlMusic.asgi:application
+
+- Bajo ASGI cada consulta del ORM async corre en un hilo distinto, así que
+  las conexiones persistentes (CONN_MAX_AGE) no se reutilizan bien; con
+  PostgreSQL usar el pool (AXOLOTL_PG_POOL=1).
+- Servir /static/ y /media/ con nginx o con AXOLOTL_SERVIR_ESTATICOS=1.
+- `gunicorn backend_AxolotlMusic.wsgi` sigue funcionando: las vistas async
+  corren por petición con async_to_sync.
 """
 
 import os
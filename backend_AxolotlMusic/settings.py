@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,8 +42,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que la latencia incluya todo el resto de la cadena
+    'app_Axolotl.instrumentacion.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'app_Axolotl.replicas.PrimarioPegajosoMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -54,7 +58,8 @@ ROOT_URLCONF = 'backend_AxolotlMusic.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de render (app_Axolotl/instrumentacion.py)
+        'BACKEND': 'app_Axolotl.instrumentacion.PlantillasMedidas',
         'DIRS': [BASE_DIR / 'app_Axolotl' / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,11 +79,116 @@ WSGI_APPLICATION = 'backend_AxolotlMusic.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# AXOLOTL_DB: 'sqlite' (por defecto) o 'postgres'.
+# SQLite: cada conexión corre los PRAGMA de _PRAGMAS_SQLITE (init_command): synchronous=NORMAL,
+# un busy_timeout para esperar al escritor en vez de fallar con "database is locked" y
+# mmap_size para leer páginas sin copiarlas. Las transacciones toman el candado de escritura
+# al empezar (IMMEDIATE) para no fallar al promoverse. WAL (lecturas que no bloquean a las
+# escrituras) queda guardado en el archivo y crea -wal/-shm a su lado, así que se activa
+# sólo con AXOLOTL_SQLITE_WAL=1 (despliegue) y no toca el db.sqlite3 del repositorio.
+# Postgres: AXOLOTL_PG_NAME/USER/PASSWORD/HOST/PORT. Con AXOLOTL_PG_POOL=1 usa el pool
+# de psycopg 3; si no, conexiones persistentes (CONN_MAX_AGE) con health checks.
+_db = os.environ.get('AXOLOTL_DB', 'sqlite')
+
+if _db == 'postgres':
+    _pool = os.environ.get('AXOLOTL_PG_POOL', '0') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('AXOLOTL_PG_NAME', 'axolotl'),
+            'USER': os.environ.get('AXOLOTL_PG_USER', 'axolotl'),
+            'PASSWORD': os.environ.get('AXOLOTL_PG_PASSWORD', ''),
+            'HOST': os.environ.get('AXOLOTL_PG_HOST', '127.0.0.1'),
+            'PORT': os.environ.get('AXOLOTL_PG_PORT', '5432'),
+            # El pool administra las conexiones; CONN_MAX_AGE debe ser 0 con él
+            'CONN_MAX_AGE': 0 if _pool else int(os.environ.get('AXOLOTL_PG_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('AXOLOTL_PG_POOL_MIN', '2')),
+                    'max_size': int(os.environ.get('AXOLOTL_PG_POOL_MAX', '20')),
+                    'timeout': 10,
+                },
+            } if _pool else {},
+        }
+    }
+else:
+    _PRAGMAS_SQLITE = {
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 128 * 1024 * 1024,
+        'temp_store': 'MEMORY',
     }
+    if os.environ.get('AXOLOTL_SQLITE_WAL', '0') == '1':
+        _PRAGMAS_SQLITE = {'journal_mode': 'WAL', **_PRAGMAS_SQLITE}
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('AXOLOTL_SQLITE_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': ';'.join(f'PRAGMA {nombre} = {valor}' for nombre, valor in _PRAGMAS_SQLITE.items()),
+            },
+        }
+    }
+
+# Réplicas de lectura (app_Axolotl/replicas.py): las vistas del catálogo y las listas
+# del panel leen de ellas; el resto y las sesiones que acaban de escribir usan 'default'.
+# SQLite local: AXOLOTL_SQLITE_REPLICA=<archivo> + `manage.py sincronizar_replica`.
+# Postgres: AXOLOTL_PG_REPLICA_HOSTS=host1,host2 (mismo usuario y base).
+if _db == 'postgres':
+    _hosts_replica = [h for h in os.environ.get('AXOLOTL_PG_REPLICA_HOSTS', '').split(',') if h]
+    for _i, _host in enumerate(_hosts_replica, start=1):
+        DATABASES[f'replica{_i}'] = {**DATABASES['default'], 'HOST': _host, 'TEST': {'MIRROR': 'default'}}
+elif os.environ.get('AXOLOTL_SQLITE_REPLICA'):
+    DATABASES['replica1'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['AXOLOTL_SQLITE_REPLICA'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+AXOLOTL_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+AXOLOTL_PRIMARIO_PEGAJOSO = 5  # segundos leyendo del primario después de escribir
+DATABASE_ROUTERS = ['app_Axolotl.replicas.RouterReplicas']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# El alias 'catalogo' guarda las páginas públicas (ver app_Axolotl/cache_catalogo.py).
+# AXOLOTL_CACHE_BACKEND: 'locmem' (por defecto), 'file' o 'redis'.
+# AXOLOTL_CACHE_LOCATION: carpeta para 'file' o URL (redis://...) para 'redis'.
+
+_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+_CACHE_LOCATIONS = {
+    'locmem': 'axolotl-catalogo',
+    'file': str(BASE_DIR / 'cache_catalogo'),
+    'redis': 'redis://127.0.0.1:6379/1',
+}
+_cache_backend = os.environ.get('AXOLOTL_CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalogo': {
+        'BACKEND': _CACHE_BACKENDS[_cache_backend],
+        'LOCATION': os.environ.get('AXOLOTL_CACHE_LOCATION', _CACHE_LOCATIONS[_cache_backend]),
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 5000} if _cache_backend != 'redis' else {},
+    },
+    # Manifiestos de miniaturas (app_Axolotl/miniaturas.py): uno chico por imagen, sin vencimiento.
+    # Con menos entradas que imágenes se descartan y se vuelven a leer del storage en cada render.
+    'miniaturas': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'axolotl-miniaturas',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('AXOLOTL_MINIATURAS_CACHE_MAX', '50000'))},
+    },
 }
 
 
@@ -119,10 +229,41 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Producción: AXOLOTL_ESTATICOS_HASH=1 y `manage.py collectstatic` generan nombres con
+# hash del contenido y variantes .gz/.br (ver app_Axolotl/estaticos.py).
+# AXOLOTL_SERVIR_ESTATICOS=1 sirve /static/ y /media/ desde Django con Cache-Control
+# immutable, ETag y Range (despliegues de una sola máquina sin nginx delante).
+AXOLOTL_ESTATICOS_HASH = os.environ.get('AXOLOTL_ESTATICOS_HASH', '0') == '1'
+AXOLOTL_SERVIR_ESTATICOS = os.environ.get('AXOLOTL_SERVIR_ESTATICOS', '0') == '1'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'app_Axolotl.estaticos.AlmacenEstaticos' if AXOLOTL_ESTATICOS_HASH
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
 # Media files (uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Generar miniaturas al guardar imágenes (si es False se generan al pedirlas por primera vez)
+AXOLOTL_MINIATURAS_AL_SUBIR = True
+
+# Reservas de stock (app_Axolotl/reservas.py): con AXOLOTL_RESERVAS=1 agregar al carrito aparta
+# las unidades durante AXOLOTL_RESERVA_MINUTOS; `manage.py liberar_reservas` borra las vencidas.
+AXOLOTL_RESERVAS = os.environ.get('AXOLOTL_RESERVAS', '0') == '1'
+AXOLOTL_RESERVA_MINUTOS = int(os.environ.get('AXOLOTL_RESERVA_MINUTOS', '15'))
+
+# Métricas por vista (app_Axolotl/instrumentacion.py): latencia, consultas, tiempo en BD y en
+# plantillas, y consultas repetidas (N+1). Se consultan en /admin_panel/metricas/rendimiento/.
+AXOLOTL_INSTRUMENTACION = os.environ.get('AXOLOTL_INSTRUMENTACION', '1') == '1'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
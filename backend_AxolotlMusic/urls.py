@@ -19,9 +19,13 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from app_Axolotl import estaticos
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('app_Axolotl.urls')),
 ]
-if settings.DEBUG:
+if settings.AXOLOTL_SERVIR_ESTATICOS:
+    urlpatterns = estaticos.urlpatterns() + urlpatterns
+elif settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)